@@ -0,0 +1,47 @@
+"""add credentialstat table
+
+Revision ID: 1c2d3e4f5a6b
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "1c2d3e4f5a6b"
+down_revision = "f6a7b8c9d0e1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "credentialstat",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "credential_id",
+            sa.Integer(),
+            sa.ForeignKey("credential.id"),
+            nullable=False,
+        ),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("scope", sa.String(), nullable=False),
+        sa.Column("successes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failures", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_success_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint(
+            "credential_id",
+            "kind",
+            "scope",
+            name="uq_credentialstat_cred_kind_scope",
+        ),
+    )
+    op.create_index(
+        "ix_credentialstat_credential_id", "credentialstat", ["credential_id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_credentialstat_credential_id", table_name="credentialstat")
+    op.drop_table("credentialstat")
@@ -0,0 +1,37 @@
+"""add discoverycache table
+
+Revision ID: 2d3e4f5a6b7c
+Revises: 1c2d3e4f5a6b
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "2d3e4f5a6b7c"
+down_revision = "1c2d3e4f5a6b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "discoverycache",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ip", sa.String(), nullable=False),
+        sa.Column("port", sa.Integer(), nullable=False),
+        sa.Column("host_key", sa.String(), nullable=False),
+        sa.Column("candidate", sa.String(), nullable=False),
+        sa.Column(
+            "identified_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.UniqueConstraint("ip", "port", name="uq_discoverycache_ip_port"),
+    )
+
+
+def downgrade():
+    op.drop_table("discoverycache")
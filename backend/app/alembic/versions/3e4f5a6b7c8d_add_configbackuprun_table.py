@@ -0,0 +1,41 @@
+"""add configbackuprun table
+
+Revision ID: 3e4f5a6b7c8d
+Revises: 2d3e4f5a6b7c
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "3e4f5a6b7c8d"
+down_revision = "2d3e4f5a6b7c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "configbackuprun",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("changed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("unchanged", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("timed_out", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed_hosts", sa.String(), nullable=False, server_default=""),
+        sa.Column(
+            "duration_seconds", sa.Float(), nullable=False, server_default="0"
+        ),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        op.f("ix_configbackuprun_started_at"), "configbackuprun", ["started_at"]
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_configbackuprun_started_at"), table_name="configbackuprun")
+    op.drop_table("configbackuprun")
@@ -0,0 +1,31 @@
+"""add owner and heartbeat_at to discoveryjob
+
+Revision ID: 4f5a6b7c8d9e
+Revises: 3e4f5a6b7c8d
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "4f5a6b7c8d9e"
+down_revision = "3e4f5a6b7c8d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "discoveryjob",
+        sa.Column("owner", sa.String(), nullable=False, server_default=""),
+    )
+    op.add_column(
+        "discoveryjob",
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("discoveryjob", "heartbeat_at")
+    op.drop_column("discoveryjob", "owner")
@@ -0,0 +1,62 @@
+"""dedupe macaddress/arp and add natural-key unique constraints
+
+Revision ID: b2c3d4e5f6a7
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "b2c3d4e5f6a7"
+down_revision = "a1b2c3d4e5f6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-entry sync had no constraint to stop duplicates; keep the oldest
+    # row of each natural key so created_at ("first seen") survives.
+    op.execute(
+        """
+        DELETE FROM macaddress a
+        USING macaddress b
+        WHERE a.device_id = b.device_id
+          AND a.mac = b.mac
+          AND a.interface = b.interface
+          AND a.id > b.id
+        """
+    )
+    # NULLs never conflict in a unique constraint, so a NULL mac would let
+    # ON CONFLICT insert duplicates of incomplete entries; store "" instead
+    op.execute("UPDATE arp SET mac = '' WHERE mac IS NULL")
+    op.alter_column("arp", "mac", existing_type=sa.String(), nullable=False)
+    op.execute(
+        """
+        DELETE FROM arp a
+        USING arp b
+        WHERE a.device_id = b.device_id
+          AND a.ip = b.ip
+          AND a.mac = b.mac
+          AND a.interface = b.interface
+          AND a.id > b.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_macaddress_device_mac_interface",
+        "macaddress",
+        ["device_id", "mac", "interface"],
+    )
+    op.create_unique_constraint(
+        "uq_arp_device_ip_mac_interface",
+        "arp",
+        ["device_id", "ip", "mac", "interface"],
+    )
+
+
+def downgrade():
+    op.drop_constraint("uq_arp_device_ip_mac_interface", "arp", type_="unique")
+    op.drop_constraint(
+        "uq_macaddress_device_mac_interface", "macaddress", type_="unique"
+    )
+    op.alter_column("arp", "mac", existing_type=sa.String(), nullable=True)
@@ -0,0 +1,51 @@
+"""add syncfingerprint table
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "c3d4e5f6a7b8"
+down_revision = "b2c3d4e5f6a7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "syncfingerprint",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "device_id",
+            sa.Integer(),
+            sa.ForeignKey("device.id"),
+            nullable=False,
+        ),
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("fingerprint", sa.String(), nullable=False),
+        sa.Column(
+            "verified_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column(
+            "changed_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.UniqueConstraint(
+            "device_id", "table_name", name="uq_syncfingerprint_device_table"
+        ),
+    )
+    op.create_index("ix_syncfingerprint_device_id", "syncfingerprint", ["device_id"])
+
+
+def downgrade():
+    op.drop_table("syncfingerprint")
@@ -0,0 +1,67 @@
+"""add healthprobe and healthrollup tables
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "d4e5f6a7b8c9"
+down_revision = "c3d4e5f6a7b8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "healthprobe",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "device_id",
+            sa.Integer(),
+            sa.ForeignKey("device.id"),
+            nullable=False,
+        ),
+        sa.Column(
+            "ts",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column("rtt_ms", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_healthprobe_device_id", "healthprobe", ["device_id"])
+    op.create_index("ix_healthprobe_ts", "healthprobe", ["ts"])
+
+    op.create_table(
+        "healthrollup",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "device_id",
+            sa.Integer(),
+            sa.ForeignKey("device.id"),
+            nullable=False,
+        ),
+        sa.Column("resolution", sa.String(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("up", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rtt_min", sa.Float(), nullable=True),
+        sa.Column("rtt_avg", sa.Float(), nullable=True),
+        sa.Column("rtt_max", sa.Float(), nullable=True),
+        sa.UniqueConstraint(
+            "device_id",
+            "resolution",
+            "bucket_start",
+            name="uq_healthrollup_device_resolution_bucket",
+        ),
+    )
+    op.create_index("ix_healthrollup_bucket_start", "healthrollup", ["bucket_start"])
+
+
+def downgrade():
+    op.drop_table("healthrollup")
+    op.drop_table("healthprobe")
@@ -0,0 +1,60 @@
+"""add discoveryjob and discoveryjobhost tables
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "f6a7b8c9d0e1"
+down_revision = "e5f6a7b8c9d0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "discoveryjob",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+        sa.Column("port", sa.Integer(), nullable=False, server_default="22"),
+        sa.Column("credential_ids", sa.String(), nullable=False, server_default=""),
+        sa.Column("username", sa.String(), nullable=False, server_default=""),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.String(), nullable=False, server_default=""),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_discoveryjob_created_at", "discoveryjob", ["created_at"])
+
+    op.create_table(
+        "discoveryjobhost",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "job_id",
+            sa.Integer(),
+            sa.ForeignKey("discoveryjob.id"),
+            nullable=False,
+        ),
+        sa.Column("ip", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+        sa.Column("candidate", sa.String(), nullable=False, server_default=""),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("job_id", "ip", name="uq_discoveryjobhost_job_ip"),
+    )
+    op.create_index("ix_discoveryjobhost_job_id", "discoveryjobhost", ["job_id"])
+
+
+def downgrade():
+    op.drop_index("ix_discoveryjobhost_job_id", table_name="discoveryjobhost")
+    op.drop_table("discoveryjobhost")
+    op.drop_index("ix_discoveryjob_created_at", table_name="discoveryjob")
+    op.drop_table("discoveryjob")
@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, Request
 
 from app.api.deps import CurrentUser, SessionDep, get_client_ip
 from app.crud.audit import write_audit_log
+from app.crud.credential_stats import delete_credential_stats_by_credential_id
 from app.crud.credentials import (
     create_credential as create_credential_db,
 )
@@ -129,6 +130,7 @@ def delete_credential(
     if not credential:
         raise HTTPException(status_code=404, detail="Credential not found")
     username = credential.username
+    delete_credential_stats_by_credential_id(session=session, credential_id=id)
     delete_credential_db(session=session, credential_db=credential)
     write_audit_log(
         session,
@@ -1,6 +1,7 @@
 import asyncio
 import json
-from typing import Any
+from datetime import UTC, datetime, timedelta
+from typing import Any, Literal
 
 from fastapi import APIRouter, HTTPException, Request
 from sqlmodel import select
@@ -35,13 +36,20 @@ from app.crud.devices import (
 from app.crud.devices import (
     update_device_metadata as update_device_metadata_db,
 )
+from app.crud.health import (
+    apply_health_statuses,
+    delete_health_by_device_id,
+    get_latency,
+)
 from app.crud.interfaces import delete_interface_by_device_id
 from app.crud.ip_interfaces import delete_ip_interface_by_device_id
 from app.crud.mac_addresses import delete_mac_by_device_id
+from app.crud.sync_fingerprints import delete_fingerprints_by_device_id
 from app.models import (
     Device,
     DeviceConfigCreate,
     DeviceCreate,
+    DeviceLatencyPublic,
     DevicePublic,
     DevicesPublic,
     DeviceUpdate,
@@ -83,20 +91,10 @@ def health_check_all(session: SessionDep, current_user: CurrentUser) -> Any:
     """
     TCP-connect health check for all devices. Updates health_status in DB.
     """
-    devices = session.exec(select(Device)).all()
-    payload = [{"id": s.id, "ip": s.ipaddress, "port": s.port or 22} for s in devices]
+    devices = session.exec(select(Device.id, Device.ipaddress, Device.port)).all()
+    payload = [{"id": id, "ip": ip, "port": port or 22} for id, ip, port in devices]
     results = check_devices_parallel(payload)
-    response_results = {}
-    for s in devices:
-        if s.id is not None:
-            new_status = results.get(s.id, "DOWN")
-            if new_status == "UP" and s.health_status == "AUTH_ERROR":
-                new_status = "AUTH_ERROR"
-            s.health_status = new_status
-            response_results[s.id] = new_status
-        session.add(s)
-    session.commit()
-    return response_results
+    return apply_health_statuses(session, results)
 
 
 @router.post("/{id}/health")
@@ -108,14 +106,31 @@ def health_check_one(session: SessionDep, current_user: CurrentUser, id: int) ->
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     status = check_device(device.ipaddress, device.port or 22)
-    if status == "UP" and device.health_status == "AUTH_ERROR":
-        status = "AUTH_ERROR"
-    device.health_status = status
-    session.add(device)
-    session.commit()
+    status = apply_health_statuses(session, {id: status})[id]
     return {"id": id, "health_status": status}
 
 
+@router.get("/{id}/latency", response_model=DeviceLatencyPublic)
+def read_device_latency(
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: int,
+    resolution: Literal["raw", "minute", "hour"] = "raw",
+    hours: int = 24,
+) -> Any:
+    """
+    TCP connect RTT history from the scheduled health check.
+    """
+    device = session.get(Device, id)
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    since = datetime.now(UTC) - timedelta(hours=max(1, hours))
+    data = get_latency(
+        session=session, device_id=id, resolution=resolution, since=since
+    )
+    return DeviceLatencyPublic(device_id=id, resolution=resolution, data=data)
+
+
 @router.get("/{id}", response_model=DevicePublic)
 def read_device(session: SessionDep, current_user: CurrentUser, id: int) -> Any:
     """
@@ -198,6 +213,8 @@ def delete_device(
     delete_ip_interface_by_device_id(session=session, device_id=device_id)
     delete_revisions_by_device_id(session=session, device_id=device_id)
     delete_compliance_by_device_id(session, device_id)
+    delete_fingerprints_by_device_id(session=session, device_id=device_id)
+    delete_health_by_device_id(session=session, device_id=device_id)
     delete_device_db(session=session, device_db=device)
     write_audit_log(
         session,
@@ -1,19 +1,40 @@
 import asyncio
+import ipaddress
 import re
-from typing import Any
+import time
+from collections.abc import AsyncIterator, Iterator
+from typing import Annotated, Any
 
-from fastapi import APIRouter, HTTPException, Request
-from sqlmodel import select
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.sse import EventSourceResponse, ServerSentEvent
+from sqlmodel import Session, col, func, select
 
 from app.api.deps import CurrentUser, SessionDep, get_client_ip
 from app.automation.discovery import (
+    IdentifyCache,
     expand_cidr,
     identify_hosts_parallel,
+    iter_cidr,
     scan_subnet,
+    sweep,
 )
+from app.automation.topology import crawl_neighbors
+from app.core.config import settings
 from app.core.crypto import decrypt_password
+from app.core.db import engine
+from app.core.scheduler import queue_discovery_job
 from app.crud.audit import write_audit_log
+from app.crud.credential_stats import load_credential_stats, record_credential_results
 from app.crud.devices import bulk_create_devices, get_device_by_name
+from app.crud.discovery_cache import load_identify_cache, store_identify_results
+from app.crud.discovery_jobs import (
+    UNFINISHED_STATUSES,
+    create_discovery_job,
+    get_candidates,
+    get_finished_host_ids,
+    get_job_progress,
+    get_job_public,
+)
 from app.models import (
     Credential,
     Device,
@@ -21,9 +42,18 @@ from app.models import (
     DiscoveryAddPublic,
     DiscoveryAddRequest,
     DiscoveryCandidatePublic,
+    DiscoveryCrawlError,
+    DiscoveryCrawlPublic,
+    DiscoveryCrawlRequest,
     DiscoveryHostPublic,
     DiscoveryIdentifyPublic,
     DiscoveryIdentifyRequest,
+    DiscoveryJob,
+    DiscoveryJobCreate,
+    DiscoveryJobPublic,
+    DiscoveryJobsPublic,
+    DiscoveryNeighborPublic,
+    DiscoveryScanProgress,
     DiscoveryScanPublic,
     DiscoveryScanRequest,
 )
@@ -32,6 +62,12 @@ router = APIRouter()
 
 HOSTNAME_RE = re.compile(r"^[a-zA-Z0-9_]+$")
 MAX_IDENTIFY_IPS = 16
+MAX_CRAWL_DEPTH = 5
+MAX_CRAWL_DEVICES = 1000
+# Seconds between "progress" events of a streaming scan
+SCAN_PROGRESS_INTERVAL = 1.0
+# Seconds between checks for new results while streaming a discovery job
+JOB_STREAM_INTERVAL = 1.0
 
 
 def _require_superuser(current_user: CurrentUser) -> None:
@@ -91,6 +127,105 @@ async def discovery_scan(
     )
 
 
+def _sweep_hosts(
+    current_user: CurrentUser, scan_in: DiscoveryScanRequest
+) -> tuple[int, Iterator[str]]:
+    """Validate a streaming scan before the response starts; once the event
+    stream is open an error can no longer change the status code."""
+    _require_superuser(current_user)
+    if not 1 <= scan_in.port <= 65535:
+        raise HTTPException(status_code=400, detail="Invalid port")
+    try:
+        return iter_cidr(scan_in.cidr, settings.DISCOVERY_SWEEP_MAX_HOSTS)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+SweepHosts = Annotated[tuple[int, Iterator[str]], Depends(_sweep_hosts)]
+
+
+@router.post("/scan/stream", response_class=EventSourceResponse)
+async def discovery_scan_stream(
+    *,
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    scan_in: DiscoveryScanRequest,
+    sweep_hosts: SweepHosts,
+) -> AsyncIterator[ServerSentEvent]:
+    """
+    TCP-sweep a subnet of up to a /16 and stream the results as server-sent
+    events: "host" for each open IP as soon as it answers, "progress" about
+    once a second, and a final "done" with the totals.
+    """
+    total, ips = sweep_hosts
+    timeout = min(max(scan_in.tcp_timeout, 0.5), 5.0)
+    existing = {
+        ip: (device_id, hostname)
+        for device_id, ip, hostname in session.exec(
+            select(Device.id, Device.ipaddress, Device.hostname)
+        ).all()
+        if ip
+    }
+    write_audit_log(
+        session,
+        username=current_user.email,
+        action="discovery_scan",
+        client_ip=get_client_ip(request),
+        message=f"Streaming scan of {scan_in.cidr}: {total} hosts, port {scan_in.port}",
+    )
+
+    progress = DiscoveryScanProgress(
+        cidr=scan_in.cidr, total_hosts=total, scanned=0, open_count=0
+    )
+    last_report = time.monotonic()
+    async for ip, rtt_ms in sweep(
+        ips,
+        scan_in.port,
+        concurrency=settings.DISCOVERY_SWEEP_CONCURRENCY,
+        rate=settings.DISCOVERY_SWEEP_RATE,
+        timeout=timeout,
+    ):
+        progress.scanned += 1
+        if rtt_ms is not None:
+            progress.open_count += 1
+            device_id, hostname = existing.get(ip, (None, None))
+            yield ServerSentEvent(
+                event="host",
+                data=DiscoveryHostPublic(
+                    ip=ip,
+                    port=scan_in.port,
+                    existing=ip in existing,
+                    existing_device_id=device_id,
+                    existing_hostname=hostname,
+                ),
+            )
+        if time.monotonic() - last_report >= SCAN_PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            yield ServerSentEvent(event="progress", data=progress.model_copy())
+    yield ServerSentEvent(event="done", data=progress)
+
+
+def _decrypted_credentials(
+    session: Session, credential_ids: list[int]
+) -> list[dict[str, Any]]:
+    credentials = []
+    for cred_id in credential_ids:
+        credential = session.get(Credential, cred_id)
+        if not credential:
+            raise HTTPException(
+                status_code=404, detail=f"Credential {cred_id} not found"
+            )
+        credentials.append(
+            {
+                "id": credential.id,
+                "username": credential.username,
+                "password": decrypt_password(credential.password or ""),
+            }
+        )
+    return credentials
+
+
 @router.post("/identify", response_model=DiscoveryIdentifyPublic)
 async def discovery_identify(
     *,
@@ -112,20 +247,7 @@ async def discovery_identify(
     if not identify_in.credential_ids:
         raise HTTPException(status_code=422, detail="credential_ids must not be empty")
 
-    credentials = []
-    for cred_id in identify_in.credential_ids:
-        credential = session.get(Credential, cred_id)
-        if not credential:
-            raise HTTPException(
-                status_code=404, detail=f"Credential {cred_id} not found"
-            )
-        credentials.append(
-            {
-                "id": credential.id,
-                "username": credential.username,
-                "password": decrypt_password(credential.password or ""),
-            }
-        )
+    credentials = _decrypted_credentials(session, identify_in.credential_ids)
 
     registered = {
         s.ipaddress for s in session.exec(select(Device)).all() if s.ipaddress
@@ -135,8 +257,15 @@ async def discovery_identify(
     candidates: list[dict[str, Any]] = []
     if ips:
         candidates = await asyncio.to_thread(
-            identify_hosts_parallel, ips, identify_in.port, credentials
+            identify_hosts_parallel,
+            ips,
+            identify_in.port,
+            credentials,
+            credential_stats=load_credential_stats(session, ips),
+            cache=load_identify_cache(session, ips, identify_in.port),
         )
+        record_credential_results(session, candidates)
+        store_identify_results(session, candidates)
     write_audit_log(
         session,
         username=current_user.email,
@@ -149,6 +278,208 @@ async def discovery_identify(
     )
 
 
+@router.post("/crawl", response_model=DiscoveryCrawlPublic)
+async def discovery_crawl(
+    *,
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    crawl_in: DiscoveryCrawlRequest,
+) -> Any:
+    """
+    Discover devices from the CDP/LLDP neighbor tables of registered ones,
+    breadth-first: only management IPs that neighbors advertise are
+    identified, up to max_depth hops and max_devices new hosts.
+    """
+    _require_superuser(current_user)
+    if not crawl_in.credential_ids:
+        raise HTTPException(status_code=422, detail="credential_ids must not be empty")
+    if not 1 <= crawl_in.max_depth <= MAX_CRAWL_DEPTH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"max_depth must be between 1 and {MAX_CRAWL_DEPTH}",
+        )
+    if not 1 <= crawl_in.max_devices <= MAX_CRAWL_DEVICES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"max_devices must be between 1 and {MAX_CRAWL_DEVICES}",
+        )
+    if not 1 <= crawl_in.port <= 65535:
+        raise HTTPException(status_code=400, detail="Invalid port")
+    credentials = _decrypted_credentials(session, crawl_in.credential_ids)
+
+    known = list(session.exec(select(Device)).all())
+    seeds = known
+    if crawl_in.device_ids:
+        by_id = {d.id: d for d in known}
+        missing = [i for i in crawl_in.device_ids if i not in by_id]
+        if missing:
+            raise HTTPException(
+                status_code=404, detail=f"Device {missing[0]} not found"
+            )
+        seeds = [by_id[i] for i in dict.fromkeys(crawl_in.device_ids)]
+    if not seeds:
+        raise HTTPException(status_code=422, detail="No devices to crawl from")
+
+    def load_cache(ips: list[str]) -> IdentifyCache:
+        # Runs in the crawl's thread, so on a session of its own
+        with Session(engine) as cache_session:
+            return load_identify_cache(cache_session, ips, crawl_in.port)
+
+    result = await asyncio.to_thread(
+        crawl_neighbors,
+        seeds,
+        known,
+        crawl_in.port,
+        credentials,
+        max_depth=crawl_in.max_depth,
+        max_devices=crawl_in.max_devices,
+        credential_stats=load_credential_stats(
+            session, [d.ipaddress for d in seeds if d.ipaddress]
+        ),
+        load_cache=load_cache,
+    )
+    record_credential_results(session, result["candidates"])
+    store_identify_results(session, result["candidates"])
+    write_audit_log(
+        session,
+        username=current_user.email,
+        action="discovery_identify",
+        client_ip=get_client_ip(request),
+        message=f"Crawled neighbors of {len(seeds)} devices: "
+        f"{len(result['neighbors'])} neighbors, "
+        f"{len(result['candidates'])} hosts identified",
+    )
+    return DiscoveryCrawlPublic(
+        neighbors=[DiscoveryNeighborPublic(**n) for n in result["neighbors"]],
+        candidates=[DiscoveryCandidatePublic(**c) for c in result["candidates"]],
+        errors=[DiscoveryCrawlError(**e) for e in result["errors"]],
+    )
+
+
+@router.post("/jobs", response_model=DiscoveryJobPublic)
+async def create_identify_job(
+    *,
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_in: DiscoveryJobCreate,
+) -> Any:
+    """
+    Start a background identify job over any number of IPs. Results are
+    checkpointed per host; poll GET /jobs/{id} or stream /jobs/{id}/stream.
+    """
+    _require_superuser(current_user)
+    if not job_in.ips:
+        raise HTTPException(status_code=422, detail="ips must not be empty")
+    if not job_in.credential_ids:
+        raise HTTPException(status_code=422, detail="credential_ids must not be empty")
+    if not 1 <= job_in.port <= 65535:
+        raise HTTPException(status_code=400, detail="Invalid port")
+    for ip in job_in.ips:
+        try:
+            ipaddress.IPv4Address(ip)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Invalid IPv4 address: {ip}")
+    for cred_id in job_in.credential_ids:
+        if not session.get(Credential, cred_id):
+            raise HTTPException(
+                status_code=404, detail=f"Credential {cred_id} not found"
+            )
+
+    registered = {ip for ip in session.exec(select(Device.ipaddress)).all() if ip}
+    ips = [ip for ip in job_in.ips if ip not in registered]
+    job = create_discovery_job(
+        session,
+        ips=ips,
+        port=job_in.port,
+        credential_ids=job_in.credential_ids,
+        username=current_user.email,
+    )
+    write_audit_log(
+        session,
+        username=current_user.email,
+        action="discovery_identify",
+        client_ip=get_client_ip(request),
+        message=f"Started discovery job {job.id}: {job.total} hosts",
+    )
+    queue_discovery_job(job.id or 0)
+    return get_job_public(session, job)
+
+
+@router.get("/jobs", response_model=DiscoveryJobsPublic)
+async def read_identify_jobs(
+    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 20
+) -> Any:
+    """
+    Recent discovery jobs with their progress, newest first (no candidates).
+    """
+    _require_superuser(current_user)
+    count = session.exec(select(func.count()).select_from(DiscoveryJob)).one()
+    jobs = session.exec(
+        select(DiscoveryJob)
+        .order_by(col(DiscoveryJob.id).desc())
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    return DiscoveryJobsPublic(
+        data=[get_job_public(session, job, with_candidates=False) for job in jobs],
+        count=count,
+    )
+
+
+def _get_job(
+    session: SessionDep, current_user: CurrentUser, job_id: int
+) -> DiscoveryJob:
+    _require_superuser(current_user)
+    job = session.get(DiscoveryJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Discovery job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=DiscoveryJobPublic)
+async def read_identify_job(
+    session: SessionDep, job: Annotated[DiscoveryJob, Depends(_get_job)]
+) -> Any:
+    """
+    Progress of a discovery job and every candidate identified so far.
+    """
+    return get_job_public(session, job)
+
+
+@router.get("/jobs/{job_id}/stream", response_class=EventSourceResponse)
+async def stream_identify_job(
+    session: SessionDep, job: Annotated[DiscoveryJob, Depends(_get_job)]
+) -> AsyncIterator[ServerSentEvent]:
+    """
+    Stream a discovery job as server-sent events: "candidate" for each host
+    as it finishes (earlier results first), "progress" after each batch, and
+    "done" once the job has finished.
+    """
+    job_id = job.id or 0
+    bind = session.get_bind()
+    sent: set[int] = set()
+    while True:
+        # Short-lived sessions: the stream can outlive many result commits
+        with Session(bind) as poll:
+            current = poll.get(DiscoveryJob, job_id)
+            if current is None:
+                return
+            new_ids = set(get_finished_host_ids(poll, job_id)) - sent
+            candidates = get_candidates(poll, job_id, new_ids) if new_ids else []
+            progress = get_job_progress(poll, current)
+        sent |= new_ids
+        for candidate in candidates:
+            yield ServerSentEvent(event="candidate", data=candidate)
+        if progress.status not in UNFINISHED_STATUSES:
+            yield ServerSentEvent(event="done", data=progress)
+            return
+        if candidates:
+            yield ServerSentEvent(event="progress", data=progress)
+        await asyncio.sleep(JOB_STREAM_INTERVAL)
+
+
 @router.post("/add", response_model=DiscoveryAddPublic)
 async def discovery_add(
     *,
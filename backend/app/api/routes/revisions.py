@@ -1,16 +1,22 @@
 import asyncio
-import difflib
 import hashlib
 from typing import Any
 
 from fastapi import APIRouter, HTTPException, Request
 
 from app.api.deps import CurrentUser, SessionDep, get_client_ip
-from app.automation.config_backup import get_running_config, replace_config
+from app.automation.config_backup import (
+    get_running_config,
+    normalize_config,
+    replace_config,
+)
 from app.automation.devices import DeviceAuthenticationError, DeviceConnectionError
 from app.core import config_store
+from app.core.config_diff import unified_diff
 from app.core.config_store import ConfigStoreError
+from app.core.scheduler import config_backup_running, queue_config_backup
 from app.crud.audit import write_audit_log
+from app.crud.config_backups import get_backup_runs, get_backup_runs_count
 from app.crud.config_revisions import (
     get_previous_revision,
     get_revision,
@@ -19,11 +25,13 @@ from app.crud.config_revisions import (
     snapshot_device_config,
 )
 from app.models import (
+    ConfigBackupRunsPublic,
     ConfigRevision,
     ConfigRevisionContentPublic,
     ConfigRevisionPublic,
     ConfigRevisionsPublic,
     Device,
+    Message,
     RevisionDiffPublic,
     RollbackPreviewPublic,
     RollbackRequest,
@@ -63,6 +71,40 @@ def _device_error(exc: Exception) -> HTTPException:
     return HTTPException(status_code=400, detail=f"Connection failed: {exc}")
 
 
+@router.get("/revisions/backups", response_model=ConfigBackupRunsPublic)
+def read_backup_runs(
+    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 20
+) -> Any:
+    """
+    Summaries of scheduled fleet-wide config backup passes, newest first.
+    """
+    runs = get_backup_runs(session, skip=skip, limit=limit)
+    return ConfigBackupRunsPublic(data=runs, count=get_backup_runs_count(session))
+
+
+@router.post("/revisions/backups", response_model=Message)
+def start_backup_run(
+    request: Request, session: SessionDep, current_user: CurrentUser
+) -> Any:
+    """
+    Start a fleet-wide config backup pass now instead of waiting for the
+    scheduled one. Its summary appears in GET /revisions/backups.
+    409 while a pass (scheduled or manual) is still running.
+    """
+    _require_superuser(current_user)
+    if config_backup_running():
+        raise HTTPException(status_code=409, detail="Config backup already running")
+    queue_config_backup()
+    write_audit_log(
+        session,
+        username=current_user.email,
+        action="snapshot_config",
+        client_ip=get_client_ip(request),
+        message="Started fleet-wide config backup",
+    )
+    return Message(message="Config backup started")
+
+
 @router.post("/{id}/revisions", response_model=ConfigRevisionPublic | None)
 async def create_revision(
     *,
@@ -144,24 +186,31 @@ async def read_revision_diff(
     id: int,
     rev_id: int,
     against: str = "previous",
+    sections: bool = False,
 ) -> Any:
     """
     Diff a revision against another revision id, "previous" or "live".
+
+    With sections=true, only top-level blocks (interface, router, ...) that
+    differ are diffed, and each hunk is labelled with its block header.
     """
     device = _get_device(session, id)
     revision = _get_revision_or_404(session, id, rev_id)
     try:
         if against == "live":
-            stored = config_store.get_config_at(id, revision.commit_hash)
+            # Revisions committed before normalization still carry the
+            # volatile lines; strip both sides alike
+            stored = normalize_config(
+                device.platform, config_store.get_config_at(id, revision.commit_hash)
+            )
             live = await asyncio.to_thread(get_running_config, device)
-            diff = "\n".join(
-                difflib.unified_diff(
-                    stored.splitlines(),
-                    live.splitlines(),
-                    fromfile=f"revision-{rev_id}",
-                    tofile="live",
-                    lineterm="",
-                )
+            live = normalize_config(device.platform, live)
+            diff = unified_diff(
+                stored,
+                live,
+                fromfile=f"revision-{rev_id}",
+                tofile="live",
+                sections=sections,
             )
         else:
             if against == "previous":
@@ -174,7 +223,13 @@ async def read_revision_diff(
                 except ValueError:
                     raise HTTPException(status_code=400, detail="Invalid against value")
                 base = _get_revision_or_404(session, id, base_id)
-            diff = config_store.diff_commits(id, base.commit_hash, revision.commit_hash)
+            diff = await asyncio.to_thread(
+                config_store.diff_commits,
+                id,
+                base.commit_hash,
+                revision.commit_hash,
+                sections=sections,
+            )
     except (DeviceAuthenticationError, DeviceConnectionError) as exc:
         raise _device_error(exc)
     except ConfigStoreError as exc:
@@ -6,6 +6,7 @@ from pydantic.networks import EmailStr
 from sqlmodel import SQLModel
 
 from app.api.deps import get_current_active_superuser
+from app.automation.connection_pool import connection_pool
 from app.core.config import settings
 from app.models import Message
 from app.utils import generate_test_email, send_email
@@ -40,6 +41,24 @@ def server_info() -> ServerInfo:
     )
 
 
+class ConnectionPoolStats(SQLModel):
+    hits: int
+    misses: int
+    evictions: int
+    open_hosts: int
+    idle_seconds: int
+
+
+@router.get(
+    "/connection-pool/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=ConnectionPoolStats,
+)
+def connection_pool_stats() -> ConnectionPoolStats:
+    """Reuse counters for pooled device SSH/NAPALM sessions."""
+    return ConnectionPoolStats(**connection_pool.stats())
+
+
 @router.post(
     "/test-email/",
     dependencies=[Depends(get_current_active_superuser)],
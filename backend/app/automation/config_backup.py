@@ -1,7 +1,9 @@
-from nornir import InitNornir
+import re
+
 from nornir_napalm.plugins.tasks import napalm_configure, napalm_get
 from nornir_netmiko import netmiko_send_command
 
+from app.automation.connection_pool import pooled_nornir
 from app.automation.devices import (
     DeviceAuthenticationError,
     DeviceConnectionError,
@@ -25,6 +27,93 @@ PLATFORM_CAVEATS = {
 }
 
 
+# Cheap "did the config change?" probes: command and the line of its output
+# that moves whenever the configuration does. EOS has no such marker, so
+# its configs are always fetched in full.
+CONFIG_CHANGE_PROBES: dict[str, tuple[str, re.Pattern[str]]] = {
+    "ios": (
+        "show running-config | include Last configuration change",
+        re.compile(r"^! Last configuration change at .+$", re.MULTILINE),
+    ),
+    "nxos_ssh": (
+        'show running-config | include "last done at"',
+        re.compile(r"^!Running configuration last done at: .+$", re.MULTILINE),
+    ),
+    # Newest entry of the commit history: "0   2026-10-18 02:00:01 UTC by ..."
+    "junos": ("show system commit", re.compile(r"^0\s+\S.*$", re.MULTILINE)),
+}
+
+
+# Lines that change without a configuration change (clock, byte count and
+# last-change comments). They are dropped before a config is hashed and
+# committed so unchanged devices add no revisions.
+VOLATILE_LINES: dict[str, list[str]] = {
+    "ios": [
+        r"Building configuration\.\.\.",
+        r"Current configuration : \d+ bytes",
+        r"! Last configuration change at ",
+        r"! NVRAM config last updated at ",
+        r"! No configuration change since last restart",
+    ],
+    "nxos_ssh": [
+        r"!Time: ",
+        r"!Running configuration last done at: ",
+    ],
+    "eos": [r"! Startup-config last modified at "],
+    "junos": [r"## Last (?:commit|changed): "],
+}
+# Real config lines whose value the device rewrites on its own (IOS NTP
+# drift compensation). They are stripped like VOLATILE_LINES, and a
+# replace-mode push copies them back from the running config so it never
+# deletes them from the device.
+DEVICE_MANAGED_LINES: dict[str, list[str]] = {
+    "ios": [r"ntp clock-period \d+"],
+}
+
+
+def _lines_re(patterns: list[str]) -> re.Pattern[str]:
+    return re.compile(rf"^(?:{'|'.join(patterns)}).*\n?", re.MULTILINE)
+
+
+_VOLATILE_RE = {
+    platform: _lines_re(
+        VOLATILE_LINES.get(platform, []) + DEVICE_MANAGED_LINES.get(platform, [])
+    )
+    for platform in VOLATILE_LINES.keys() | DEVICE_MANAGED_LINES.keys()
+}
+_MANAGED_RE = {
+    platform: _lines_re(patterns) for platform, patterns in DEVICE_MANAGED_LINES.items()
+}
+
+
+def normalize_config(platform: str | None, config_text: str) -> str:
+    """Strip the platform's volatile and device-managed lines from config_text."""
+    pattern = _VOLATILE_RE.get(platform or "")
+    return pattern.sub("", config_text) if pattern else config_text
+
+
+def restore_device_managed(
+    platform: str | None, config_text: str, running_config: str
+) -> str:
+    """config_text with its device-managed lines taken from running_config,
+    placed before the first line of the same command (e.g. "ntp ") or else
+    before a closing "end"."""
+    pattern = _MANAGED_RE.get(platform or "")
+    if pattern is None:
+        return config_text
+    config_text = pattern.sub("", config_text)
+    managed = [m.group(0).rstrip("\n") for m in pattern.finditer(running_config)]
+    if not managed:
+        return config_text
+    lines = config_text.splitlines()
+    command = managed[0].split()[0] + " "
+    same = [i for i, line in enumerate(lines) if line.startswith(command)]
+    ends = [i for i, line in enumerate(lines) if line.strip() == "end"]
+    at = same[0] if same else ends[-1] if ends else len(lines)
+    lines[at:at] = managed
+    return "\n".join(lines) + "\n"
+
+
 def _first_exception(result, hostname: str) -> Exception | None:
     if hostname not in result:
         return None
@@ -47,10 +136,8 @@ def _raise_for_failure(result, device: Device) -> None:
 
 def get_running_config(device: Device) -> str:
     """Fetch the device's full running configuration as text."""
-    nr = InitNornir(config_file="./app/automation/config.yaml")
-    try:
-        rtr = nr.filter(name=device.hostname)
-        result = rtr.run(
+    with pooled_nornir(name=device.hostname) as nr:
+        result = nr.run(
             task=napalm_get,
             getters=["config"],
             getters_options={"config": {"retrieve": "running"}},
@@ -66,14 +153,28 @@ def get_running_config(device: Device) -> str:
             if device.platform == "junos"
             else "show running-config"
         )
-        fallback = rtr.run(
+        fallback = nr.run(
             task=netmiko_send_command, command_string=command, on_failed=True
         )
         if fallback.failed or device.hostname not in fallback:
             _raise_for_failure(fallback, device)
         return str(fallback[device.hostname].result)
-    finally:
-        nr.close_connections()
+
+
+def get_config_change_marker(device: Device) -> str | None:
+    """The platform's last-config-change marker, or None when the platform
+    has no probe or the device did not report one."""
+    probe = CONFIG_CHANGE_PROBES.get(device.platform or "")
+    if probe is None:
+        return None
+    command, pattern = probe
+    with pooled_nornir(name=device.hostname) as nr:
+        result = nr.run(task=netmiko_send_command, command_string=command)
+        if result.failed:
+            _raise_for_failure(result, device)
+        output = str(result[device.hostname].result or "")
+    match = pattern.search(output)
+    return match.group(0).strip() if match else None
 
 
 def get_compliance_config(device: Device) -> str:
@@ -85,39 +186,32 @@ def get_compliance_config(device: Device) -> str:
     from `show running-config`, so we also fetch `show ip ssh` operational evidence.
     """
     if device.platform == "junos":
-        nr = InitNornir(config_file="./app/automation/config.yaml")
-        try:
-            rtr = nr.filter(name=device.hostname)
-            result = rtr.run(
+        with pooled_nornir(name=device.hostname) as nr:
+            result = nr.run(
                 task=netmiko_send_command,
                 command_string="show configuration | display set",
             )
             if result.failed:
                 _raise_for_failure(result, device)
             return str(result[device.hostname].result)
-        finally:
-            nr.close_connections()
 
     config = get_running_config(device)
 
     if device.platform == "ios":
-        nr = InitNornir(config_file="./app/automation/config.yaml")
         try:
-            rtr = nr.filter(name=device.hostname)
-            for cmd in ("show ip ssh", "show line vty 0"):
-                res = rtr.run(
-                    task=netmiko_send_command,
-                    command_string=cmd,
-                    on_failed=True,
-                )
-                if not res.failed and device.hostname in res:
-                    cmd_info = str(res[device.hostname].result or "").strip()
-                    if cmd_info:
-                        config = f"{config}\n{cmd_info}"
+            with pooled_nornir(name=device.hostname) as nr:
+                for cmd in ("show ip ssh", "show line vty 0"):
+                    res = nr.run(
+                        task=netmiko_send_command,
+                        command_string=cmd,
+                        on_failed=True,
+                    )
+                    if not res.failed and device.hostname in res:
+                        cmd_info = str(res[device.hostname].result or "").strip()
+                        if cmd_info:
+                            config = f"{config}\n{cmd_info}"
         except Exception:
             pass
-        finally:
-            nr.close_connections()
 
     return config
 
@@ -131,11 +225,15 @@ def replace_config(
     replace=False: merge (load_merge_candidate).
     dry_run=True: compare only, discard candidate — returns the diff without
     touching the running config.
+    A replace keeps the device's current DEVICE_MANAGED_LINES, which stored
+    revisions don't carry.
     """
-    nr = InitNornir(config_file="./app/automation/config.yaml")
-    try:
-        rtr = nr.filter(name=device.hostname)
-        result = rtr.run(
+    if replace and device.platform in DEVICE_MANAGED_LINES:
+        config_text = restore_device_managed(
+            device.platform, config_text, get_running_config(device)
+        )
+    with pooled_nornir(name=device.hostname, operation="config") as nr:
+        result = nr.run(
             task=napalm_configure,
             configuration=config_text,
             replace=replace,
@@ -149,5 +247,3 @@ def replace_config(
             "changed": host_result.changed,
             "caveats": PLATFORM_CAVEATS.get(device.platform or "", ""),
         }
-    finally:
-        nr.close_connections()
@@ -0,0 +1,267 @@
+"""Per-device pool of open Nornir connections.
+
+Logging in is the slowest part of most device operations (enable secrets,
+EOS delay factors), so hosts keep their netmiko/NAPALM sessions between
+operations. A device is checked out only while a task runs on it, so a
+fleet-wide or group operation holds each device for that device's own task
+rather than for the whole run, and every device still has a single
+concurrent channel. A task that cannot get its device within
+NORNIR_CONNECTION_WAIT_SECONDS fails for that device alone. Idle sessions
+are closed after NORNIR_CONNECTION_IDLE_SECONDS, and a session that fails a
+liveness check, or belongs to a host whose task failed, is never reused.
+"""
+
+import functools
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from nornir.core import Nornir
+from nornir.core.inventory import Host
+from nornir.core.plugins.runners import RunnerPlugin
+from nornir.core.task import AggregatedResult, Result, Task
+
+from app.automation.nornir_factory import Operation, make_view, select_hosts
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceBusyError(Exception):
+    pass
+
+
+@dataclass
+class _Entry:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    connections: dict[str, Any] = field(default_factory=dict)
+    definition: str = ""
+    last_used: float = 0.0
+    # Set when the device is deleted while a task holds it
+    removed: bool = False
+
+
+def _definition(host: Host) -> str:
+    # Effective connection parameters, so edits to the device, its
+    # credential or its groups all invalidate the pooled sessions.
+    params = {
+        conn: host.get_connection_parameters(conn).dict()
+        for conn in ("netmiko", "napalm")
+    }
+    return json.dumps([host.dict(), params], sort_keys=True, default=str)
+
+
+def _is_alive(plugin: Any) -> bool:
+    try:
+        alive = plugin.connection.is_alive()
+    except Exception:
+        return False
+    # NAPALM drivers return {"is_alive": bool}, netmiko returns a bool
+    if isinstance(alive, dict):
+        return bool(alive.get("is_alive"))
+    return bool(alive)
+
+
+def _close_all(name: str, connections: dict[str, Any]) -> int:
+    closed = 0
+    for conn, plugin in list(connections.items()):
+        try:
+            plugin.close()
+        except Exception as exc:
+            logger.debug("Error closing %s session to %s: %s", conn, name, exc)
+        closed += 1
+    connections.clear()
+    return closed
+
+
+class _PooledRunner:
+    """Wraps a view's runner so each host's task runs with that host
+    checked out of the pool."""
+
+    def __init__(self, pool: "ConnectionPool", runner: RunnerPlugin) -> None:
+        self.pool = pool
+        self.runner = runner
+
+    def run(self, task: Task, hosts: list[Host]) -> AggregatedResult:
+        task.task = self.pool._pooled(task.task)
+        return self.runner.run(task, hosts)
+
+
+class ConnectionPool:
+    def __init__(
+        self, idle_seconds: int | None = None, wait_seconds: float | None = None
+    ) -> None:
+        self._idle_seconds = idle_seconds
+        self._wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[str, _Entry] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def idle_seconds(self) -> int:
+        if self._idle_seconds is not None:
+            return self._idle_seconds
+        return settings.NORNIR_CONNECTION_IDLE_SECONDS
+
+    @property
+    def wait_seconds(self) -> float:
+        if self._wait_seconds is not None:
+            return self._wait_seconds
+        return settings.NORNIR_CONNECTION_WAIT_SECONDS
+
+    def _entry(self, name: str) -> _Entry:
+        with self._lock:
+            return self._entries.setdefault(name, _Entry())
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for key, delta in deltas.items():
+                setattr(self, key, getattr(self, key) + delta)
+
+    def _checkout(self, host: Host) -> _Entry:
+        """Lock the host's entry and lend it the entry's live sessions."""
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            entry = self._entry(host.name)
+            if not entry.lock.acquire(timeout=max(0, deadline - time.monotonic())):
+                raise DeviceBusyError(
+                    f"{host.name} is busy with another operation "
+                    f"(waited {self.wait_seconds:g}s)"
+                )
+            # evict_idle may have dropped the entry while we waited on it
+            with self._lock:
+                if entry.removed or self._entries.get(host.name) is entry:
+                    break
+            entry.lock.release()
+        try:
+            definition = _definition(host)
+            connections = entry.connections
+            if connections:
+                if entry.definition != definition:
+                    _close_all(host.name, connections)
+                elif time.monotonic() - entry.last_used > self.idle_seconds:
+                    self._count(evictions=_close_all(host.name, connections))
+                else:
+                    for name, plugin in list(connections.items()):
+                        if not _is_alive(plugin):
+                            connections.pop(name)
+                            try:
+                                plugin.close()
+                            except Exception:
+                                pass
+                            self._count(evictions=1)
+        except BaseException:
+            entry.lock.release()
+            raise
+        if connections:
+            self._count(hits=1)
+        else:
+            self._count(misses=1)
+        entry.definition = definition
+        host.connections = connections
+        return entry
+
+    def _checkin(self, entry: _Entry, host: Host, keep: bool) -> None:
+        """Take the sessions back from host and unlock its entry."""
+        if not keep or entry.removed or self.idle_seconds <= 0:
+            _close_all(host.name, host.connections)
+        entry.connections = host.connections
+        host.connections = {}
+        entry.last_used = time.monotonic()
+        entry.lock.release()
+
+    def _pooled(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def run(task: Task, **kwargs: Any) -> Any:
+            entry = self._checkout(task.host)
+            keep = False
+            try:
+                result = func(task, **kwargs)
+                keep = not (isinstance(result, Result) and result.failed)
+                return result
+            finally:
+                self._checkin(entry, task.host, keep)
+
+        return run
+
+    @contextmanager
+    def session(
+        self, *args: Any, operation: Operation = "read", **kwargs: Any
+    ) -> Iterator[Nornir]:
+        """A Nornir view of the matching hosts that runs tasks on pooled sessions.
+
+        Takes the same arguments as Nornir.filter(), plus the operation type
+        used to size the runner. Each host is checked out only for the
+        duration of its own task.
+        """
+        nr = make_view(select_hosts(*args, **kwargs), operation=operation)
+        yield nr.with_runner(_PooledRunner(self, nr.runner))
+
+    def forget(self, name: str) -> None:
+        """Drop a deleted or renamed device's entry and close its sessions."""
+        with self._lock:
+            entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        entry.removed = True
+        if entry.lock.acquire(blocking=False):
+            try:
+                _close_all(name, entry.connections)
+            finally:
+                entry.lock.release()
+
+    def evict_idle(self) -> int:
+        """Close sessions idle for longer than the TTL and drop their entries;
+        returns the number of sessions closed."""
+        with self._lock:
+            entries = list(self._entries.items())
+        deadline = time.monotonic() - self.idle_seconds
+        evicted = 0
+        for name, entry in entries:
+            if entry.last_used > deadline or not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                evicted += _close_all(name, entry.connections)
+                with self._lock:
+                    if self._entries.get(name) is entry:
+                        del self._entries[name]
+            finally:
+                entry.lock.release()
+        if evicted:
+            self._count(evictions=evicted)
+        return evicted
+
+    def close_all(self) -> None:
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        for name, entry in entries:
+            _close_all(name, entry.connections)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            open_hosts = sum(1 for e in self._entries.values() if e.connections)
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "open_hosts": open_hosts,
+                "idle_seconds": self.idle_seconds,
+            }
+
+
+connection_pool = ConnectionPool()
+
+
+def pooled_nornir(
+    *args: Any, operation: Operation = "read", **kwargs: Any
+) -> AbstractContextManager[Nornir]:
+    """Shortcut for connection_pool.session()."""
+    return connection_pool.session(*args, operation=operation, **kwargs)
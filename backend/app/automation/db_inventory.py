@@ -0,0 +1,227 @@
+"""Nornir inventory plugin backed by the device and credential tables.
+
+Hosts are read straight from the database, so every worker process sees a
+device edit immediately and no inventory file has to be regenerated. Host
+loading can be narrowed to a few names or a single group, which keeps
+single-device operations from querying (and decrypting credentials for)
+the whole fleet. Groups and defaults still come from the small YAML files
+written by group CRUD.
+"""
+
+import logging
+import pathlib
+from collections.abc import Iterable
+from typing import Any
+
+import ruamel.yaml
+from nornir.core.inventory import (
+    ConnectionOptions,
+    Defaults,
+    Group,
+    Groups,
+    Host,
+    Hosts,
+    Inventory,
+    ParentGroups,
+)
+from nornir.core.plugins.inventory import InventoryPluginRegister
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.crypto import decrypt_password
+from app.models import Credential, Device
+
+logger = logging.getLogger(__name__)
+
+
+def _yaml_connection_options(data: dict[str, Any]) -> dict[str, ConnectionOptions]:
+    return {
+        name: ConnectionOptions(
+            hostname=options.get("hostname"),
+            port=options.get("port"),
+            username=options.get("username"),
+            password=options.get("password"),
+            platform=options.get("platform"),
+            extras=options.get("extras"),
+        )
+        for name, options in data.items()
+    }
+
+
+def _yaml_defaults(data: dict[str, Any]) -> Defaults:
+    return Defaults(
+        hostname=data.get("hostname"),
+        port=data.get("port"),
+        username=data.get("username"),
+        password=data.get("password"),
+        platform=data.get("platform"),
+        data=data.get("data"),
+        connection_options=_yaml_connection_options(
+            data.get("connection_options") or {}
+        ),
+    )
+
+
+def _yaml_group(name: str, data: dict[str, Any], defaults: Defaults) -> Group:
+    return Group(
+        name=name,
+        hostname=data.get("hostname"),
+        port=data.get("port"),
+        username=data.get("username"),
+        password=data.get("password"),
+        platform=data.get("platform"),
+        data=data.get("data"),
+        defaults=defaults,
+        connection_options=_yaml_connection_options(
+            data.get("connection_options") or {}
+        ),
+    )
+
+
+def _connection_options(
+    platform: str | None, enable_password: str
+) -> dict[str, ConnectionOptions]:
+    if platform == "eos":
+        return {
+            "napalm": ConnectionOptions(
+                extras={
+                    "optional_args": {
+                        "transport": "ssh",
+                        "secret": enable_password,
+                        "global_delay_factor": 2,
+                        "fast_cli": False,
+                    }
+                }
+            ),
+            "netmiko": ConnectionOptions(
+                platform="arista_eos",
+                extras={
+                    "secret": enable_password,
+                    "global_delay_factor": 2,
+                    "fast_cli": False,
+                },
+            ),
+        }
+    if platform in ("ios", "nxos_ssh"):
+        return {
+            "napalm": ConnectionOptions(
+                extras={"optional_args": {"secret": enable_password}}
+            ),
+            "netmiko": ConnectionOptions(extras={"secret": enable_password}),
+        }
+    return {}
+
+
+def build_host(
+    device: Device,
+    credential: Credential | None,
+    groups: Groups,
+    defaults: Defaults,
+) -> Host:
+    """Build the Nornir host for a device row and its (optional) credential."""
+    if device.credential_id and device.credential_id > 0 and credential:
+        username = credential.username
+        password = decrypt_password(credential.password) if credential.password else ""
+        enable_password = (
+            decrypt_password(credential.enable_password)
+            if credential.enable_password
+            else password
+        )
+    else:
+        username = settings.NETWORK_USERNAME
+        password = settings.NETWORK_PASSWORD
+        enable_password = settings.NETWORK_PASSWORD
+
+    parents = []
+    for name in (device.groups or "").split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name in groups:
+            parents.append(groups[name])
+        else:
+            logger.warning(
+                "Device %s references unknown group %s", device.hostname, name
+            )
+
+    return Host(
+        name=device.hostname,
+        hostname=device.ipaddress,
+        port=device.port or None,
+        username=username,
+        password=password,
+        platform=device.platform,
+        groups=ParentGroups(parents),
+        connection_options=_connection_options(device.platform, enable_password),
+        defaults=defaults,
+    )
+
+
+class DBInventory:
+    def __init__(
+        self,
+        group_file: str = "groups.yaml",
+        defaults_file: str = "defaults.yaml",
+        encoding: str = "utf-8",
+    ) -> None:
+        self.group_file = pathlib.Path(group_file).expanduser()
+        self.defaults_file = pathlib.Path(defaults_file).expanduser()
+        self.encoding = encoding
+
+    def _read_yaml(self, path: pathlib.Path) -> dict[str, Any]:
+        if not path.exists():
+            return {}
+        yml = ruamel.yaml.YAML(typ="safe")
+        with open(path, encoding=self.encoding) as f:
+            return yml.load(f) or {}
+
+    def load_groups(self) -> tuple[Groups, Defaults]:
+        defaults = _yaml_defaults(self._read_yaml(self.defaults_file))
+        group_data = self._read_yaml(self.group_file)
+        groups = Groups()
+        for name, data in group_data.items():
+            groups[name] = _yaml_group(name, data or {}, defaults)
+        # Parents are linked once every group exists, since files list them
+        # in any order
+        for name, data in group_data.items():
+            groups[name].groups = ParentGroups(
+                [groups[g] for g in (data or {}).get("groups") or []]
+            )
+        return groups, defaults
+
+    def load_hosts(
+        self,
+        groups: Groups,
+        defaults: Defaults,
+        names: Iterable[str] | None = None,
+        group: str | None = None,
+    ) -> Hosts:
+        """Load hosts, optionally narrowed by hostname or group membership.
+
+        The group narrowing is a substring match on the comma-separated
+        groups column; callers filter the result exactly.
+        """
+        from app.core.db import engine
+
+        statement = select(Device, Credential).outerjoin(
+            Credential, Device.credential_id == Credential.id
+        )
+        if names is not None:
+            statement = statement.where(Device.hostname.in_(list(names)))
+        if group:
+            statement = statement.where(Device.groups.contains(group, autoescape=True))
+        with Session(engine) as session:
+            rows = session.exec(statement).all()
+        hosts = Hosts()
+        for device, credential in rows:
+            hosts[device.hostname] = build_host(device, credential, groups, defaults)
+        return hosts
+
+    def load(self) -> Inventory:
+        groups, defaults = self.load_groups()
+        return Inventory(
+            hosts=self.load_hosts(groups, defaults), groups=groups, defaults=defaults
+        )
+
+
+InventoryPluginRegister.register("DBInventory", DBInventory)
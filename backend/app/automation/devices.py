@@ -1,12 +1,19 @@
 import ast
+import logging
+from collections.abc import Callable
+from typing import Any
 
-from nornir import InitNornir
+from nornir.core.inventory import Host
+from nornir.core.task import AggregatedResult, MultiResult, Task
 from nornir_netmiko import netmiko_send_command
 from ttp import ttp
 
+from app.automation.connection_pool import pooled_nornir
 from app.models import Device
 from app.vendor import JUNOS1
 
+logger = logging.getLogger(__name__)
+
 """
 Device config to allow tool:
 
@@ -126,37 +133,31 @@ def parser_show_interface_status(data: list):
     return intf_list
 
 
-def show_interfaces_status(device: Device):
+# CLI commands whose output feeds parse_interfaces_status, per platform
+INTERFACE_STATUS_COMMANDS: dict[str, list[str]] = {
+    "eos": ["show interface status"],
+    "ios": ["show interface status", "show running-config | section interface"],
+    "nxos_ssh": [
+        "show interface status",
+        "show running-config | section interface",
+    ],
+    "junos": ["show configuration interfaces"],
+}
 
-    nr = InitNornir(config_file="./app/automation/config.yaml")
-    rtr = nr.filter(name=device.hostname)
+
+def parse_interfaces_status(device: Device, outputs: dict[str, str]) -> list[dict]:
+    """Build the interface list from raw INTERFACE_STATUS_COMMANDS output."""
     if device.platform == "eos":
-        result = rtr.run(
-            task=netmiko_send_command, command_string="show interface status"
-        )
-        result_dict = {host: task.result for host, task in result.items()}
-        nr.close_connections()
         return parser_show_interface_status(
-            data=result_dict[device.hostname].split("\n")
+            data=outputs.get("show interface status", "").split("\n")
         )
     elif device.platform in ["ios", "nxos_ssh"]:
-        result = rtr.run(
-            task=netmiko_send_command, command_string="show interface status"
-        )
-        result_dict = {host: task.result for host, task in result.items()}
-
-        result2 = rtr.run(
-            task=netmiko_send_command,
-            command_string="show running-config | section interface",
-        )
-        result_dict2 = {host: task.result for host, task in result2.items()}
-
-        nr.close_connections()
         list_interfaces = parser_show_interface_status(
-            data=result_dict[device.hostname].split("\n")
+            data=outputs.get("show interface status", "").split("\n")
         )
         result_run_interface = show_run_interface(
-            data=result_dict2[device.hostname], device=device
+            data=outputs.get("show running-config | section interface", ""),
+            device=device,
         )
 
         list_run_interfaces = []
@@ -169,13 +170,8 @@ def show_interfaces_status(device: Device):
                     break
         return list_run_interfaces
     elif device.platform == "junos":
-        result = rtr.run(
-            task=netmiko_send_command, command_string="show configuration interfaces"
-        )
-        result_dict = {host: task.result for host, task in result.items()}
-        nr.close_connections()
         result_run_interface = show_run_interface(
-            data=result_dict[device.hostname], device=device
+            data=outputs.get("show configuration interfaces", ""), device=device
         )
         list_run_interfaces = []
         for interface_info in result_run_interface:
@@ -206,6 +202,17 @@ def show_interfaces_status(device: Device):
                 )
             list_run_interfaces.append(interface_dict)
         return list_run_interfaces
+    return []
+
+
+def show_interfaces_status(device: Device):
+
+    outputs: dict[str, str] = {}
+    with pooled_nornir(name=device.hostname) as nr:
+        for command in INTERFACE_STATUS_COMMANDS.get(device.platform or "", []):
+            result = nr.run(task=netmiko_send_command, command_string=command)
+            outputs[command] = str(result[device.hostname].result or "")
+    return parse_interfaces_status(device, outputs)
 
 
 class DeviceAuthenticationError(Exception):
@@ -242,13 +249,22 @@ def is_auth_error(exc: Exception) -> bool:
     return any(kw in exc_str for kw in auth_keywords)
 
 
-def _safe_napalm_get_task(task, getters: list[str]):
+def _safe_napalm_get_task(task, getters: list[str], cli: bool = False):
+    """Run NAPALM getters and, with cli=True, the platform's interface status
+    commands over the same NAPALM session, so a device is logged into once.
+
+    A getter (or "cli") that fails is logged, left empty and named in
+    res["errors"], so callers can tell a failure from an empty table.
+    """
     device = task.host.get_connection("napalm", task.nornir.config)
-    res = {}
+    res: dict[str, Any] = {}
+    errors: dict[str, str] = {}
     for getter in getters:
         try:
             res[getter] = getattr(device, getter)()
-        except Exception:
+        except Exception as exc:
+            logger.warning("%s failed on %s", getter, task.host.name, exc_info=True)
+            errors[getter] = str(exc)
             if getter in ("get_mac_address_table", "get_arp_table"):
                 res[getter] = []
             else:
@@ -259,12 +275,24 @@ def _safe_napalm_get_task(task, getters: list[str]):
         facts.setdefault("vendor", "Juniper")
         facts.setdefault("hostname", task.host.name)
     res["get_facts"] = facts
+
+    if cli:
+        commands = INTERFACE_STATUS_COMMANDS.get(task.host.platform or "", [])
+        try:
+            res["cli"] = device.cli(commands) if commands else {}
+        except Exception as exc:
+            logger.warning(
+                "Interface status commands failed on %s",
+                task.host.name,
+                exc_info=True,
+            )
+            errors["cli"] = str(exc)
+            res["cli"] = {}
+    res["errors"] = errors
     return res
 
 
-def get_metadata(device: Device):
-    nr = InitNornir(config_file="./app/automation/config.yaml")
-    rtr = nr.filter(name=device.hostname)
+def get_metadata(device: Device, cli: bool = False):
     getters = [
         "get_facts",
         "get_mac_address_table",
@@ -274,13 +302,14 @@ def get_metadata(device: Device):
     if device.platform == "junos":
         getters.append("get_interfaces")
 
-    result = rtr.run(
-        task=_safe_napalm_get_task,
-        getters=getters,
-    )
+    with pooled_nornir(name=device.hostname) as nr:
+        result = nr.run(
+            task=_safe_napalm_get_task,
+            getters=getters,
+            cli=cli,
+        )
 
     if result.failed:
-        nr.close_connections()
         exc = None
         if device.hostname in result:
             host_result = result[device.hostname]
@@ -300,25 +329,69 @@ def get_metadata(device: Device):
     result_dict = {
         host: task.result for host, task in result.items() if not task.failed
     }
-    nr.close_connections()
     return result_dict
 
 
-def get_metadata_all():
-    nr = InitNornir(config_file="./app/automation/config.yaml")
-    result = nr.run(
-        task=_safe_napalm_get_task,
-        getters=[
-            "get_facts",
-            "get_mac_address_table",
-            "get_arp_table",
-            "get_interfaces_ip",
-            "get_interfaces",
-        ],
-    )
+class _StreamHostResults:
+    """Nornir processor handing each host's result to a callback as soon as
+    that host finishes, then dropping the payload so the aggregated result
+    never holds more than a handful of devices' tables at once.
+    """
 
-    result_dict = {
-        host: task.result for host, task in result.items() if not task.failed
-    }
-    nr.close_connections()
-    return result_dict
+    def __init__(self, handler: Callable[[str, dict], None]) -> None:
+        self.handler = handler
+        self.failed: dict[str, str] = {}
+
+    def task_instance_completed(
+        self, task: Task, host: Host, result: MultiResult
+    ) -> None:
+        if result.failed:
+            self.failed[host.name] = str(result.exception or "task failed")
+        else:
+            try:
+                self.handler(host.name, result[0].result)
+            except Exception as exc:
+                logger.exception("Ingesting metadata for %s failed", host.name)
+                self.failed[host.name] = str(exc)
+        for res in result:
+            res.result = None
+
+    def task_started(self, task: Task) -> None:
+        pass
+
+    def task_completed(self, task: Task, result: AggregatedResult) -> None:
+        pass
+
+    def task_instance_started(self, task: Task, host: Host) -> None:
+        pass
+
+    def subtask_instance_started(self, task: Task, host: Host) -> None:
+        pass
+
+    def subtask_instance_completed(
+        self, task: Task, host: Host, result: MultiResult
+    ) -> None:
+        pass
+
+
+def get_metadata_all(handler: Callable[[str, dict], None]) -> dict[str, str]:
+    """Run the metadata getters on every device, streaming results.
+
+    ``handler(hostname, facts)`` is called from the runner's worker thread
+    as each device completes. Returns ``{hostname: error}`` for devices
+    whose collection or handler failed.
+    """
+    stream = _StreamHostResults(handler)
+    with pooled_nornir() as nr:
+        nr.with_processors([stream]).run(
+            task=_safe_napalm_get_task,
+            getters=[
+                "get_facts",
+                "get_mac_address_table",
+                "get_arp_table",
+                "get_interfaces_ip",
+                "get_interfaces",
+            ],
+            cli=True,
+        )
+    return stream.failed
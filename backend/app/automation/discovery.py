@@ -1,8 +1,11 @@
 """Subnet-scan device discovery: TCP sweep, SSH platform detect, facts."""
 
+import asyncio
 import ipaddress
 import re
+import socket
 import time
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Mapping
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
@@ -10,7 +13,8 @@ import napalm
 import paramiko
 
 from app.automation.devices import is_auth_error
-from app.automation.health import _tcp_check
+from app.automation.health import RateLimiter, _tcp_check, probe
+from app.core.config import settings
 
 # Netmiko device_type -> (platform, device_type) as stored on Device
 PLATFORM_MAP: dict[str, tuple[str, str]] = {
@@ -33,25 +37,65 @@ _VERSION_PATTERNS: list[tuple[re.Pattern[str], str]] = [
     ),
 ]
 
+# Extra commands run on the detection session when "show version" lacks
+# facts (Junos prints the chassis serial only in the hardware inventory)
+_FACT_COMMANDS: dict[str, tuple[str, ...]] = {
+    "juniper_junos": ("show chassis hardware",),
+}
+
+PLATFORM_VENDORS: dict[str, str] = {
+    "ios": "Cisco",
+    "nxos_ssh": "Cisco",
+    "junos": "Juniper",
+    "eos": "Arista",
+}
+
 MAX_SCAN_HOSTS = 1024
 
+# Learned credential successes: {(kind, scope): {credential_id: successes}}
+# with kind "subnet" (scope "10.1.2.0/24") or "banner" (scope "Cisco-1.25")
+CredentialStats = Mapping[tuple[str, str], Mapping[int, int]]
 
-def expand_cidr(cidr: str, max_hosts: int = MAX_SCAN_HOSTS) -> list[str]:
-    """Expand a CIDR into usable host IPs. Raises ValueError on bad input."""
+# Earlier identify results: {(ip, port): (host key fingerprint, candidate)}
+IdentifyCache = Mapping[tuple[str, int], tuple[str, dict[str, Any]]]
+
+# Called on the detection session once a supported platform is identified,
+# as on_session(platform, send), to run more commands over the same login;
+# send(command) returns the command's output without echo or prompt.
+SessionHook = Callable[[str, Callable[[str], str]], None]
+
+
+def iter_cidr(cidr: str, max_hosts: int) -> tuple[int, Iterator[str]]:
+    """Validate a CIDR and return (host count, lazy iterator of host IPs).
+
+    Addresses are produced on demand, so a /16 costs no more memory than a
+    /29. Raises ValueError on bad input or more than max_hosts hosts.
+    """
     try:
         network = ipaddress.ip_network(cidr.strip(), strict=False)
     except ValueError:
         raise ValueError(f"Invalid CIDR: {cidr}")
     if network.version != 4:
         raise ValueError("Only IPv4 subnets are supported")
-    hosts = [str(h) for h in network.hosts()]
-    if not hosts:
-        hosts = [str(network.network_address)]
-    if len(hosts) > max_hosts:
+    # /31 and /32 have no network/broadcast address to skip
+    total = network.num_addresses
+    if network.prefixlen < 31:
+        total -= 2
+    if total > max_hosts:
+        smallest = 33 - (max_hosts + 2).bit_length()
         raise ValueError(
-            f"Subnet too large: {len(hosts)} hosts (max {max_hosts}, use /22 or smaller)"
+            f"Subnet too large: {total} hosts "
+            f"(max {max_hosts}, use /{smallest} or smaller)"
         )
-    return hosts
+    if network.prefixlen == 32:
+        return total, iter([str(network.network_address)])
+    return total, (str(h) for h in network.hosts())
+
+
+def expand_cidr(cidr: str, max_hosts: int = MAX_SCAN_HOSTS) -> list[str]:
+    """Expand a CIDR into usable host IPs. Raises ValueError on bad input."""
+    _, hosts = iter_cidr(cidr, max_hosts)
+    return list(hosts)
 
 
 def sanitize_hostname(raw: str) -> str:
@@ -80,6 +124,46 @@ def scan_subnet(
     return sorted(open_ips, key=lambda ip: ipaddress.ip_address(ip))
 
 
+async def sweep(
+    ips: Iterable[str],
+    port: int,
+    *,
+    concurrency: int,
+    rate: float,
+    timeout: float,
+) -> AsyncIterator[tuple[str, float | None]]:
+    """Probe ips with async TCP connects, yielding (ip, rtt_ms or None) as
+    each probe finishes.
+
+    A fixed set of ``concurrency`` workers pulls from the shared iterator, so
+    only the addresses in flight are ever materialised; new connects start
+    at most ``rate`` per second. Results come back in completion order.
+    """
+    addresses = iter(ips)
+    limiter = RateLimiter(rate)
+    workers = max(1, concurrency)
+    # None marks a worker that ran out of addresses
+    done: asyncio.Queue[tuple[str, float | None] | None] = asyncio.Queue(workers)
+
+    async def worker() -> None:
+        for ip in addresses:
+            await limiter.acquire()
+            await done.put((ip, await probe(ip, port, timeout)))
+        await done.put(None)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        while workers:
+            item = await done.get()
+            if item is None:
+                workers -= 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 def _get_facts(ip: str, port: int, platform: str, cred: dict) -> dict[str, Any]:
     driver = napalm.get_network_driver(platform)
     device = driver(
@@ -98,55 +182,99 @@ def _get_facts(ip: str, port: int, platform: str, cred: dict) -> dict[str, Any]:
             pass
 
 
+# Last line of the buffer looks like a CLI prompt: "sw1#", "user@r1>", "sw1(config)#"
+_PROMPT_RE = re.compile(r"(?:^|\n)([^\n]*[#>$%])[ \t]*$")
+# The same prompt-like line twice in a row, as after answering a prompt with a
+# bare newline. Banner lines ending in # or > do not repeat like this.
+_REPEATED_PROMPT_RE = re.compile(
+    r"(?:^|\n)\r*([^\r\n]*[#>$%])[ \t]*(?:\r?\n\r*)+\1[ \t]*$"
+)
+# Pager waiting for a keypress: "--More--", " --More-- ", "---(more 42%)---"
+_PAGER_RE = re.compile(r"-+\s*\(?more\b[^\n]*-+\s*$", re.IGNORECASE)
+
+
+def _read_until(
+    shell: Any, pattern: re.Pattern[str], deadline: float, buffer: str = ""
+) -> str:
+    """Read from an interactive channel until pattern matches the buffered
+    output, the channel closes, or the monotonic deadline passes.
+
+    Blocks in recv() rather than sleeping, so it returns as soon as the
+    expected text arrives. Pager prompts are answered with a space. New
+    output is appended to ``buffer`` when given.
+    """
+    while (remaining := deadline - time.monotonic()) > 0:
+        shell.settimeout(remaining)
+        try:
+            chunk = shell.recv(65535)
+        except TimeoutError:
+            break
+        if not chunk:
+            break
+        buffer += chunk.decode("utf-8", errors="ignore")
+        if _PAGER_RE.search(buffer[-80:]):
+            shell.sendall(b" ")
+            continue
+        if pattern.search(buffer):
+            break
+    return buffer
+
+
+def _paging_command(prompt: str) -> bytes:
+    """Disable paging: Junos operational prompts are "user@host>"."""
+    if "@" in prompt and prompt.endswith(">"):
+        return b"set cli screen-length 0\n"
+    return b"terminal length 0\n"
+
+
 def _ssh_detect(
-    ip: str, port: int, cred: dict, timeout: int = 5
+    ip: str,
+    port: int,
+    cred: dict,
+    timeout: int = 5,
+    transport: paramiko.Transport | None = None,
+    on_session: SessionHook | None = None,
 ) -> tuple[str | None, str | None, str]:
     """SSH into the device, run 'show version', and detect platform from output.
 
     Returns (device_type, prompt_hostname, version_text) on success,
-    or (None, None, "") on failure.
+    or (None, None, "") on failure. For a detected platform version_text also
+    holds the output of its _FACT_COMMANDS.
     Much faster and more reliable than Netmiko SSHDetect for devices like
-    Juniper cRPD that autodetect cannot identify.
+    Juniper cRPD that autodetect cannot identify. Each step reads until the
+    prompt comes back (at most ``timeout`` seconds), so responsive devices
+    are identified in a few round trips instead of fixed sleeps.
+    Logs in on transport when given (see _ssh_connect) and closes it.
+    on_session, if given, runs last on the same session (see SessionHook);
+    its errors are ignored.
     """
-    client = paramiko.SSHClient()
-    # Trust-on-first-use is inherent to subnet discovery: target IPs are
-    # unidentified devices with no pre-shared host key to verify against.
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # nosec B507
     try:
-        client.connect(
-            hostname=ip,
-            port=port,
-            username=cred["username"],
-            password=cred["password"],
-            timeout=timeout,
-            look_for_keys=False,
-            allow_agent=False,
-            banner_timeout=timeout,
-            auth_timeout=timeout,
+        if transport is None:
+            transport = _ssh_connect(ip, port, timeout)
+        transport.auth_password(cred["username"], cred["password"])
+        shell = transport.open_session(timeout=timeout)
+        shell.get_pty(width=511)
+        shell.invoke_shell()
+
+        # Banner/MOTD followed by the first prompt. A banner line can end in
+        # # or > too, so answer with a newline and take the line that comes
+        # back twice; failing that, the last line (like netmiko find_prompt)
+        banner = _read_until(shell, _PROMPT_RE, time.monotonic() + timeout)
+        shell.sendall(b"\n")
+        banner = _read_until(
+            shell, _REPEATED_PROMPT_RE, time.monotonic() + timeout, banner
         )
-        shell = client.invoke_shell()
-        time.sleep(1)
-        # Read and discard the initial banner/prompt
-        if shell.recv_ready():
-            banner = shell.recv(65535).decode("utf-8", errors="ignore")
-        else:
-            banner = ""
-
-        # Extract hostname from the initial prompt
-        prompt_hostname: str | None = None
-        for line in banner.strip().splitlines():
-            line = line.strip()
-            if line and re.search(r"[#>$%]$", line):
-                prompt_hostname = _prompt_to_hostname(line)
-                break
+        m = _REPEATED_PROMPT_RE.search(banner) or _PROMPT_RE.search(banner)
+        prompt = m.group(1).strip() if m else ""
+        prompt_hostname = _prompt_to_hostname(prompt) if prompt else None
+        # Once known, wait for this exact prompt; output may contain # or >
+        done_re = re.compile(re.escape(prompt) + r"[ \t]*$") if prompt else _PROMPT_RE
+
+        shell.sendall(_paging_command(prompt))
+        _read_until(shell, done_re, time.monotonic() + timeout)
 
-        # Send "show version" and collect output
         shell.sendall(b"show version\n")
-        time.sleep(2)
-        output = b""
-        while shell.recv_ready():
-            output += shell.recv(65535)
-        version_text = output.decode("utf-8", errors="ignore")
+        version_text = _read_until(shell, done_re, time.monotonic() + timeout)
 
         # Try to extract hostname from output if not found in banner
         if not prompt_hostname:
@@ -159,6 +287,28 @@ def _ssh_detect(
         # Match version output against known patterns
         for pattern, device_type in _VERSION_PATTERNS:
             if pattern.search(version_text):
+                # Remaining facts over the same authenticated session
+                for command in _FACT_COMMANDS.get(device_type, ()):
+                    shell.sendall(f"{command}\n".encode())
+                    version_text += _read_until(
+                        shell, done_re, time.monotonic() + timeout
+                    )
+                if on_session is not None and device_type in PLATFORM_MAP:
+
+                    def send(command: str) -> str:
+                        shell.sendall(f"{command}\n".encode())
+                        output = _read_until(shell, done_re, time.monotonic() + timeout)
+                        lines = output.replace("\r", "").split("\n")
+                        if lines and lines[0].strip() == command:
+                            lines = lines[1:]
+                        if lines and prompt and lines[-1].strip() == prompt:
+                            lines = lines[:-1]
+                        return "\n".join(lines)
+
+                    try:
+                        on_session(PLATFORM_MAP[device_type][0], send)
+                    except Exception:
+                        pass
                 return device_type, prompt_hostname, version_text
 
         return None, prompt_hostname, version_text
@@ -169,55 +319,197 @@ def _ssh_detect(
     except Exception:
         return None, None, ""
     finally:
-        try:
-            client.close()
-        except Exception:
-            pass
+        if transport is not None:
+            transport.close()
 
 
-# Regex helpers to extract info from "show version" output
+# Regex helpers to extract facts from "show version" (and _FACT_COMMANDS)
+# output; platform-specific patterns are tried before the generic ones
+_RE_HOSTNAME = re.compile(r"^Hostname:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
 _RE_MODEL = re.compile(r"Model:\s*(.+)", re.IGNORECASE)
+_RE_MODELS = [
+    _RE_MODEL,
+    # IOS: "Model Number : C9300-24T" / "cisco C9300-24T (X86) processor ..."
+    re.compile(r"^Model Number\s*:\s*(\S+)", re.IGNORECASE | re.MULTILINE),
+    re.compile(r"^cisco\s+(\S+)\s+\(.*\)\s+processor", re.MULTILINE),
+    # NX-OS: "cisco Nexus9000 C9300v Chassis"
+    re.compile(r"^\s*cisco\s+(.+?)\s+[Cc]hassis", re.MULTILINE),
+    # EOS: first line "Arista DCS-7280SR-48C6-F"
+    re.compile(r"^Arista\s+(\S+)", re.MULTILINE),
+]
 _RE_JUNOS_VER = re.compile(r"Junos:\s*(.+)", re.IGNORECASE)
+_RE_NXOS_VER = re.compile(r"NXOS:\s+version\s+(\S+)", re.IGNORECASE)
+_RE_EOS_VER = re.compile(r"Software image version:\s*(\S+)", re.IGNORECASE)
 _RE_IOS_VER = re.compile(r"Version\s+([\w.\(\)]+)", re.IGNORECASE)
 _RE_SERIAL = re.compile(
     r"(?:Processor board ID|System serial number|Serial Number)[:\s]+(\S+)",
     re.IGNORECASE,
 )
+# Junos "show chassis hardware": "Chassis    BT0217AF0012    MX204"
+_RE_CHASSIS_SERIAL = re.compile(r"^Chassis\s+(\S+)\s+\S", re.MULTILINE)
+
+
+def _first_match(patterns: list[re.Pattern[str]], text: str) -> str | None:
+    for pattern in patterns:
+        m = pattern.search(text)
+        if m:
+            return m.group(1).strip()
+    return None
 
 
 def _parse_version_info(version_text: str) -> dict[str, str | None]:
-    """Extract model, os_version, serial_number from raw 'show version' output."""
-    info: dict[str, str | None] = {
-        "model": None,
-        "os_version": None,
-        "serial_number": None,
+    """Extract hostname, model, os_version, serial_number from raw CLI output."""
+    return {
+        "hostname": _first_match([_RE_HOSTNAME], version_text),
+        "model": _first_match(_RE_MODELS, version_text),
+        "os_version": _first_match(
+            [_RE_JUNOS_VER, _RE_NXOS_VER, _RE_EOS_VER, _RE_IOS_VER], version_text
+        ),
+        "serial_number": _first_match([_RE_CHASSIS_SERIAL, _RE_SERIAL], version_text),
     }
-    if not version_text:
-        return info
-
-    m = _RE_MODEL.search(version_text)
-    if m:
-        info["model"] = m.group(1).strip()
-
-    m = _RE_JUNOS_VER.search(version_text)
-    if m:
-        info["os_version"] = m.group(1).strip()
-    else:
-        m = _RE_IOS_VER.search(version_text)
-        if m:
-            info["os_version"] = m.group(1).strip()
 
-    m = _RE_SERIAL.search(version_text)
-    if m:
-        info["serial_number"] = m.group(1).strip()
 
-    return info
+def subnet_scope(ip: str) -> str:
+    """The /24 an IPv4 host belongs to, e.g. "10.1.2.0/24"."""
+    return str(ipaddress.ip_network(f"{ip}/24", strict=False))
 
 
-def identify_host(ip: str, port: int, credentials: list[dict]) -> dict[str, Any]:
-    """Try credentials in order: SSH into device, run 'show version' to detect
-    platform, then pull NAPALM facts.
+def _server_software(remote_version: str) -> str | None:
+    """ "SSH-2.0-Cisco-1.25" -> "Cisco-1.25" ("SSH-2.0-OpenSSH_7.5 x" -> "OpenSSH_7.5")."""
+    parts = remote_version.strip().split("-", 2)
+    if len(parts) < 3 or parts[0] != "SSH" or not parts[2]:
+        return None
+    return parts[2].split()[0]
 
+
+def _ssh_connect(ip: str, port: int, timeout: float = 5) -> paramiko.Transport:
+    """TCP connect and SSH key exchange, stopping short of authentication.
+
+    The server software and host key are known from here on, so the caller
+    can check the identify cache and rank credentials before logging in on
+    this same connection. No host key is verified: subnet discovery targets
+    unidentified devices with nothing pre-shared to check it against.
+    """
+    sock = socket.create_connection((ip, port), timeout=timeout)
+    transport = paramiko.Transport(sock)
+    transport.banner_timeout = timeout
+    transport.auth_timeout = timeout
+    try:
+        transport.start_client(timeout=timeout)
+    except BaseException:
+        transport.close()
+        raise
+    return transport
+
+
+def _server_identity(transport: paramiko.Transport) -> tuple[str | None, str]:
+    """(server software, host key fingerprint such as "ssh-rsa SHA256:...")."""
+    key = transport.get_remote_server_key()
+    return (
+        _server_software(transport.remote_version),
+        f"{key.get_name()} {key.fingerprint}",
+    )
+
+
+def rank_credentials(
+    credentials: list[dict],
+    ip: str,
+    banner: str | None,
+    stats: CredentialStats,
+) -> list[dict]:
+    """Order credentials by past successes in the host's /24, then with the
+    same SSH server software; ties keep the caller's order."""
+    scopes = [("subnet", subnet_scope(ip))]
+    if banner:
+        scopes.append(("banner", banner))
+
+    def score(item: tuple[int, dict]) -> tuple[int, ...]:
+        index, cred = item
+        wins = [stats.get(scope, {}).get(cred["id"], 0) for scope in scopes]
+        return (*(-w for w in wins), index)
+
+    return [cred for _, cred in sorted(enumerate(credentials), key=score)]
+
+
+def _is_auth_failure(outcome: Any) -> bool:
+    return isinstance(outcome, paramiko.AuthenticationException) or (
+        isinstance(outcome, OSError | paramiko.SSHException) and is_auth_error(outcome)
+    )
+
+
+def _detect_attempts(
+    ip: str,
+    port: int,
+    credentials: list[dict],
+    parallel: bool,
+    transport: paramiko.Transport | None = None,
+    on_session: SessionHook | None = None,
+) -> Iterator[tuple[dict, Any]]:
+    """Yield (credential, _ssh_detect result or the exception it raised).
+
+    The first credential logs in on transport if given; each other one
+    opens its own connection.
+
+    Sequential attempts go in credential order and stop as soon as the
+    caller does. Parallel ones log in with every credential at once on
+    separate connections, so the wall time is one login however long the
+    list; once all have finished, the auth failures are yielded and then
+    the first success. Only when nothing succeeded or was rejected are the
+    other errors (unreachable, timeouts) yielded, so a slow or dropped
+    connection on one credential never hides another that worked.
+    """
+    transports = [transport] + [None] * (len(credentials) - 1)
+    if not parallel or len(credentials) < 2:
+        for cred, conn in zip(credentials, transports, strict=True):
+            try:
+                yield (
+                    cred,
+                    _ssh_detect(ip, port, cred, transport=conn, on_session=on_session),
+                )
+            except Exception as exc:
+                yield cred, exc
+        return
+    with ThreadPoolExecutor(max_workers=len(credentials)) as pool:
+        futures = [
+            pool.submit(
+                _ssh_detect, ip, port, cred, transport=conn, on_session=on_session
+            )
+            for cred, conn in zip(credentials, transports, strict=True)
+        ]
+        outcomes = [
+            (cred, future.exception() or future.result())
+            for cred, future in zip(credentials, futures, strict=True)
+        ]
+    rejected = [item for item in outcomes if _is_auth_failure(item[1])]
+    succeeded = [item for item in outcomes if not isinstance(item[1], Exception)]
+    yield from rejected
+    if succeeded:
+        yield succeeded[0]
+    elif not rejected:
+        yield from outcomes
+
+
+def identify_host(
+    ip: str,
+    port: int,
+    credentials: list[dict],
+    napalm_facts: bool | None = None,
+    credential_stats: CredentialStats | None = None,
+    cache: IdentifyCache | None = None,
+    on_session: SessionHook | None = None,
+) -> dict[str, Any]:
+    """Try credentials in order: SSH into device, run 'show version' to detect
+    platform, and parse facts from the same CLI session.
+
+    One login per host; NAPALM get_facts (a second login, NETCONF on Junos)
+    only runs when napalm_facts is set (default DISCOVERY_NAPALM_FACTS).
+    With credential_stats, credentials are first re-ranked by what worked
+    before in the host's /24 and for its SSH banner (see rank_credentials).
+    With cache, a host whose SSH host key is unchanged since it was last
+    identified returns that result without logging in. The banner and host
+    key come from the key exchange of the first login's own connection, so
+    neither costs an extra connection. on_session runs more commands over
+    the detection login (not on a cache hit).
     credentials: [{"id": int, "username": str, "password": str(plaintext)}]
     """
     candidate: dict[str, Any] = {
@@ -234,32 +526,70 @@ def identify_host(ip: str, port: int, credentials: list[dict]) -> dict[str, Any]
         "serial_number": None,
         "credential_id": None,
         "error": None,
+        "cached": False,
+        # Inputs for credential-order learning (crud.credential_stats) and
+        # the identify cache (crud.discovery_cache)
+        "ssh_banner": None,
+        "host_key": None,
+        "failed_credential_ids": [],
     }
 
-    detected: str | None = None
-    winning_cred: dict | None = None
-    prompt_hostname: str | None = None
-    version_text: str = ""
-    last_error = ""
-    for cred in credentials:
-        try:
-            detected, prompt_hostname, version_text = _ssh_detect(ip, port, cred)
+    if not credentials:
+        candidate["error"] = "All credentials failed"
+        return candidate
+    try:
+        transport = _ssh_connect(ip, port)
+        candidate["ssh_banner"], candidate["host_key"] = _server_identity(transport)
+    except (OSError, EOFError, paramiko.SSHException) as exc:
+        candidate["status"] = "unreachable"
+        candidate["error"] = str(exc)
+        return candidate
+    try:
+        hit = cache.get((ip, port)) if cache is not None else None
+        if (
+            hit
+            and candidate["host_key"] == hit[0]
+            and hit[1].get("credential_id") in {cred["id"] for cred in credentials}
+        ):
+            return {**hit[1], "cached": True, "failed_credential_ids": []}
+        if credential_stats is not None and len(credentials) > 1:
+            credentials = rank_credentials(
+                credentials, ip, candidate["ssh_banner"], credential_stats
+            )
+
+        detected: str | None = None
+        winning_cred: dict | None = None
+        prompt_hostname: str | None = None
+        version_text: str = ""
+        last_error = ""
+        attempts = _detect_attempts(
+            ip,
+            port,
+            credentials,
+            settings.DISCOVERY_PARALLEL_CREDENTIALS,
+            transport,
+            on_session,
+        )
+        for cred, outcome in attempts:
+            if _is_auth_failure(outcome):
+                last_error = str(outcome)
+                candidate["failed_credential_ids"].append(cred["id"])
+                continue
+            if isinstance(outcome, OSError | paramiko.SSHException):
+                candidate["status"] = "unreachable"
+                candidate["error"] = str(outcome)
+                return candidate
+            if isinstance(outcome, Exception):
+                candidate["status"] = "error"
+                candidate["error"] = str(outcome)
+                return candidate
+            detected, prompt_hostname, version_text = outcome
             winning_cred = cred
             break
-        except paramiko.AuthenticationException as exc:
-            last_error = str(exc)
-            continue
-        except (OSError, paramiko.SSHException) as exc:
-            if is_auth_error(exc):
-                last_error = str(exc)
-                continue
-            candidate["status"] = "unreachable"
-            candidate["error"] = str(exc)
-            return candidate
-        except Exception as exc:
-            candidate["status"] = "error"
-            candidate["error"] = str(exc)
-            return candidate
+        attempts.close()
+    finally:
+        # Already closed by its login unless the cache answered first
+        transport.close()
 
     if winning_cred is None:
         candidate["error"] = last_error or "All credentials failed"
@@ -283,23 +613,28 @@ def identify_host(ip: str, port: int, credentials: list[dict]) -> dict[str, Any]
     candidate["device_type"] = device_type
     candidate["status"] = "identified"
 
-    # Extract info from "show version" output (always available)
+    # Facts parsed from the detection session's CLI output
     ver_info = _parse_version_info(version_text)
 
     facts: dict[str, Any] = {}
-    try:
-        facts = _get_facts(ip, port, platform, winning_cred)
-    except Exception as exc:
-        # Platform detection succeeded; facts are best-effort (e.g. Junos
-        # facts need NETCONF, a separate service from the SSH CLI used for
-        # detection, and it's often disabled even when SSH works fine).
-        candidate["error"] = f"get_facts failed: {exc}"
-
-    # Merge: prefer NAPALM facts, fall back to parsed "show version" output
-    raw_hostname = str(facts.get("hostname") or "") or (prompt_hostname or "")
+    if settings.DISCOVERY_NAPALM_FACTS if napalm_facts is None else napalm_facts:
+        try:
+            facts = _get_facts(ip, port, platform, winning_cred)
+        except Exception as exc:
+            # Platform detection succeeded; facts are best-effort (e.g. Junos
+            # facts need NETCONF, a separate service from the SSH CLI used for
+            # detection, and it's often disabled even when SSH works fine).
+            candidate["error"] = f"get_facts failed: {exc}"
+
+    # Merge: prefer NAPALM facts when collected, else the parsed CLI output
+    raw_hostname = (
+        str(facts.get("hostname") or "")
+        or ver_info.get("hostname")
+        or (prompt_hostname or "")
+    )
     candidate["raw_hostname"] = raw_hostname or None
     candidate["hostname"] = sanitize_hostname(raw_hostname) if raw_hostname else None
-    candidate["vendor"] = facts.get("vendor") or None
+    candidate["vendor"] = facts.get("vendor") or PLATFORM_VENDORS.get(platform)
     candidate["model"] = facts.get("model") or ver_info.get("model")
     candidate["os_version"] = str(facts.get("os_version") or "") or ver_info.get(
         "os_version"
@@ -312,11 +647,26 @@ def identify_host(ip: str, port: int, credentials: list[dict]) -> dict[str, Any]
 
 
 def identify_hosts_parallel(
-    ips: list[str], port: int, credentials: list[dict], max_workers: int = 16
+    ips: list[str],
+    port: int,
+    credentials: list[dict],
+    max_workers: int = 16,
+    credential_stats: CredentialStats | None = None,
+    cache: IdentifyCache | None = None,
 ) -> list[dict[str, Any]]:
     results: list[dict[str, Any]] = []
     with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        futures = {pool.submit(identify_host, ip, port, credentials): ip for ip in ips}
+        futures = {
+            pool.submit(
+                identify_host,
+                ip,
+                port,
+                credentials,
+                credential_stats=credential_stats,
+                cache=cache,
+            ): ip
+            for ip in ips
+        }
         for future in as_completed(futures):
             results.append(future.result())
     return sorted(results, key=lambda c: ipaddress.ip_address(c["ip"]))
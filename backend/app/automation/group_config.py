@@ -1,16 +1,16 @@
-from nornir import InitNornir
 from nornir.core.filter import F
 from nornir_netmiko import netmiko_commit, netmiko_send_command, netmiko_send_config
 
+from app.automation.connection_pool import pooled_nornir
+
 
 def group_configure(group_name: str = "", commands: str = "", command_type: str = ""):
-    nr = InitNornir(config_file="./app/automation/config.yaml")
-    try:
-        rtr = nr.filter(F(groups__contains=group_name))
-        if not rtr.inventory.hosts:
+    operation = "config" if command_type == "config" else "read"
+    with pooled_nornir(F(groups__contains=group_name), operation=operation) as nr:
+        if not nr.inventory.hosts:
             raise ValueError(f"Group '{group_name}' not found in inventory")
         if command_type == "show":
-            result = rtr.run(
+            result = nr.run(
                 task=netmiko_send_command, command_string=commands, enable=True
             )
         elif command_type == "config":
@@ -19,8 +19,8 @@ def group_configure(group_name: str = "", commands: str = "", command_type: str
             # Junos doesn't echo each "set" line back the way IOS does, so
             # netmiko's per-line echo verification times out waiting for an
             # exact match — split the push by platform so only junos disables it.
-            junos_rtr = rtr.filter(platform="junos")
-            other_rtr = rtr.filter(filter_func=lambda h: h.platform != "junos")
+            junos_rtr = nr.filter(platform="junos")
+            other_rtr = nr.filter(filter_func=lambda h: h.platform != "junos")
             if other_rtr.inventory.hosts:
                 result.update(
                     other_rtr.run(
@@ -39,9 +39,7 @@ def group_configure(group_name: str = "", commands: str = "", command_type: str
             # unless explicitly committed. Only commit hosts whose config push
             # actually succeeded.
             ok_hosts = [h for h, task in result.items() if not task.failed]
-            junos_ok_rtr = junos_rtr.filter(
-                filter_func=lambda h: h.name in ok_hosts
-            )
+            junos_ok_rtr = junos_rtr.filter(filter_func=lambda h: h.name in ok_hosts)
             if junos_ok_rtr.inventory.hosts:
                 commit_result = junos_ok_rtr.run(task=netmiko_commit)
                 for host, task in commit_result.items():
@@ -52,5 +50,3 @@ def group_configure(group_name: str = "", commands: str = "", command_type: str
             host: str(task.result) if not task.failed else f"ERROR: {task.result}"
             for host, task in result.items()
         }
-    finally:
-        nr.close_connections()
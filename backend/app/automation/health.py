@@ -1,5 +1,10 @@
+import asyncio
 import socket
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass
+
+from app.core.config import settings
 
 
 def _tcp_check(ip: str, port: int, timeout: float = 3.0) -> bool:
@@ -14,14 +19,93 @@ def check_device(ip: str, port: int) -> str:
     return "UP" if _tcp_check(ip, port or 22) else "DOWN"
 
 
+@dataclass
+class ProbeResult:
+    device_id: int
+    status: str  # "UP" | "DOWN"
+    # TCP connect round-trip in milliseconds; None when the probe failed
+    rtt_ms: float | None
+
+
+class RateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart (rate <= 0: off)."""
+
+    def __init__(self, rate: float) -> None:
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def probe(ip: str, port: int, timeout: float) -> float | None:
+    """Non-blocking TCP connect; returns the connect RTT in ms or None."""
+    start = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(ip, port), timeout=timeout
+        )
+    except (OSError, TimeoutError):
+        return None
+    rtt_ms = (time.perf_counter() - start) * 1000
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return rtt_ms
+
+
+async def probe_devices(
+    devices: Iterable[dict],
+    *,
+    concurrency: int | None = None,
+    rate: float | None = None,
+    timeout: float | None = None,
+) -> AsyncIterator[ProbeResult]:
+    """Probe devices ({"id", "ip", "port"}) and yield results as they land.
+
+    Up to ``concurrency`` connects are in flight at once and new ones start
+    at most ``rate`` per second, so a whole fleet completes in about one
+    timeout plus len(devices)/rate, instead of scaling with thread count.
+    """
+    concurrency = concurrency or settings.HEALTH_CHECK_CONCURRENCY
+    rate = settings.HEALTH_CHECK_RATE if rate is None else rate
+    timeout = timeout or settings.HEALTH_CHECK_TIMEOUT_SECONDS
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = RateLimiter(rate)
+
+    async def run(device: dict) -> ProbeResult:
+        async with semaphore:
+            await limiter.acquire()
+            rtt_ms = await probe(device["ip"], device["port"] or 22, timeout)
+        return ProbeResult(
+            device_id=device["id"],
+            status="UP" if rtt_ms is not None else "DOWN",
+            rtt_ms=rtt_ms,
+        )
+
+    tasks = [asyncio.create_task(run(device)) for device in devices]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 def check_devices_parallel(devices: list[dict]) -> dict[int, str]:
     """Returns {device_id: 'UP'|'DOWN'} for all devices concurrently."""
-    results: dict[int, str] = {}
-    with ThreadPoolExecutor(max_workers=20) as pool:
-        futures = {
-            pool.submit(_tcp_check, s["ip"], s["port"] or 22): s["id"] for s in devices
-        }
-        for future in as_completed(futures):
-            sid = futures[future]
-            results[sid] = "UP" if future.result() else "DOWN"
-    return results
+
+    async def collect() -> dict[int, str]:
+        return {r.device_id: r.status async for r in probe_devices(devices)}
+
+    return asyncio.run(collect())
@@ -1,9 +1,9 @@
 import re
 
-from nornir import InitNornir
 from nornir.core.task import Result, Task
 from nornir_netmiko import netmiko_commit, netmiko_send_command, netmiko_send_config
 
+from app.automation.connection_pool import pooled_nornir
 from app.models import Device
 from app.vendor import JUNOS1
 
@@ -40,11 +40,23 @@ def _validate_description(desc: str) -> None:
         raise ValueError(f"Invalid description: {desc!r}")
 
 
+def _push_config(device: Device, commands: list[str]) -> dict:
+    with pooled_nornir(name=device.hostname, operation="config") as nr:
+        if device.platform == "junos":
+            # Junos doesn't echo each "set" line back the way IOS does, so
+            # netmiko's per-line echo verification times out waiting for an
+            # exact match.
+            nr.run(task=netmiko_send_config, config_commands=commands, cmd_verify=False)
+            result = nr.run(task=netmiko_commit)
+        else:
+            result = nr.run(task=netmiko_send_config, config_commands=commands)
+    return {host: task.result for host, task in result.items()}
+
+
 def configure_interface(device: Device, interface_info: dict):
     _validate_port(interface_info["port"])
     _validate_description(interface_info["description"])
 
-    nr = InitNornir(config_file="./app/automation/config.yaml")
     commands = []
     if device.platform in ["ios", "nxos_ssh", "eos"]:
         if interface_info["mode"] == "access":
@@ -75,11 +87,7 @@ def configure_interface(device: Device, interface_info: dict):
             if native:
                 _validate_vlan(native)
                 commands.append(f"switchport trunk native vlan {native}")
-        rtr = nr.filter(name=device.hostname)
-        result = rtr.run(task=netmiko_send_config, config_commands=commands)
-        result_dict = {host: task.result for host, task in result.items()}
-        nr.close_connections()
-        return result_dict
+        return _push_config(device, commands)
     elif device.platform == "junos":
         if device.model and any(char in device.model for char in JUNOS1):
             commands = [
@@ -151,17 +159,7 @@ def configure_interface(device: Device, interface_info: dict):
                             interface_info["port"], native
                         )
                     )
-        rtr = nr.filter(name=device.hostname)
-        # Junos doesn't echo each "set" line back the way IOS does, so
-        # netmiko's per-line echo verification times out waiting for an
-        # exact match.
-        result = rtr.run(
-            task=netmiko_send_config, config_commands=commands, cmd_verify=False
-        )
-        result = rtr.run(task=netmiko_commit)
-        result_dict = {host: task.result for host, task in result.items()}
-        nr.close_connections()
-        return result_dict
+        return _push_config(device, commands)
 
 
 def configure_interface_status(
@@ -173,7 +171,6 @@ def configure_interface_status(
     """
     _validate_port(interface_info["port"])
 
-    nr = InitNornir(config_file="./app/automation/config.yaml")
     commands = []
     if device.platform in ["ios", "nxos_ssh", "eos"]:
         commands.append("interface {}".format(interface_info["port"]))
@@ -182,11 +179,7 @@ def configure_interface_status(
         else:
             commands.append("no shutdown")
 
-        rtr = nr.filter(name=device.hostname)
-        result = rtr.run(task=netmiko_send_config, config_commands=commands)
-        result_dict = {host: task.result for host, task in result.items()}
-        nr.close_connections()
-        return result_dict
+        return _push_config(device, commands)
     elif device.platform == "junos":
         if set_status == 0:
             commands.append("set interfaces {} disable".format(interface_info["port"]))
@@ -195,38 +188,29 @@ def configure_interface_status(
                 "delete interfaces {} disable".format(interface_info["port"])
             )
 
-        rtr = nr.filter(name=device.hostname)
-        result = rtr.run(
-            task=netmiko_send_config, config_commands=commands, cmd_verify=False
-        )
-        result = rtr.run(task=netmiko_commit)
-        result_dict = {host: task.result for host, task in result.items()}
-        nr.close_connections()
-        return result_dict
+        return _push_config(device, commands)
 
 
 def show_run_interface(device: Device, port: str):
     _validate_port(port)
 
-    nr = InitNornir(config_file="./app/automation/config.yaml")
-    rtr = nr.filter(name=device.hostname)
     result = None
-    if device.platform in ["ios", "nxos_ssh"]:
-        result = rtr.run(
-            task=netmiko_send_command,
-            command_string=f"show running-config interface {port}",
-        )
-    elif device.platform == "eos":
-        result = rtr.run(
-            task=_netmiko_send_privileged,
-            command_string=f"show running-config interfaces {port}",
-        )
-    elif device.platform == "junos":
-        result = rtr.run(
-            task=netmiko_send_command,
-            command_string=f"show configuration interfaces {port}",
-        )
-    nr.close_connections()
+    with pooled_nornir(name=device.hostname) as nr:
+        if device.platform in ["ios", "nxos_ssh"]:
+            result = nr.run(
+                task=netmiko_send_command,
+                command_string=f"show running-config interface {port}",
+            )
+        elif device.platform == "eos":
+            result = nr.run(
+                task=_netmiko_send_privileged,
+                command_string=f"show running-config interfaces {port}",
+            )
+        elif device.platform == "junos":
+            result = nr.run(
+                task=netmiko_send_command,
+                command_string=f"show configuration interfaces {port}",
+            )
 
     result_dict = {}
     if result:
@@ -0,0 +1,135 @@
+"""Process-wide Nornir factory.
+
+InitNornir re-reads config.yaml and re-builds the inventory on every call,
+which dominated the latency of single-device operations. The config, runner,
+groups and defaults are kept in memory and rebuilt only when the group files
+change. Hosts come from the DB inventory plugin on each call, narrowed to the
+requested devices, so callers always see current device rows and get Host
+objects no other operation holds connections on.
+"""
+
+import os
+import threading
+from typing import Any, Literal
+
+from nornir.core import Nornir
+from nornir.core.configuration import Config
+from nornir.core.filter import F
+from nornir.core.inventory import Host, Hosts, Inventory
+from nornir.core.plugins.connections import ConnectionPluginRegister
+from nornir.core.plugins.inventory import InventoryPluginRegister
+
+from app.automation.db_inventory import DBInventory
+from app.automation.runners import PlatformLimitedRunner
+from app.core.config import settings
+
+CONFIG_FILE = "./app/automation/config.yaml"
+INVENTORY_FILES = (
+    "./app/automation/inventory/groups.yaml",
+    "./app/automation/inventory/defaults.yaml",
+)
+
+_lock = threading.Lock()
+_base: Nornir | None = None
+_base_stamp: tuple[tuple[int, int] | None, ...] = ()
+_plugin: DBInventory | None = None
+
+# Read-only work fans out wide; config pushes run fewer devices at a time
+Operation = Literal["read", "config"]
+
+
+def _inventory_stamp() -> tuple[tuple[int, int] | None, ...]:
+    # Inventory files are replaced atomically (new inode), so this also
+    # catches writes made by other worker processes.
+    stamp: list[tuple[int, int] | None] = []
+    for path in INVENTORY_FILES:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append((st.st_ino, st.st_mtime_ns))
+    return tuple(stamp)
+
+
+def _build_base() -> tuple[Nornir, DBInventory]:
+    ConnectionPluginRegister.auto_register()
+    config = Config.from_file(CONFIG_FILE)
+    config.logging.configure()
+    plugin = InventoryPluginRegister.get_plugin(config.inventory.plugin)(
+        **config.inventory.options
+    )
+    groups, defaults = plugin.load_groups()
+    inventory = Inventory(hosts=Hosts(), groups=groups, defaults=defaults)
+    return Nornir(inventory=inventory, config=config), plugin
+
+
+def _get_base() -> tuple[Nornir, DBInventory]:
+    global _base, _base_stamp, _plugin
+    stamp = _inventory_stamp()
+    with _lock:
+        if _base is None or _plugin is None or stamp != _base_stamp:
+            _base, _plugin = _build_base()
+            _base_stamp = stamp
+        return _base, _plugin
+
+
+def invalidate_inventory() -> None:
+    """Drop the cached groups and config; the next call re-reads them."""
+    global _base
+    with _lock:
+        _base = None
+
+
+def _group_hint(args: tuple[Any, ...]) -> str | None:
+    # group_configure filters with F(groups__contains=name); push that down
+    # to SQL so only the group's devices are loaded.
+    if len(args) == 1 and isinstance(args[0], F):
+        if set(args[0].filters) == {"groups__contains"}:
+            return str(args[0].filters["groups__contains"])
+    return None
+
+
+def select_hosts(*args: Any, **kwargs: Any) -> dict[str, Host]:
+    """Load the hosts matching Nornir.filter() arguments from the database."""
+    base, plugin = _get_base()
+    names = [kwargs["name"]] if "name" in kwargs else None
+    hosts = plugin.load_hosts(
+        base.inventory.groups,
+        base.inventory.defaults,
+        names=names,
+        group=_group_hint(args),
+    )
+    if args or set(kwargs) - {"name"}:
+        inventory = Inventory(
+            hosts=hosts,
+            groups=base.inventory.groups,
+            defaults=base.inventory.defaults,
+        )
+        return dict(inventory.filter(*args, **kwargs).hosts)
+    return dict(hosts)
+
+
+def get_runner(operation: Operation = "read") -> PlatformLimitedRunner:
+    """Return a runner sized for the operation type from settings."""
+    workers = (
+        settings.NORNIR_CONFIG_WORKERS
+        if operation == "config"
+        else settings.NORNIR_READ_WORKERS
+    )
+    limits = settings.NORNIR_PLATFORM_LIMITS
+    return PlatformLimitedRunner(
+        num_workers=workers,
+        platform_limits=limits if isinstance(limits, dict) else {},
+    )
+
+
+def make_view(hosts: dict[str, Host], operation: Operation = "read") -> Nornir:
+    """Wrap hosts in a Nornir object sharing the cached config."""
+    base, _ = _get_base()
+    inventory = Inventory(
+        hosts=Hosts(hosts),
+        groups=base.inventory.groups,
+        defaults=base.inventory.defaults,
+    )
+    return Nornir(inventory=inventory, config=base.config, runner=get_runner(operation))
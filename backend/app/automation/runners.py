@@ -0,0 +1,65 @@
+"""Nornir runner with per-platform concurrency caps.
+
+Behaves like the stock threaded runner, but hosts whose platform has a cap
+(slow Junos commits, for instance) never run more than that many at once.
+Hosts are submitted round-robin across platforms, so capped hosts waiting
+on their semaphore do not hold every worker thread while other platforms
+are ready to run.
+"""
+
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from nornir.core.inventory import Host
+from nornir.core.plugins.runners import RunnersPluginRegister
+from nornir.core.task import AggregatedResult, MultiResult, Task
+
+
+def _interleave(hosts: list[Host]) -> list[Host]:
+    by_platform: dict[str | None, deque[Host]] = defaultdict(deque)
+    for host in hosts:
+        by_platform[host.platform].append(host)
+    queues = list(by_platform.values())
+    ordered: list[Host] = []
+    while queues:
+        for queue in list(queues):
+            ordered.append(queue.popleft())
+            if not queue:
+                queues.remove(queue)
+    return ordered
+
+
+class PlatformLimitedRunner:
+    def __init__(
+        self, num_workers: int = 20, platform_limits: dict[str, int] | None = None
+    ) -> None:
+        self.num_workers = max(1, num_workers)
+        self.platform_limits = dict(platform_limits or {})
+
+    def run(self, task: Task, hosts: list[Host]) -> AggregatedResult:
+        # Semaphores are per run: the caps apply within one operation, and
+        # the connection pool already serialises access to each device.
+        semaphores = {
+            platform: threading.BoundedSemaphore(max(1, limit))
+            for platform, limit in self.platform_limits.items()
+        }
+
+        def start(host: Host) -> MultiResult:
+            semaphore = semaphores.get(host.platform or "")
+            if semaphore is None:
+                return task.copy().start(host)
+            with semaphore:
+                return task.copy().start(host)
+
+        result = AggregatedResult(task.name)
+        workers = min(self.num_workers, len(hosts)) or 1
+        with ThreadPoolExecutor(workers) as pool:
+            futures = [pool.submit(start, host) for host in _interleave(hosts)]
+        for future in futures:
+            worker_result = future.result()
+            result[worker_result.host.name] = worker_result
+        return result
+
+
+RunnersPluginRegister.register("platform_limited", PlatformLimitedRunner)
@@ -0,0 +1,311 @@
+"""Topology-crawl discovery: walk CDP/LLDP neighbor tables breadth-first."""
+
+import ipaddress
+import re
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from netmiko import ConnectHandler
+from nornir_netmiko import netmiko_send_command
+
+from app.automation.connection_pool import pooled_nornir
+from app.automation.discovery import (
+    CredentialStats,
+    IdentifyCache,
+    identify_host,
+    sanitize_hostname,
+)
+from app.models import Device
+
+# Neighbor detail commands per platform. Junos has no fleet-wide detail
+# view; the per-interface commands are added from "show lldp neighbors".
+NEIGHBOR_COMMANDS: dict[str, list[str]] = {
+    "ios": ["show cdp neighbors detail", "show lldp neighbors detail"],
+    "nxos_ssh": ["show cdp neighbors detail", "show lldp neighbors detail"],
+    "eos": ["show lldp neighbors detail"],
+    "junos": ["show lldp neighbors"],
+}
+
+# Where one neighbor entry starts, per command output format
+_CDP_SPLIT = re.compile(r"^-{5,}\s*$", re.MULTILINE)
+_LLDP_SPLIT: dict[str, re.Pattern[str]] = {
+    "ios": re.compile(r"^-{5,}\s*$", re.MULTILINE),
+    "nxos_ssh": re.compile(r"^(?=Chassis id:)", re.MULTILINE),
+    "eos": re.compile(r"^(?=Interface \S+ detected)", re.MULTILINE),
+    "junos": re.compile(r"^(?=LLDP Neighbor Information:)", re.MULTILINE),
+}
+
+_IPV4 = r"(\d{1,3}(?:\.\d{1,3}){3})"
+_RE_CDP_DEVICE_ID = re.compile(r"^Device ID:\s*(\S+)", re.MULTILINE)
+_RE_CDP_PORTS = re.compile(
+    r"^Interface:\s*([^,\s]+),\s*Port ID \(outgoing port\):\s*(\S+)", re.MULTILINE
+)
+_RE_CDP_ENTRY_IP = re.compile(r"IP(?:v4)? address:\s*" + _IPV4, re.IGNORECASE)
+# First IPv4 after a "Management address(es)" / "Mgmt address(es)" /
+# "Management Address" / "Management Info" heading
+_RE_MGMT_IP = re.compile(r"(?:Management|Mgmt)\b.*?" + _IPV4, re.IGNORECASE | re.DOTALL)
+_RE_SYSTEM_NAME = re.compile(
+    r"System name\s*:\s*\"?([^\"\r\n]+?)\"?\s*$", re.IGNORECASE | re.MULTILINE
+)
+_RE_LOCAL_PORT = re.compile(
+    r"(?:Local Intf|Local Port id|Local Interface)\s*:\s*(\S+)"
+    r"|^Interface (\S+) detected",
+    re.IGNORECASE | re.MULTILINE,
+)
+_RE_REMOTE_PORT = re.compile(
+    r"^\s*(?:-\s*)?Port (?:id|description)\s*:\s*\"?([^\"\r\n]+?)\"?\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+# "show lldp neighbors" (Junos) rows: "ge-0/0/0   -   00:11:..  ge-0/0/1  r2"
+_RE_JUNOS_LLDP_ROW = re.compile(r"^([a-z]{2,}-\d+/\d+/\d+(?:\.\d+)?)\s", re.MULTILINE)
+
+
+def _match(pattern: re.Pattern[str], text: str) -> str | None:
+    m = pattern.search(text)
+    if not m:
+        return None
+    return next((g for g in m.groups() if g), None)
+
+
+def _mgmt_ip(text: str) -> str | None:
+    ip = _match(_RE_MGMT_IP, text)
+    try:
+        return str(ipaddress.IPv4Address(ip)) if ip else None
+    except ValueError:
+        return None
+
+
+def parse_cdp_neighbors(output: str) -> list[dict[str, Any]]:
+    """Neighbors from "show cdp neighbors detail" (IOS and NX-OS)."""
+    neighbors = []
+    for block in _CDP_SPLIT.split(output):
+        device_id = _match(_RE_CDP_DEVICE_ID, block)
+        if not device_id:
+            continue
+        ports = _RE_CDP_PORTS.search(block)
+        neighbors.append(
+            {
+                # NX-OS appends the serial: "sw3(FOC1234X0AB)"
+                "hostname": device_id.split("(")[0],
+                "ip": _mgmt_ip(block) or _match(_RE_CDP_ENTRY_IP, block),
+                "local_port": ports.group(1) if ports else None,
+                "remote_port": ports.group(2) if ports else None,
+                "protocol": "cdp",
+            }
+        )
+    return neighbors
+
+
+def parse_lldp_neighbors(platform: str, output: str) -> list[dict[str, Any]]:
+    """Neighbors from the platform's LLDP detail output."""
+    splitter = _LLDP_SPLIT.get(platform)
+    if splitter is None:
+        return []
+    neighbors = []
+    for block in splitter.split(output):
+        hostname = _match(_RE_SYSTEM_NAME, block)
+        ip = _mgmt_ip(block)
+        if not hostname and not ip:
+            continue
+        neighbors.append(
+            {
+                "hostname": hostname,
+                "ip": ip,
+                "local_port": _match(_RE_LOCAL_PORT, block),
+                "remote_port": _match(_RE_REMOTE_PORT, block),
+                "protocol": "lldp",
+            }
+        )
+    return neighbors
+
+
+def parse_neighbors(platform: str, outputs: dict[str, str]) -> list[dict[str, Any]]:
+    """Merge CDP and LLDP neighbors; one entry per neighbor and local port,
+    CDP first since it always carries the management address."""
+    found = parse_cdp_neighbors(outputs.get("show cdp neighbors detail", ""))
+    for command, output in outputs.items():
+        if "lldp neighbors" in command:
+            found += parse_lldp_neighbors(platform, output)
+    merged: dict[tuple[str, str | None], dict[str, Any]] = {}
+    for neighbor in found:
+        name = sanitize_hostname(neighbor["hostname"] or "").lower()
+        key = (name or neighbor["ip"] or "", neighbor["local_port"])
+        if key not in merged:
+            merged[key] = neighbor
+        elif not merged[key]["ip"]:
+            merged[key]["ip"] = neighbor["ip"]
+    return list(merged.values())
+
+
+def _collect_outputs(send: Callable[[str], str], platform: str) -> dict[str, str]:
+    outputs = {command: send(command) for command in NEIGHBOR_COMMANDS[platform]}
+    if platform == "junos":
+        table = outputs.get("show lldp neighbors", "")
+        for interface in dict.fromkeys(_RE_JUNOS_LLDP_ROW.findall(table)):
+            command = f"show lldp neighbors interface {interface}"
+            outputs[command] = send(command)
+    return outputs
+
+
+def get_neighbors(device: Device) -> list[dict[str, Any]]:
+    """CDP/LLDP neighbors of a registered device over its pooled session."""
+    platform = device.platform or ""
+    if platform not in NEIGHBOR_COMMANDS:
+        return []
+    with pooled_nornir(name=device.hostname) as nr:
+
+        def send(command: str) -> str:
+            result = nr.run(task=netmiko_send_command, command_string=command)
+            host_result = result[device.hostname]
+            if host_result.failed:
+                raise RuntimeError(str(host_result.exception or host_result.result))
+            return str(host_result.result or "")
+
+        outputs = _collect_outputs(send, platform)
+    return parse_neighbors(platform, outputs)
+
+
+def get_neighbors_direct(
+    candidate: dict[str, Any], credential: dict
+) -> list[dict[str, Any]]:
+    """CDP/LLDP neighbors of a not yet registered host over a new login; the
+    crawl only needs this for hosts answered from the identify cache."""
+    platform = candidate["platform"]
+    if platform not in NEIGHBOR_COMMANDS:
+        return []
+    conn = ConnectHandler(
+        device_type=candidate["device_type"],
+        host=candidate["ip"],
+        port=candidate["port"],
+        username=credential["username"],
+        password=credential["password"],
+        timeout=10,
+    )
+    try:
+        outputs = _collect_outputs(conn.send_command, platform)
+    finally:
+        conn.disconnect()
+    return parse_neighbors(platform, outputs)
+
+
+def crawl_neighbors(
+    seeds: list[Device],
+    known: list[Device],
+    port: int,
+    credentials: list[dict],
+    *,
+    max_depth: int,
+    max_devices: int,
+    max_workers: int = 16,
+    credential_stats: CredentialStats | None = None,
+    load_cache: Callable[[list[str]], IdentifyCache] | None = None,
+) -> dict[str, list[dict[str, Any]]]:
+    """Breadth-first walk of CDP/LLDP neighbors starting from seeds.
+
+    Each hop collects the neighbor tables of the current frontier, then
+    identifies only the management IPs those neighbors advertise. Devices
+    already in `known` are crawled through without being identified again;
+    every neighbor is visited once, matched by IP or hostname. At most
+    max_devices new hosts are identified, over at most max_depth hops.
+    credential_stats is passed through to identify_host, as is the identify
+    cache that load_cache(ips) returns for each hop's new IPs.
+
+    A new host's neighbor tables are read over the same login that
+    identifies it, so each hop costs one login per host.
+
+    Returns {"neighbors": [...], "candidates": [...], "errors": [...]}.
+    """
+    by_ip = {d.ipaddress: d for d in known if d.ipaddress}
+    by_name = {d.hostname.lower(): d for d in known}
+    creds_by_id = {cred["id"]: cred for cred in credentials}
+    seen: set[str] = set()
+    for device in seeds:
+        seen.update({device.ipaddress, device.hostname.lower()})
+
+    neighbors: list[dict[str, Any]] = []
+    candidates: list[dict[str, Any]] = []
+    errors: list[dict[str, Any]] = []
+    # (hostname, registered device or identified candidate)
+    frontier: list[tuple[str, Device | dict[str, Any]]] = [
+        (d.hostname, d) for d in seeds
+    ]
+
+    # Neighbor command outputs captured during identify, by IP
+    outputs_by_ip: dict[str, dict[str, str]] = {}
+
+    def on_session(ip: str) -> Callable[[str, Callable[[str], str]], None]:
+        def collect_outputs(platform: str, send: Callable[[str], str]) -> None:
+            if platform in NEIGHBOR_COMMANDS:
+                outputs_by_ip[ip] = _collect_outputs(send, platform)
+
+        return collect_outputs
+
+    def neighbors_of(node: Device | dict[str, Any]) -> list[dict[str, Any]]:
+        if isinstance(node, Device):
+            return get_neighbors(node)
+        outputs = outputs_by_ip.pop(node["ip"], None)
+        if outputs is not None:
+            return parse_neighbors(node["platform"], outputs)
+        return get_neighbors_direct(node, creds_by_id[node["credential_id"]])
+
+    def collect(item: tuple[str, Device | dict[str, Any]]) -> Any:
+        try:
+            return neighbors_of(item[1])
+        except Exception as exc:
+            return exc
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for depth in range(1, max_depth + 1):
+            if not frontier:
+                break
+            next_frontier: list[tuple[str, Device | dict[str, Any]]] = []
+            to_identify: list[str] = []
+            for (via, _), found in zip(
+                frontier, pool.map(collect, frontier), strict=True
+            ):
+                if isinstance(found, Exception):
+                    errors.append({"hostname": via, "error": str(found)})
+                    continue
+                for neighbor in found:
+                    name = sanitize_hostname(neighbor["hostname"] or "").lower()
+                    device = by_ip.get(neighbor["ip"] or "") or by_name.get(name)
+                    keys = {k for k in (neighbor["ip"], name) if k}
+                    if device is not None:
+                        keys |= {device.ipaddress, device.hostname.lower()}
+                    if not keys or keys & seen:
+                        continue
+                    seen |= keys
+                    neighbors.append(
+                        {
+                            **neighbor,
+                            "depth": depth,
+                            "via": via,
+                            "existing_device_id": device.id if device else None,
+                        }
+                    )
+                    if device is not None:
+                        next_frontier.append((device.hostname, device))
+                    elif (
+                        neighbor["ip"]
+                        and len(candidates) + len(to_identify) < max_devices
+                    ):
+                        to_identify.append(neighbor["ip"])
+
+            cache = load_cache(to_identify) if load_cache and to_identify else None
+            for candidate in pool.map(
+                lambda ip, cache=cache: identify_host(
+                    ip,
+                    port,
+                    credentials,
+                    credential_stats=credential_stats,
+                    cache=cache,
+                    on_session=on_session(ip),
+                ),
+                to_identify,
+            ):
+                candidates.append(candidate)
+                if candidate["status"] == "identified":
+                    next_frontier.append((candidate["hostname"] or "", candidate))
+            frontier = next_frontier
+    return {"neighbors": neighbors, "candidates": candidates, "errors": errors}
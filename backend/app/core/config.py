@@ -21,6 +21,18 @@ def parse_cors(v: Any) -> list[str] | str:
     raise ValueError(v)
 
 
+def parse_platform_limits(v: Any) -> dict[str, int] | Any:
+    # "junos:4,eos:8" -> {"junos": 4, "eos": 8}; JSON objects pass through
+    if isinstance(v, str) and not v.lstrip().startswith("{"):
+        limits = {}
+        for item in v.split(","):
+            if item.strip():
+                platform, _, limit = item.partition(":")
+                limits[platform.strip()] = int(limit)
+        return limits
+    return v
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env", env_ignore_empty=True, extra="ignore"
@@ -95,7 +107,61 @@ class Settings(BaseSettings):
     USERS_OPEN_REGISTRATION: bool = False
     TIMEZONE: str = "UTC"
     SYNC_INTERVAL_MINUTES: int = 15
+    # Devices synced concurrently by the scheduled MAC/ARP/IP sync
+    SYNC_MAX_WORKERS: int = 16
     HEALTH_CHECK_INTERVAL_MINUTES: int = 5
+    # TCP connects in flight at once during a health check
+    HEALTH_CHECK_CONCURRENCY: int = 1000
+    # New connects started per second across the whole check (0 = unlimited)
+    HEALTH_CHECK_RATE: float = 500
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 3.0
+    # Raw per-probe RTT rows are kept this long; minute and hour rollups
+    # cover older history
+    HEALTH_PROBE_RETENTION_HOURS: int = 48
+    HEALTH_ROLLUP_MINUTE_RETENTION_DAYS: int = 7
+    HEALTH_ROLLUP_HOUR_RETENTION_DAYS: int = 90
+    # Scheduled config backup of every device (crontab syntax in TIMEZONE;
+    # empty disables), devices backed up at once, and seconds before one
+    # device is given up on so the pass still finishes
+    CONFIG_BACKUP_CRON: str = "0 2 * * *"
+    CONFIG_BACKUP_MAX_WORKERS: int = 32
+    CONFIG_BACKUP_DEVICE_TIMEOUT_SECONDS: float = 300
+    # Ask the device for its last-config-change marker first and skip the
+    # full running-config fetch while it is unchanged (IOS, NX-OS, Junos)
+    CONFIG_BACKUP_CHANGE_PROBE: bool = True
+    # Streaming discovery sweep: largest subnet accepted (65534 hosts = /16),
+    # TCP connects in flight, and new connects per second (0 = unlimited)
+    DISCOVERY_SWEEP_MAX_HOSTS: int = 65534
+    DISCOVERY_SWEEP_CONCURRENCY: int = 512
+    DISCOVERY_SWEEP_RATE: float = 1000
+    # Hosts identified over SSH at once by a background discovery job
+    DISCOVERY_IDENTIFY_WORKERS: int = 16
+    # Also pull NAPALM get_facts when identifying (a second login per host;
+    # NETCONF on Junos). Off: facts come from the detection CLI session.
+    DISCOVERY_NAPALM_FACTS: bool = False
+    # Try all credentials for a host at once on separate SSH connections
+    # instead of one after another (more failed logins per device)
+    DISCOVERY_PARALLEL_CREDENTIALS: bool = False
+    # Identify results are reused while the host's SSH host key is unchanged,
+    # for at most this long
+    DISCOVERY_CACHE_MAX_AGE_HOURS: int = 168
+    # A running discovery job whose owner has not checked in for this long
+    # is considered abandoned and may be resumed by another worker
+    DISCOVERY_JOB_STALE_SECONDS: int = 120
+    # Idle SSH/NAPALM sessions are kept open this long for reuse; 0 closes
+    # them after every operation
+    NORNIR_CONNECTION_IDLE_SECONDS: int = 300
+    # Longest a task waits for a device another operation is using before
+    # failing on that device
+    NORNIR_CONNECTION_WAIT_SECONDS: float = 120
+    # Nornir worker threads for read-only operations (shows, getters, syncs)
+    NORNIR_READ_WORKERS: int = 20
+    # Nornir worker threads for config pushes and commits
+    NORNIR_CONFIG_WORKERS: int = 5
+    # Per-platform caps within one operation, e.g. "junos:4,eos:8"
+    NORNIR_PLATFORM_LIMITS: Annotated[
+        dict[str, int] | str, BeforeValidator(parse_platform_limits)
+    ] = {}
 
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
@@ -139,6 +205,8 @@ class Settings(BaseSettings):
 
     # Per-device git repos holding config revision history
     CONFIG_REPO_DIR: str = "/app/config_repos"
+    # Revision diffs kept in memory (commit pairs are immutable)
+    CONFIG_DIFF_CACHE_SIZE: int = 256
 
     # WebAuthn / Passkey
     WEBAUTHN_RP_ID: str = "localhost"
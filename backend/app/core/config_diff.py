@@ -0,0 +1,339 @@
+"""Line diff of config texts in unified format.
+
+Lines are interned to integers so every comparison is an int compare, the
+common head and tail are trimmed, and the rest is split on lines that
+occur exactly once on both sides (patience anchors). Whatever is left
+between anchors goes through Myers' O(ND) greedy algorithm. Config changes
+are small relative to file size, so a 50k-line config diffs in roughly
+the time it takes to split it into lines.
+
+With sections=True the config is cut into top-level blocks (a line at
+column 0 plus its indented body, e.g. one `interface` or `router bgp`
+stanza), blocks are aligned by header, and only blocks whose text differs
+are diffed. Hunks never spill context across block boundaries and are
+labelled with the block header, like git's function-context headers.
+Where a block boundary cuts the context short on one side of a change,
+the other side is trimmed to match: patch(1) reads uneven context as
+"this hunk is at the start/end of the file" and would reject it at -F0.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+
+# Myers edit distance beyond which a region between anchors is reported as
+# a plain delete+insert; bounds time and the O(D^2) backtracking trace
+_MAX_EDIT_COST = 1000
+# Column-0 lines that close or separate blocks rather than start one
+_BLOCK_TRAILERS = frozenset({"!", "}", "exit", "end"})
+
+Opcode = tuple[str, int, int, int, int]
+# (i, j, n): a[i:i + n] == b[j:j + n]
+Block = tuple[int, int, int]
+
+
+def _intern(a: list[str], b: list[str]) -> tuple[list[int], list[int]]:
+    ids: dict[str, int] = {}
+    return (
+        [ids.setdefault(line, len(ids)) for line in a],
+        [ids.setdefault(line, len(ids)) for line in b],
+    )
+
+
+def _unique_anchors(
+    a: list[int], b: list[int], alo: int, ahi: int, blo: int, bhi: int
+) -> list[tuple[int, int]]:
+    """Longest increasing run of lines unique to both a[alo:ahi] and b[blo:bhi]."""
+    in_a = Counter(a[alo:ahi])
+    in_b = Counter(b[blo:bhi])
+    b_pos = {b[j]: j for j in range(blo, bhi) if in_b[b[j]] == 1 and in_a[b[j]] == 1}
+    pairs = [(i, b_pos[a[i]]) for i in range(alo, ahi) if a[i] in b_pos]
+    if not pairs:
+        return []
+    # Patience sorting: LIS of the b positions taken in a order
+    tails: list[int] = []
+    tail_idx: list[int] = []
+    back = [-1] * len(pairs)
+    for n, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_idx.append(n)
+        else:
+            tails[pos] = j
+            tail_idx[pos] = n
+        back[n] = tail_idx[pos - 1] if pos else -1
+    anchors = []
+    n = tail_idx[-1]
+    while n >= 0:
+        anchors.append(pairs[n])
+        n = back[n]
+    anchors.reverse()
+    return anchors
+
+
+def _myers(
+    a: list[int],
+    b: list[int],
+    alo: int,
+    ahi: int,
+    blo: int,
+    bhi: int,
+    out: list[Block],
+) -> None:
+    """Append the matching blocks of a shortest edit script to out."""
+    n, m = ahi - alo, bhi - blo
+    max_d = min(n + m, _MAX_EDIT_COST)
+    off = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace: list[list[int]] = []
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[off + k - 1] < v[off + k + 1]):
+                x = v[off + k + 1]
+            else:
+                x = v[off + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[off + k] = x
+            if x >= n and y >= m:
+                trace.append(v[off - d : off + d + 1])
+                _myers_backtrack(trace, n, m, alo, blo, out)
+                return
+        trace.append(v[off - d : off + d + 1])
+    # Too different to be worth aligning: no matches, delete+insert
+
+
+def _myers_backtrack(
+    trace: list[list[int]],
+    x: int,
+    y: int,
+    alo: int,
+    blo: int,
+    out: list[Block],
+) -> None:
+    for d in range(len(trace) - 1, 0, -1):
+        prev = trace[d - 1]  # furthest x per diagonal k, at prev[k + d - 1]
+        k = x - y
+        if k == -d or (k != d and prev[k - 1 + d - 1] < prev[k + 1 + d - 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = prev[prev_k + d - 1]
+        prev_y = prev_x - prev_k
+        # The edit moved one step down or right; the rest is a diagonal snake
+        start_x = prev_x if prev_k == k + 1 else prev_x + 1
+        if x > start_x:
+            out.append((alo + start_x, blo + y - (x - start_x), x - start_x))
+        x, y = prev_x, prev_y
+    if x:
+        out.append((alo, blo, x))
+
+
+def _matches(
+    a: list[int], b: list[int], alo: int, ahi: int, blo: int, bhi: int
+) -> list[Block]:
+    """Sorted matching blocks between a[alo:ahi] and b[blo:bhi]."""
+    out: list[Block] = []
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        n = 0
+        while alo + n < ahi and blo + n < bhi and a[alo + n] == b[blo + n]:
+            n += 1
+        if n:
+            out.append((alo, blo, n))
+            alo, blo = alo + n, blo + n
+        n = 0
+        while ahi - n > alo and bhi - n > blo and a[ahi - n - 1] == b[bhi - n - 1]:
+            n += 1
+        if n:
+            ahi, bhi = ahi - n, bhi - n
+            out.append((ahi, bhi, n))
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if not anchors:
+            _myers(a, b, alo, ahi, blo, bhi, out)
+            continue
+        run_i, run_j, run = anchors[0][0], anchors[0][1], 0
+        for i, j in anchors:
+            if i == run_i + run and j == run_j + run:
+                run += 1
+                continue
+            out.append((run_i, run_j, run))
+            stack.append((run_i + run, i, run_j + run, j))
+            run_i, run_j, run = i, j, 1
+        out.append((run_i, run_j, run))
+        if alo < anchors[0][0] or blo < anchors[0][1]:
+            stack.append((alo, anchors[0][0], blo, anchors[0][1]))
+        alo, blo = run_i + run, run_j + run
+        if alo < ahi or blo < bhi:
+            stack.append((alo, ahi, blo, bhi))
+    out.sort()
+    return out
+
+
+def diff_opcodes(
+    a: list[int], b: list[int], alo: int, ahi: int, blo: int, bhi: int
+) -> list[Opcode]:
+    """difflib-style (tag, i1, i2, j1, j2) opcodes covering both ranges."""
+    opcodes: list[Opcode] = []
+    i, j = alo, blo
+    for mi, mj, n in _matches(a, b, alo, ahi, blo, bhi) + [(ahi, bhi, 0)]:
+        if i < mi and j < mj:
+            opcodes.append(("replace", i, mi, j, mj))
+        elif i < mi:
+            opcodes.append(("delete", i, mi, j, j))
+        elif j < mj:
+            opcodes.append(("insert", i, i, j, mj))
+        elif opcodes and n:
+            # Adjacent to the previous block: extend it
+            _, i1, _, j1, _ = opcodes.pop()
+            mi, mj, n = i1, j1, n + mi - i1
+        if n:
+            opcodes.append(("equal", mi, mi + n, mj, mj + n))
+        i, j = mi + n, mj + n
+    return opcodes
+
+
+def _group(opcodes: list[Opcode], context: int) -> list[list[Opcode]]:
+    """Split opcodes into hunks with at most context equal lines around changes."""
+    if not any(tag != "equal" for tag, *_ in opcodes):
+        return []
+    opcodes = list(opcodes)
+    if opcodes[0][0] == "equal":
+        _, i1, i2, j1, j2 = opcodes[0]
+        opcodes[0] = ("equal", max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    if opcodes[-1][0] == "equal":
+        _, i1, i2, j1, j2 = opcodes[-1]
+        opcodes[-1] = ("equal", i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+    groups: list[list[Opcode]] = []
+    group: list[Opcode] = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, i1 + context, j1, j1 + context))
+            groups.append(group)
+            group = []
+            i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+def _symmetric(group: list[Opcode], a_len: int, b_len: int) -> list[Opcode]:
+    """Trim a hunk's leading or trailing context so both have the same
+    length, unless the shorter one ends at the start or end of the file."""
+    first, last = group[0], group[-1]
+    lead = first[2] - first[1] if first[0] == "equal" else 0
+    trail = last[2] - last[1] if last[0] == "equal" else 0
+    at_start = first[1] == 0 and first[3] == 0
+    at_end = last[2] == a_len and last[4] == b_len
+    group = list(group)
+    if lead < trail and not at_start:
+        _, i1, _, j1, _ = last
+        group[-1] = ("equal", i1, i1 + lead, j1, j1 + lead)
+    elif trail < lead and not at_end:
+        _, _, i2, _, j2 = first
+        group[0] = ("equal", i2 - trail, i2, j2 - trail, j2)
+    return [op for op in group if op[0] != "equal" or op[2] > op[1]]
+
+
+def _range(start: int, stop: int) -> str:
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def _format_hunk(
+    a: list[str], b: list[str], group: list[Opcode], label: str = ""
+) -> list[str]:
+    first, last = group[0], group[-1]
+    header = f"@@ -{_range(first[1], last[2])} +{_range(first[3], last[4])} @@"
+    lines = [f"{header} {label}" if label else header]
+    for tag, i1, i2, j1, j2 in group:
+        if tag == "equal":
+            lines.extend(" " + line for line in a[i1:i2])
+            continue
+        lines.extend("-" + line for line in a[i1:i2])
+        lines.extend("+" + line for line in b[j1:j2])
+    return lines
+
+
+def _sections(lines: list[str]) -> tuple[list[str], list[int]]:
+    """Headers of the top-level blocks and their start lines, plus len(lines)."""
+    headers: list[str] = []
+    starts: list[int] = []
+    for i, line in enumerate(lines):
+        if headers and (
+            not line or line[0].isspace() or line.strip() in _BLOCK_TRAILERS
+        ):
+            continue
+        headers.append(line)
+        starts.append(i)
+    starts.append(len(lines))
+    return headers, starts
+
+
+def _section_hunks(
+    a_lines: list[str],
+    b_lines: list[str],
+    a: list[int],
+    b: list[int],
+    context: int,
+) -> list[tuple[list[Opcode], str]]:
+    """Align blocks by header, then diff each changed block (or run of
+    added/removed blocks) on its own."""
+    a_headers, a_starts = _sections(a_lines)
+    b_headers, b_starts = _sections(b_lines)
+    ha, hb = _intern(a_headers, b_headers)
+    regions: list[tuple[int, int, int, int, str]] = []
+    for tag, i1, i2, j1, j2 in diff_opcodes(ha, hb, 0, len(ha), 0, len(hb)):
+        if tag != "equal":
+            label = b_headers[j1] if j1 < j2 else a_headers[i1]
+            regions.append(
+                (a_starts[i1], a_starts[i2], b_starts[j1], b_starts[j2], label)
+            )
+            continue
+        for i, j in zip(range(i1, i2), range(j1, j2), strict=True):
+            as_, ae, bs, be = a_starts[i], a_starts[i + 1], b_starts[j], b_starts[j + 1]
+            if a[as_:ae] != b[bs:be]:
+                regions.append((as_, ae, bs, be, a_headers[i]))
+    hunks: list[tuple[list[Opcode], str]] = []
+    for as_, ae, bs, be, label in regions:
+        opcodes = diff_opcodes(a, b, as_, ae, bs, be)
+        hunks.extend(
+            (_symmetric(group, len(a), len(b)), label)
+            for group in _group(opcodes, context)
+        )
+    return hunks
+
+
+def unified_diff(
+    old: str,
+    new: str,
+    *,
+    fromfile: str = "a",
+    tofile: str = "b",
+    context: int = 3,
+    sections: bool = False,
+) -> str:
+    """Unified diff of two config texts; empty when they are equal."""
+    if old == new:
+        return ""
+    a_lines, b_lines = old.splitlines(), new.splitlines()
+    a, b = _intern(a_lines, b_lines)
+    if sections:
+        hunks = _section_hunks(a_lines, b_lines, a, b, context)
+    else:
+        opcodes = diff_opcodes(a, b, 0, len(a), 0, len(b))
+        hunks = [(group, "") for group in _group(opcodes, context)]
+    if not hunks:
+        return ""
+    out = [f"--- {fromfile}", f"+++ {tofile}"]
+    for group, label in hunks:
+        out.extend(_format_hunk(a_lines, b_lines, group, label))
+    return "\n".join(out) + "\n"
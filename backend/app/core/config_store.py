@@ -3,19 +3,54 @@
 Each device gets a non-bare git repository at {CONFIG_REPO_DIR}/{device_id}/
 tracking a single file, running-config.txt. Config text lives only in git;
 the configrevision DB table stores metadata pointing at commit hashes.
+
+Objects, refs and the index are read and written in-process in git's own
+on-disk format (loose zlib objects, v2 pack indexes, index v2), so
+snapshots and revision reads never fork a git binary while the repositories
+stay usable with plain git (log, show, fsck, gc). Diffs are computed by
+app.core.config_diff and cached, since a pair of commits never changes.
 """
 
 import fcntl
-import subprocess
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from collections.abc import Iterator
 from contextlib import contextmanager
 from pathlib import Path
 
 from app.core.config import settings
+from app.core.config_diff import unified_diff
 
 CONFIG_FILENAME = "running-config.txt"
 COMMITTER_NAME = "netconsole"
 COMMITTER_EMAIL = "netconsole@localhost"
+BRANCH_REF = "refs/heads/main"
+
+_FILE_MODE = b"100644"
+_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+_GIT_CONFIG = (
+    "[core]\n"
+    "\trepositoryformatversion = 0\n"
+    "\tfilemode = true\n"
+    "\tbare = false\n"
+    "\tlogallrefupdates = true\n"
+)
+# Pack entry types (see gitformat-pack)
+_PACK_TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+_OFS_DELTA = 6
+_REF_DELTA = 7
+
+# (device_id, base, target, sections) -> diff, least recently used first
+_diff_cache: OrderedDict[tuple[int, str, str, bool], str] = OrderedDict()
+_diff_cache_lock = threading.Lock()
 
 
 class ConfigStoreError(Exception):
@@ -26,36 +61,279 @@ def _repo_path(device_id: int) -> Path:
     return Path(settings.CONFIG_REPO_DIR) / str(device_id)
 
 
-def _git(
-    device_id: int, *args: str, env: dict[str, str] | None = None
-) -> subprocess.CompletedProcess[str]:
-    base_env = {
-        "GIT_COMMITTER_NAME": COMMITTER_NAME,
-        "GIT_COMMITTER_EMAIL": COMMITTER_EMAIL,
-        "GIT_AUTHOR_NAME": COMMITTER_NAME,
-        "GIT_AUTHOR_EMAIL": COMMITTER_EMAIL,
-        # Ignore host/user gitconfig so behavior is identical everywhere
-        "GIT_CONFIG_GLOBAL": "/dev/null",
-        "GIT_CONFIG_SYSTEM": "/dev/null",
-        "HOME": str(_repo_path(device_id)),
-    }
-    if env:
-        base_env.update(env)
+def _git_dir(device_id: int) -> Path:
+    return _repo_path(device_id) / ".git"
+
+
+# ---------------------------------------------------------------- objects
+def _object_bytes(kind: str, data: bytes) -> tuple[str, bytes]:
+    """(sha1 hex, uncompressed loose object) for an object of kind."""
+    raw = f"{kind} {len(data)}\0".encode() + data
+    return hashlib.sha1(raw).hexdigest(), raw
+
+
+def _write_object(git_dir: Path, kind: str, data: bytes) -> str:
+    sha, raw = _object_bytes(kind, data)
+    path = git_dir / "objects" / sha[:2] / sha[2:]
+    if path.exists():
+        return sha
+    path.parent.mkdir(exist_ok=True)
+    # Write-then-rename so a concurrent reader never sees a partial object
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix="tmp_obj_")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(zlib.compress(raw, 1))
+    os.chmod(tmp, 0o444)
+    os.replace(tmp, path)
+    return sha
+
+
+def _read_object(git_dir: Path, sha: str) -> tuple[str, bytes]:
+    """(kind, data) of a loose or packed object."""
+    path = git_dir / "objects" / sha[:2] / sha[2:]
+    try:
+        raw = zlib.decompress(path.read_bytes())
+    except FileNotFoundError:
+        packed = _read_packed_object(git_dir, sha)
+        if packed is None:
+            raise ConfigStoreError(f"object {sha} not found in {git_dir}")
+        return packed
+    header, _, data = raw.partition(b"\0")
+    kind, _, _ = header.decode().partition(" ")
+    return kind, data
+
+
+def _pack_offset(idx: bytes, binsha: bytes) -> int | None:
+    """Offset of binsha in a version 2 pack index, or None."""
+    if idx[:8] != b"\377tOc\0\0\0\2":
+        raise ConfigStoreError("unsupported pack index version")
+
+    def fanout(i: int) -> int:
+        return int.from_bytes(idx[8 + 4 * i : 12 + 4 * i], "big")
+
+    count = fanout(255)
+    lo = fanout(binsha[0] - 1) if binsha[0] else 0
+    hi = fanout(binsha[0])
+    names = 8 + 256 * 4
+    while lo < hi:
+        mid = (lo + hi) // 2
+        name = idx[names + 20 * mid : names + 20 * mid + 20]
+        if name < binsha:
+            lo = mid + 1
+        elif name > binsha:
+            hi = mid
+        else:
+            offsets = names + 24 * count
+            offset = int.from_bytes(
+                idx[offsets + 4 * mid : offsets + 4 * mid + 4], "big"
+            )
+            if offset & 0x80000000:
+                large = offsets + 4 * count + 8 * (offset & 0x7FFFFFFF)
+                offset = int.from_bytes(idx[large : large + 8], "big")
+            return offset
+    return None
+
+
+def _read_packed_object(git_dir: Path, sha: str) -> tuple[str, bytes] | None:
+    binsha = bytes.fromhex(sha)
+    for idx_path in sorted((git_dir / "objects" / "pack").glob("pack-*.idx")):
+        offset = _pack_offset(idx_path.read_bytes(), binsha)
+        if offset is None:
+            continue
+        with (
+            open(idx_path.with_suffix(".pack"), "rb") as fh,
+            mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as pack,
+        ):
+            return _unpack_entry(git_dir, pack, offset)
+    return None
+
+
+def _unpack_entry(git_dir: Path, pack: mmap.mmap, offset: int) -> tuple[str, bytes]:
+    pos = offset
+    byte = pack[pos]
+    pos += 1
+    type_id = (byte >> 4) & 7
+    while byte & 0x80:  # size varint; zlib tells us where the data ends
+        byte = pack[pos]
+        pos += 1
+
+    base: tuple[str, bytes] | None = None
+    if type_id == _OFS_DELTA:
+        byte = pack[pos]
+        pos += 1
+        distance = byte & 0x7F
+        while byte & 0x80:
+            byte = pack[pos]
+            pos += 1
+            distance = ((distance + 1) << 7) | (byte & 0x7F)
+        base = _unpack_entry(git_dir, pack, offset - distance)
+    elif type_id == _REF_DELTA:
+        base = _read_object(git_dir, pack[pos : pos + 20].hex())
+        pos += 20
+    elif type_id not in _PACK_TYPES:
+        raise ConfigStoreError(f"bad pack entry type {type_id} at {offset}")
+
+    inflate = zlib.decompressobj()
+    chunks = []
+    while not inflate.eof:
+        chunk = pack[pos : pos + 65536]
+        if not chunk:
+            raise ConfigStoreError(f"truncated pack entry at {offset}")
+        chunks.append(inflate.decompress(chunk))
+        pos += len(chunk)
+    data = b"".join(chunks)
+    if base is None:
+        return _PACK_TYPES[type_id], data
+    return base[0], _apply_delta(base[1], data)
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    pos = 0
+
+    def varint() -> int:
+        nonlocal pos
+        value = shift = 0
+        while True:
+            byte = delta[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value
+
+    varint()  # base size
+    out = bytearray()
+    target_size = varint()
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:  # copy from base
+            start = size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    start |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            out += base[start : start + (size or 0x10000)]
+        elif op:  # insert literal
+            out += delta[pos : pos + op]
+            pos += op
+        else:
+            raise ConfigStoreError("bad delta opcode")
+    if len(out) != target_size:
+        raise ConfigStoreError("delta result size mismatch")
+    return bytes(out)
+
+
+def _commit_tree(data: bytes) -> str:
+    # A commit object starts with "tree <sha>\n"
+    return data[5:45].decode()
+
+
+def _tree_entry(data: bytes, name: str) -> str | None:
+    pos = 0
+    target = name.encode()
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        nul = data.index(b"\0", space)
+        if data[space + 1 : nul] == target:
+            return data[nul + 1 : nul + 21].hex()
+        pos = nul + 21
+    return None
+
+
+def _config_blob(git_dir: Path, commit_hash: str) -> str:
+    kind, commit = _read_object(git_dir, commit_hash)
+    if kind != "commit":
+        raise ConfigStoreError(f"{commit_hash} is a {kind}, not a commit")
+    _, tree = _read_object(git_dir, _commit_tree(commit))
+    blob = _tree_entry(tree, CONFIG_FILENAME)
+    if blob is None:
+        raise ConfigStoreError(f"{CONFIG_FILENAME} missing from {commit_hash}")
+    return blob
+
+
+# ---------------------------------------------------------------- refs
+def _read_head(git_dir: Path) -> str | None:
+    """Commit hash of the branch, or None before the first commit."""
+    try:
+        return (git_dir / BRANCH_REF).read_text().strip()
+    except FileNotFoundError:
+        pass
+    # git gc moves loose refs into packed-refs
+    try:
+        packed = (git_dir / "packed-refs").read_text()
+    except FileNotFoundError:
+        return None
+    for line in packed.splitlines():
+        sha, _, ref = line.partition(" ")
+        if ref == BRANCH_REF:
+            return sha
+    return None
+
+
+def _update_head(git_dir: Path, commit_hash: str) -> None:
+    ref = git_dir / BRANCH_REF
+    ref.parent.mkdir(parents=True, exist_ok=True)
+    lock = ref.with_name(ref.name + ".lock")
     try:
-        return subprocess.run(
-            ["git", *args],
-            cwd=_repo_path(device_id),
-            env=base_env,
-            capture_output=True,
-            text=True,
-            check=True,
+        fd = os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError as exc:
+        raise ConfigStoreError(f"{lock} exists; another update in progress") from exc
+    with os.fdopen(fd, "w") as fh:
+        fh.write(commit_hash + "\n")
+    os.replace(lock, ref)
+
+
+# ---------------------------------------------------------------- work tree
+def _write_index(git_dir: Path, worktree_file: Path, blob: str) -> None:
+    """Stage worktree_file as blob (index v2, one entry) so `git status`
+    in the repository stays clean."""
+    st = worktree_file.stat()
+    name = worktree_file.name.encode()
+    entry = b"".join(
+        (v & 0xFFFFFFFF).to_bytes(4, "big")
+        for v in (
+            int(st.st_ctime),
+            st.st_ctime_ns % 1_000_000_000,
+            int(st.st_mtime),
+            st.st_mtime_ns % 1_000_000_000,
+            st.st_dev,
+            st.st_ino,
+            0o100644,
+            st.st_uid,
+            st.st_gid,
+            st.st_size,
         )
-    except subprocess.CalledProcessError as exc:
-        raise ConfigStoreError(
-            f"git {' '.join(args)} failed for device {device_id}: {exc.stderr.strip()}"
-        ) from exc
-    except FileNotFoundError as exc:
-        raise ConfigStoreError("git binary not found") from exc
+    )
+    entry += bytes.fromhex(blob) + len(name).to_bytes(2, "big") + name
+    entry += b"\0" * (8 - len(entry) % 8)
+    body = b"DIRC" + (2).to_bytes(4, "big") + (1).to_bytes(4, "big") + entry
+    tmp = git_dir / "index.lock"
+    tmp.write_bytes(body + hashlib.sha1(body).digest())
+    os.replace(tmp, git_dir / "index")
+
+
+def _clean_message(message: str) -> str:
+    # What `git commit -m` stores: trailing whitespace stripped, runs of
+    # blank lines collapsed, no leading/trailing blank lines
+    lines: list[str] = []
+    for line in message.splitlines():
+        line = line.rstrip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    while lines and not lines[-1]:
+        lines.pop()
+    return "\n".join(lines) + "\n"
+
+
+def _ident(name: str, email: str) -> str:
+    def clean(value: str) -> str:
+        return re.sub(r"[<>\n]", "", value).strip()
+
+    return f"{clean(name)} <{clean(email)}> {int(time.time())} +0000"
 
 
 @contextmanager
@@ -72,10 +350,15 @@ def repo_lock(device_id: int) -> Iterator[None]:
 
 
 def ensure_repo(device_id: int) -> Path:
+    """Create the repository layout `git init -b main` would, if missing."""
     repo = _repo_path(device_id)
-    repo.mkdir(parents=True, exist_ok=True)
-    if not (repo / ".git").is_dir():
-        _git(device_id, "init", "-b", "main")
+    git_dir = repo / ".git"
+    if (git_dir / "HEAD").is_file():
+        return repo
+    for sub in ("objects/info", "objects/pack", "refs/heads", "refs/tags"):
+        (git_dir / sub).mkdir(parents=True, exist_ok=True)
+    (git_dir / "config").write_text(_GIT_CONFIG)
+    (git_dir / "HEAD").write_text(f"ref: {BRANCH_REF}\n")
     return repo
 
 
@@ -92,46 +375,81 @@ def commit_config(
     When the config is identical to HEAD, no commit is made and the current
     HEAD hash is returned with changed=False.
     """
-    ensure_repo(device_id)
-    repo = _repo_path(device_id)
+    repo = ensure_repo(device_id)
+    git_dir = repo / ".git"
     if not config_text.endswith("\n"):
         config_text += "\n"
-    (repo / CONFIG_FILENAME).write_text(config_text)
-    _git(device_id, "add", CONFIG_FILENAME)
-
-    status = _git(device_id, "status", "--porcelain", "--", CONFIG_FILENAME)
-    if not status.stdout.strip():
-        head = _git(device_id, "rev-parse", "HEAD")
-        return head.stdout.strip(), False
-
-    _git(
-        device_id,
-        "commit",
-        "-m",
-        message,
-        env={
-            "GIT_AUTHOR_NAME": author_name or COMMITTER_NAME,
-            "GIT_AUTHOR_EMAIL": author_email or COMMITTER_EMAIL,
-        },
+    content = config_text.encode()
+    blob, _ = _object_bytes("blob", content)
+
+    parent = _read_head(git_dir)
+    if parent and _config_blob(git_dir, parent) == blob:
+        return parent, False
+
+    _write_object(git_dir, "blob", content)
+    tree = _write_object(
+        git_dir,
+        "tree",
+        _FILE_MODE + b" " + CONFIG_FILENAME.encode() + b"\0" + bytes.fromhex(blob),
     )
-    _git(device_id, "gc", "--auto", "--quiet")
-    head = _git(device_id, "rev-parse", "HEAD")
-    return head.stdout.strip(), True
+    commit = f"tree {tree}\n"
+    if parent:
+        commit += f"parent {parent}\n"
+    author = _ident(author_name or COMMITTER_NAME, author_email or COMMITTER_EMAIL)
+    commit += (
+        f"author {author}\n"
+        f"committer {_ident(COMMITTER_NAME, COMMITTER_EMAIL)}\n"
+        f"\n{_clean_message(message)}"
+    )
+    commit_hash = _write_object(git_dir, "commit", commit.encode())
+
+    worktree_file = repo / CONFIG_FILENAME
+    worktree_file.write_bytes(content)
+    _write_index(git_dir, worktree_file, blob)
+    _update_head(git_dir, commit_hash)
+    return commit_hash, True
+
+
+def _read_config(device_id: int, commit_hash: str) -> tuple[str, str]:
+    """(blob hash, config text) of CONFIG_FILENAME at commit_hash."""
+    if not _SHA_RE.match(commit_hash):
+        raise ConfigStoreError(f"invalid commit hash {commit_hash!r}")
+    git_dir = _git_dir(device_id)
+    blob = _config_blob(git_dir, commit_hash)
+    _, data = _read_object(git_dir, blob)
+    return blob, data.decode(errors="replace")
 
 
 def get_config_at(device_id: int, commit_hash: str) -> str:
-    result = _git(device_id, "show", f"{commit_hash}:{CONFIG_FILENAME}")
-    return result.stdout
+    return _read_config(device_id, commit_hash)[1]
 
 
-def diff_commits(device_id: int, base: str, target: str) -> str:
-    result = _git(device_id, "diff", "--no-color", base, target, "--", CONFIG_FILENAME)
-    return result.stdout
+def diff_commits(
+    device_id: int, base: str, target: str, *, sections: bool = False
+) -> str:
+    key = (device_id, base, target, sections)
+    with _diff_cache_lock:
+        if key in _diff_cache:
+            _diff_cache.move_to_end(key)
+            return _diff_cache[key]
+    diff = unified_diff(
+        get_config_at(device_id, base),
+        get_config_at(device_id, target),
+        fromfile=f"a/{CONFIG_FILENAME}",
+        tofile=f"b/{CONFIG_FILENAME}",
+        sections=sections,
+    )
+    with _diff_cache_lock:
+        _diff_cache[key] = diff
+        while len(_diff_cache) > settings.CONFIG_DIFF_CACHE_SIZE:
+            _diff_cache.popitem(last=False)
+    return diff
 
 
 def delete_repo(device_id: int) -> None:
-    import shutil
-
+    with _diff_cache_lock:
+        for key in [k for k in _diff_cache if k[0] == device_id]:
+            del _diff_cache[key]
     repo = _repo_path(device_id)
     if repo.is_dir():
         shutil.rmtree(repo, ignore_errors=True)
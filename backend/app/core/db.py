@@ -1,3 +1,7 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy import text
 from sqlmodel import Session, create_engine, select
 
 from app.core.config import settings
@@ -7,11 +11,53 @@ from app.models import User, UserCreate
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
 
+@contextmanager
+def try_advisory_lock(key: int) -> Iterator[bool]:
+    """Take a Postgres session-level advisory lock without waiting.
+
+    Yields whether it was acquired; it is held on a dedicated connection
+    until the block exits and shared by every process using the database.
+    If this process dies, Postgres releases it with the connection.
+    """
+    with engine.connect() as conn:
+        acquired = bool(
+            conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": key}
+            ).scalar()
+        )
+        # The lock outlives the transaction; don't sit idle in one meanwhile
+        conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+
 # make sure all SQLModel models are imported (app.models) before initializing DB
 # otherwise, SQLModel might fail to initialize relationships properly
 # for more details: https://github.com/tiangolo/full-stack-fastapi-template/issues/28
 
 
+def advisory_lock_held(key: int) -> bool:
+    """Whether any session holds the advisory lock key, checked in pg_locks
+    so the check itself never takes it."""
+    with engine.connect() as conn:
+        return bool(
+            conn.execute(
+                text(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks"
+                    " WHERE locktype = 'advisory' AND granted"
+                    " AND database = (SELECT oid FROM pg_database"
+                    " WHERE datname = current_database())"
+                    # A bigint key is split into classid (high) and objid (low)
+                    " AND classid = :high AND objid = :low AND objsubid = 1)"
+                ),
+                {"high": (key >> 32) & 0xFFFFFFFF, "low": key & 0xFFFFFFFF},
+            ).scalar()
+        )
+
+
 def init_db(session: Session) -> None:
     # Tables should be created with Alembic migrations
     # But if you don't want to use migrations, create
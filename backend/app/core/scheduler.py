@@ -1,52 +1,381 @@
 import asyncio
 import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from typing import Any
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlmodel import Session, select
 
-from app.core.db import engine
+from app.core.config import settings
+from app.core.db import advisory_lock_held, engine, try_advisory_lock
 from app.crud.devices import update_device_metadata
 from app.models import Device
 
 logger = logging.getLogger(__name__)
 scheduler = AsyncIOScheduler()
+# Postgres advisory lock key held by the running backup pass, so the nightly
+# job in every app worker and a manual run never overlap. It is released
+# when the pass returns; a device that hit CONFIG_BACKUP_DEVICE_TIMEOUT_SECONDS
+# may still be snapshotting in its abandoned thread then (counted in the
+# pass's "timed_out"), and can overlap the start of the next pass.
+BACKUP_LOCK_KEY = 0x6E630001
+# Health probe results are written once this many have landed or this long
+# after the last write, whichever comes first
+HEALTH_FLUSH_SIZE = 500
+HEALTH_FLUSH_SECONDS = 1.0
 
 
-async def sync_all_devices() -> None:
+async def run_fleet_pass(
+    name: str,
+    worker: Callable[[int], Any],
+    *,
+    max_workers: int,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """Run worker(device_id) for every device, max_workers at a time.
+
+    Each worker runs in its own thread and is expected to open its own
+    short-lived Session; a failure is logged and counted, never propagated,
+    so one unreachable device cannot stall the rest of the pass.
+
+    With timeout, a device whose worker runs longer than that many seconds
+    is counted as failed and the pass moves on; the thread itself cannot be
+    interrupted and is left to finish in the background. Non-None worker
+    return values are tallied in the summary's "outcomes".
+    """
+    started = time.monotonic()
+    with Session(engine) as session:
+        devices = session.exec(select(Device.id, Device.hostname)).all()
+
+    loop = asyncio.get_running_loop()
+    workers = max(1, min(max_workers, len(devices) or 1))
+    failed: list[str] = []
+    timed_out: list[str] = []
+    outcomes: Counter[str] = Counter()
+
+    async def run_one(pool: ThreadPoolExecutor, device_id: int, hostname: str) -> None:
+        # The timeout starts when a pool thread picks the device up, not
+        # while it waits in the queue behind other devices
+        running = asyncio.Event()
+
+        def run() -> Any:
+            loop.call_soon_threadsafe(running.set)
+            return worker(device_id)
+
+        future = loop.run_in_executor(pool, run)
+        try:
+            await running.wait()
+            outcome = await asyncio.wait_for(future, timeout)
+            if outcome is not None:
+                outcomes[str(outcome)] += 1
+            logger.debug("%s: %s done", name, hostname)
+        except TimeoutError:
+            failed.append(hostname)
+            timed_out.append(hostname)
+            logger.error("%s timed out for %s after %ss", name, hostname, timeout)
+        except Exception as exc:
+            failed.append(hostname)
+            logger.error("%s failed for %s: %s", name, hostname, exc)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+    try:
+        await asyncio.gather(
+            *(
+                run_one(pool, device_id, hostname)
+                for device_id, hostname in devices
+                if device_id is not None
+            )
+        )
+    finally:
+        # Don't wait for threads still stuck on timed-out devices
+        pool.shutdown(wait=not timed_out)
+
+    summary = {
+        "name": name,
+        "total": len(devices),
+        "succeeded": len(devices) - len(failed),
+        "failed": len(failed),
+        "failed_hosts": sorted(failed),
+        "timed_out": len(timed_out),
+        "outcomes": dict(outcomes),
+        "workers": workers,
+        "duration_seconds": round(time.monotonic() - started, 2),
+    }
+    logger.info(
+        "%s pass complete: %d/%d succeeded, %d failed in %.2fs (%d workers)",
+        name,
+        summary["succeeded"],
+        summary["total"],
+        summary["failed"],
+        summary["duration_seconds"],
+        workers,
+    )
+    return summary
+
+
+def _sync_device(device_id: int) -> None:
+    # Load the device in one session and ingest in another, so no pooled DB
+    # connection is held open while the SSH collection runs.
+    with Session(engine) as session:
+        device = session.get(Device, device_id)
+    if device is None:
+        return
+    with Session(engine) as session:
+        update_device_metadata(session=session, device_db=device)
+
+
+async def sync_all_devices() -> dict[str, Any]:
     logger.info("Scheduled sync: MAC/ARP/IP interfaces started")
+    return await run_fleet_pass(
+        "sync", _sync_device, max_workers=settings.SYNC_MAX_WORKERS
+    )
+
+
+def _backup_device(device_id: int) -> str | None:
+    from app.crud.config_revisions import snapshot_device_config, snapshot_if_changed
+
     with Session(engine) as session:
-        devices = session.exec(select(Device)).all()
-        for device in devices:
-            try:
-                await asyncio.to_thread(
-                    update_device_metadata, session=session, device_db=device
-                )
-                logger.info("Synced %s", device.hostname)
-            except Exception as exc:
-                logger.error("Sync failed for %s: %s", device.hostname, exc)
-    logger.info("Scheduled sync complete")
+        device = session.get(Device, device_id)
+    if device is None:
+        return None
+    with Session(engine) as session:
+        if settings.CONFIG_BACKUP_CHANGE_PROBE:
+            revision = snapshot_if_changed(
+                session, device, username="scheduler", user_email=""
+            )
+        else:
+            revision = snapshot_device_config(
+                session,
+                device,
+                action="scheduled",
+                username="scheduler",
+                user_email="",
+            )
+    return "changed" if revision else "unchanged"
+
+
+async def backup_all_devices() -> dict[str, Any]:
+    """Snapshot every device's running config and record the pass summary."""
+    from app.crud.config_backups import record_backup_run
+
+    with try_advisory_lock(BACKUP_LOCK_KEY) as acquired:
+        if not acquired:
+            logger.warning("Config backup already running, not starting another")
+            return {}
+        logger.info("Scheduled config backup started")
+        started_at = datetime.now(UTC)
+        summary = await run_fleet_pass(
+            "backup",
+            _backup_device,
+            max_workers=settings.CONFIG_BACKUP_MAX_WORKERS,
+            timeout=settings.CONFIG_BACKUP_DEVICE_TIMEOUT_SECONDS,
+        )
+        with Session(engine) as session:
+            record_backup_run(session, summary, started_at)
+    return summary
+
+
+def config_backup_running() -> bool:
+    """Whether a backup pass holds the lock, in this process or another."""
+    return advisory_lock_held(BACKUP_LOCK_KEY)
+
+
+def queue_config_backup() -> None:
+    """Run a backup pass now; it is skipped if one is already running."""
+    scheduler.add_job(
+        backup_all_devices,
+        id="config-backup-now",
+        replace_existing=True,
+        misfire_grace_time=None,
+    )
 
 
 async def health_check_all_devices() -> None:
-    from app.automation.health import check_devices_parallel
+    """Probe every device and write results in chunks as they land, so a
+    large fleet's statuses appear progressively and are never buffered in
+    full; the rollups are refreshed once at the end."""
+    from app.automation.health import ProbeResult, probe_devices
+    from app.crud.health import apply_health_statuses, record_probes, rollup_probes
+
+    def load_payload() -> list[dict[str, Any]]:
+        with Session(engine) as session:
+            return [
+                {"id": s.id, "ip": s.ipaddress, "port": s.port or 22}
+                for s in session.exec(select(Device)).all()
+            ]
+
+    def write(chunk: list[ProbeResult]) -> dict[int, str]:
+        with Session(engine) as session:
+            statuses = apply_health_statuses(
+                session, {r.device_id: r.status for r in chunk}
+            )
+            record_probes(session, chunk)
+        return statuses
+
+    def rollup() -> None:
+        with Session(engine) as session:
+            rollup_probes(session)
 
     logger.info("Scheduled health check started")
+    try:
+        payload = await asyncio.to_thread(load_payload)
+        results: dict[int, str] = {}
+        chunk: list[ProbeResult] = []
+        flushed_at = time.monotonic()
+        async for probe in probe_devices(payload):
+            chunk.append(probe)
+            if (
+                len(chunk) >= HEALTH_FLUSH_SIZE
+                or time.monotonic() - flushed_at >= HEALTH_FLUSH_SECONDS
+            ):
+                results.update(await asyncio.to_thread(write, chunk))
+                chunk, flushed_at = [], time.monotonic()
+        if chunk:
+            results.update(await asyncio.to_thread(write, chunk))
+        await asyncio.to_thread(rollup)
+        logger.info("Health check complete: %s", results)
+    except Exception as exc:
+        logger.error("Health check failed: %s", exc)
+    logger.info("Scheduled health check complete")
+
+
+async def run_discovery_job(job_id: int) -> None:
+    """Identify every pending host of a discovery job, checkpointing each
+    result as it lands. Safe to re-run after a restart: hosts that already
+    finished are not contacted again.
+
+    The job is claimed in the database first, so with several app workers
+    only one of them runs it; the owner keeps a heartbeat on the row and
+    stops identifying hosts if another worker took the job over.
+    """
+    from app.automation.discovery import identify_host
+    from app.crud.credential_stats import (
+        load_credential_stats,
+        record_credential_results,
+    )
+    from app.crud.discovery_cache import load_identify_cache, store_identify_results
+    from app.crud.discovery_jobs import (
+        claim_job,
+        get_pending_ips,
+        heartbeat_job,
+        load_job_credentials,
+        record_host_result,
+        set_job_status,
+    )
+    from app.models import DiscoveryJob
+
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    stale_seconds = settings.DISCOVERY_JOB_STALE_SECONDS
     with Session(engine) as session:
-        devices = session.exec(select(Device)).all()
-        payload = [
-            {"id": s.id, "ip": s.ipaddress, "port": s.port or 22} for s in devices
-        ]
+        if not claim_job(session, job_id, owner, stale_seconds):
+            return
+        job = session.get(DiscoveryJob, job_id)
+        if job is None:
+            return
+        port = job.port
+        credentials = load_job_credentials(session, job)
+        ips = get_pending_ips(session, job_id)
+        if not credentials:
+            set_job_status(session, job, "error", "No credentials available")
+            return
+    logger.info("Discovery job %d: identifying %d hosts", job_id, len(ips))
+    lost = threading.Event()
+
+    async def heartbeat() -> None:
+        while True:
+            await asyncio.sleep(stale_seconds / 4)
+            try:
+                with Session(engine) as session:
+                    held = heartbeat_job(session, job_id, owner)
+            except Exception as exc:
+                # Keep beating; the job is only lost once the row says so
+                logger.warning("Discovery job %d heartbeat failed: %s", job_id, exc)
+                continue
+            if not held:
+                logger.warning("Discovery job %d taken over elsewhere", job_id)
+                lost.set()
+                return
+
+    def identify(ip: str) -> None:
+        if lost.is_set():
+            return
         try:
-            results = await asyncio.to_thread(check_devices_parallel, payload)
-            for s in devices:
-                if s.id is not None:
-                    new_status = results.get(s.id, "DOWN")
-                    if new_status == "UP" and s.health_status == "AUTH_ERROR":
-                        new_status = "AUTH_ERROR"
-                    s.health_status = new_status
-                session.add(s)
-            session.commit()
-            logger.info("Health check complete: %s", results)
-        except Exception as exc:
-            logger.error("Health check failed: %s", exc)
-    logger.info("Scheduled health check complete")
+            # Stats are re-read per host so later hosts benefit from earlier ones
+            with Session(engine) as session:
+                stats = load_credential_stats(session, [ip])
+                cache = load_identify_cache(session, [ip], port)
+            try:
+                candidate = identify_host(
+                    ip, port, credentials, credential_stats=stats, cache=cache
+                )
+            except Exception as exc:
+                candidate = {
+                    "ip": ip,
+                    "port": port,
+                    "status": "error",
+                    "error": str(exc),
+                }
+            with Session(engine) as session:
+                record_host_result(session, job_id, candidate)
+                record_credential_results(session, [candidate])
+                store_identify_results(session, [candidate])
+        except Exception:
+            # The host stays pending; the rest of the job carries on
+            logger.exception("Discovery job %d: could not record %s", job_id, ip)
+
+    loop = asyncio.get_running_loop()
+    workers = max(1, min(settings.DISCOVERY_IDENTIFY_WORKERS, len(ips) or 1))
+    status, error = "completed", ""
+    beat = asyncio.create_task(heartbeat())
+    pool = ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix=f"discovery-job-{job_id}"
+    )
+    try:
+        await asyncio.gather(*(loop.run_in_executor(pool, identify, ip) for ip in ips))
+    except Exception as exc:
+        logger.error("Discovery job %d failed: %s", job_id, exc)
+        status, error = "error", str(exc)
+    finally:
+        # Never block the event loop on hosts still queued or in flight
+        pool.shutdown(wait=False, cancel_futures=True)
+        beat.cancel()
+    with Session(engine) as session:
+        job = session.get(DiscoveryJob, job_id)
+        if job is None or job.owner != owner:
+            return
+        set_job_status(session, job, status, error)
+    logger.info("Discovery job %d %s", job_id, status)
+
+
+def queue_discovery_job(job_id: int) -> None:
+    """Run a discovery job on the scheduler's event loop as soon as possible."""
+    scheduler.add_job(
+        run_discovery_job,
+        args=[job_id],
+        id=f"discovery-job-{job_id}",
+        replace_existing=True,
+        misfire_grace_time=None,
+    )
+
+
+def resume_discovery_jobs() -> None:
+    """Re-queue jobs that are pending or whose owner stopped heartbeating.
+
+    Every app worker calls this at startup; a job still queued in several
+    of them is run by whichever claims it first (see run_discovery_job).
+    """
+    from app.crud.discovery_jobs import get_resumable_job_ids
+
+    with Session(engine) as session:
+        job_ids = get_resumable_job_ids(session, settings.DISCOVERY_JOB_STALE_SECONDS)
+    for job_id in job_ids:
+        logger.info("Resuming discovery job %d", job_id)
+        queue_discovery_job(job_id)
@@ -1,11 +1,17 @@
 from datetime import datetime
 from typing import Any
 
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql.expression import or_
 from sqlmodel import Session, asc, col, func, select
 
+from app.crud.sync_fingerprints import invalidate_fingerprint
 from app.models import Arp, ArpCreate, ArpUpdate, Device
 
+# Rows per INSERT ... ON CONFLICT / UPDATE statement during sync
+UPSERT_BATCH_SIZE = 1000
+
 
 def get_arps(
     session: Session,
@@ -107,6 +113,7 @@ def get_arp_by_ip(
 def create_arp(session: Session, arp_in: ArpCreate) -> Arp:
     arp = Arp.model_validate(arp_in)
     session.add(arp)
+    invalidate_fingerprint(session, "arp", arp.device_id)
     session.commit()
     session.refresh(arp)
     return arp
@@ -115,8 +122,10 @@ def create_arp(session: Session, arp_in: ArpCreate) -> Arp:
 def update_arp(*, session: Session, arp_db: Arp, arp_in: ArpUpdate) -> Any:
     update_dict = arp_in.model_dump(exclude_unset=True)
     update_dict["updated_at"] = datetime.now()
+    previous_device_id = arp_db.device_id
     arp_db.sqlmodel_update(update_dict)
     session.add(arp_db)
+    invalidate_fingerprint(session, "arp", previous_device_id, arp_db.device_id)
     session.commit()
     session.refresh(arp_db)
     return arp_db
@@ -124,6 +133,7 @@ def update_arp(*, session: Session, arp_db: Arp, arp_in: ArpUpdate) -> Any:
 
 def delete_arp(session: Session, arp_db: Arp):
     session.delete(arp_db)
+    invalidate_fingerprint(session, "arp", arp_db.device_id)
     session.commit()
     return True
 
@@ -136,22 +146,54 @@ def delete_arp_by_device_id(session: Session, device_id: int):
     return True
 
 
-def update_arp_running(session: Session, arps_in: dict, device_id: int) -> Any:
+def update_arp_running(session: Session, arps_in: list[dict], device_id: int) -> Any:
+    """Reconcile the device's ARP table in a handful of statements.
+
+    Same approach as update_mac_address_running, keyed on
+    (device_id, ip, mac, interface).
+    """
+    now = datetime.now()
+    incoming: dict[tuple[str, str, str], dict[str, Any]] = {}
     for arp_in in arps_in:
-        arp_in["mac"] = arp_in["mac"].lower().replace(":", "")
-        arp_in["device_id"] = device_id
-        arp_in["age"] = 0
-        if arp_in["age"]:
-            arp_in["age"] = int(arp_in["age"])
-        arp_db = get_arp_by_ip(
-            session=session,
-            ip=arp_in["ip"],
-            mac=arp_in["mac"],
-            interface=arp_in["interface"],
-            device_id=device_id,
-        )
-        if arp_db:
-            update_arp(session=session, arp_db=arp_db, arp_in=ArpUpdate(**arp_in))
+        row = ArpCreate(
+            **{
+                **arp_in,
+                "mac": arp_in["mac"].lower().replace(":", ""),
+                "device_id": device_id,
+                "age": 0,
+            }
+        ).model_dump()
+        incoming[(row["ip"], row["mac"], row["interface"])] = row
+
+    existing = {
+        (ip, mac, interface): (id, age)
+        for id, ip, mac, interface, age in session.exec(
+            select(Arp.id, Arp.ip, Arp.mac, Arp.interface, Arp.age).where(
+                Arp.device_id == device_id
+            )
+        ).all()
+    }
+
+    changed: list[dict[str, Any]] = []
+    unchanged_ids: list[int] = []
+    for key, row in incoming.items():
+        current = existing.get(key)
+        if current and current[1] == row["age"]:
+            unchanged_ids.append(current[0])
         else:
-            create_arp(session=session, arp_in=ArpCreate(**arp_in))
+            changed.append({**row, "created_at": now, "updated_at": now})
+
+    for start in range(0, len(changed), UPSERT_BATCH_SIZE):
+        statement = insert(Arp).values(changed[start : start + UPSERT_BATCH_SIZE])
+        statement = statement.on_conflict_do_update(
+            constraint="uq_arp_device_ip_mac_interface",
+            set_={"age": statement.excluded.age, "updated_at": now},
+        )
+        session.execute(statement)
+    for start in range(0, len(unchanged_ids), UPSERT_BATCH_SIZE):
+        id_batch = unchanged_ids[start : start + UPSERT_BATCH_SIZE]
+        session.execute(
+            update(Arp).where(col(Arp.id).in_(id_batch)).values(updated_at=now)
+        )
+    session.commit()
     return True
@@ -0,0 +1,44 @@
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlmodel import Session, col, func, select
+
+from app.models import ConfigBackupRun
+
+
+def record_backup_run(
+    session: Session, summary: dict[str, Any], started_at: datetime
+) -> ConfigBackupRun:
+    """Persist the run_fleet_pass summary of one backup pass."""
+    outcomes = summary.get("outcomes", {})
+    run = ConfigBackupRun(
+        started_at=started_at,
+        finished_at=datetime.now(UTC),
+        total=summary["total"],
+        changed=outcomes.get("changed", 0),
+        unchanged=outcomes.get("unchanged", 0),
+        failed=summary["failed"],
+        timed_out=summary.get("timed_out", 0),
+        failed_hosts=",".join(summary["failed_hosts"]),
+        duration_seconds=summary["duration_seconds"],
+    )
+    session.add(run)
+    session.commit()
+    session.refresh(run)
+    return run
+
+
+def get_backup_runs(
+    session: Session, skip: int = 0, limit: int = 20
+) -> list[ConfigBackupRun]:
+    statement = (
+        select(ConfigBackupRun)
+        .order_by(col(ConfigBackupRun.id).desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
+def get_backup_runs_count(session: Session) -> int:
+    return session.exec(select(func.count()).select_from(ConfigBackupRun)).one()
@@ -1,8 +1,16 @@
 from sqlmodel import Session, col, delete, func, select
 
-from app.automation.config_backup import get_running_config
+from app.automation.config_backup import (
+    get_config_change_marker,
+    get_running_config,
+    normalize_config,
+)
 from app.core import config_store
-from app.models import ConfigRevision, Device
+from app.crud.sync_fingerprints import fingerprint, sync_if_changed
+from app.models import ConfigRevision, Device, SyncFingerprint
+
+# SyncFingerprint.table_name holding the last config-change marker
+CONFIG_MARKER_TABLE = "running_config"
 
 
 def snapshot_device_config(
@@ -16,8 +24,8 @@ def snapshot_device_config(
     command_type: str = "",
     message: str = "",
 ) -> ConfigRevision | None:
-    """Fetch the running config, commit it to the device's git repo and record
-    a revision row.
+    """Fetch the running config, strip its volatile lines, commit it to the
+    device's git repo and record a revision row.
 
     Returns None when nothing changed and the action is a plain snapshot
     (manual/scheduled). pre_push/post_push/rollback revisions are always
@@ -33,7 +41,7 @@ def snapshot_device_config(
         )
 
     with config_store.repo_lock(device.id):
-        config_text = get_running_config(device)
+        config_text = normalize_config(device.platform, get_running_config(device))
         commit_hash, changed = config_store.commit_config(
             device.id,
             config_text,
@@ -60,6 +68,42 @@ def snapshot_device_config(
     return revision
 
 
+def snapshot_if_changed(
+    session: Session, device: Device, *, username: str, user_email: str
+) -> ConfigRevision | None:
+    """Scheduled snapshot that first asks the device whether its config moved.
+
+    The platform's change marker is compared with the one recorded when the
+    config was last fetched this way; the running config is only pulled and
+    committed when the marker differs or the platform has none.
+    """
+    assert device.id is not None
+    marker = get_config_change_marker(device)
+    if marker is None:
+        return snapshot_device_config(
+            session,
+            device,
+            action="scheduled",
+            username=username,
+            user_email=user_email,
+        )
+
+    revision: ConfigRevision | None = None
+
+    def fetch() -> None:
+        nonlocal revision
+        revision = snapshot_device_config(
+            session,
+            device,
+            action="scheduled",
+            username=username,
+            user_email=user_email,
+        )
+
+    sync_if_changed(session, device.id, CONFIG_MARKER_TABLE, fingerprint(marker), fetch)
+    return revision
+
+
 def get_revisions(
     session: Session, device_id: int, skip: int = 0, limit: int = 100
 ) -> list[ConfigRevision]:
@@ -107,5 +151,11 @@ def get_previous_revision(
 def delete_revisions_by_device_id(session: Session, device_id: int) -> None:
     statement = delete(ConfigRevision).where(col(ConfigRevision.device_id) == device_id)
     session.exec(statement)
+    # Without history the next scheduled backup must fetch in full
+    session.exec(
+        delete(SyncFingerprint)
+        .where(col(SyncFingerprint.device_id) == device_id)
+        .where(col(SyncFingerprint.table_name) == CONFIG_MARKER_TABLE)
+    )
     session.commit()
     config_store.delete_repo(device_id)
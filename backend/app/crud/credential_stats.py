@@ -0,0 +1,109 @@
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.expression import and_, or_
+from sqlmodel import Session, col, delete, func, select
+
+from app.automation.discovery import subnet_scope
+from app.models import Credential, CredentialStat
+
+
+def load_credential_stats(
+    session: Session, ips: Iterable[str]
+) -> dict[tuple[str, str], dict[int, int]]:
+    """Successes per credential for the /24s of ips and for every banner."""
+    subnets = {subnet_scope(ip) for ip in ips}
+    rows = session.exec(
+        select(
+            CredentialStat.kind,
+            CredentialStat.scope,
+            CredentialStat.credential_id,
+            CredentialStat.successes,
+        ).where(
+            or_(
+                and_(
+                    col(CredentialStat.kind) == "subnet",
+                    col(CredentialStat.scope).in_(subnets),
+                ),
+                col(CredentialStat.kind) == "banner",
+            )
+        )
+    ).all()
+    stats: dict[tuple[str, str], dict[int, int]] = defaultdict(dict)
+    for kind, scope, credential_id, successes in rows:
+        stats[(kind, scope)][credential_id] = successes
+    return dict(stats)
+
+
+def record_credential_results(
+    session: Session, candidates: Iterable[dict[str, Any]]
+) -> None:
+    """Count the winning and rejected credentials of identify results
+    against each host's /24 and SSH banner, in one upsert."""
+    counts: dict[tuple[int, str, str], list[int]] = defaultdict(lambda: [0, 0])
+    for candidate in candidates:
+        if candidate.get("cached"):
+            continue  # nobody logged in
+        scopes = [("subnet", subnet_scope(candidate["ip"]))]
+        if candidate.get("ssh_banner"):
+            scopes.append(("banner", candidate["ssh_banner"]))
+        outcomes = [
+            (cred_id, 1) for cred_id in candidate.get("failed_credential_ids", [])
+        ]
+        if candidate.get("credential_id"):
+            outcomes.append((candidate["credential_id"], 0))
+        for cred_id, slot in outcomes:
+            for kind, scope in scopes:
+                counts[(cred_id, kind, scope)][slot] += 1
+    if not counts:
+        return
+
+    # Credentials deleted while identify ran have nothing to learn into
+    existing = set(
+        session.exec(
+            select(Credential.id).where(
+                col(Credential.id).in_({cred_id for cred_id, _, _ in counts})
+            )
+        ).all()
+    )
+    now = datetime.now(UTC)
+    rows = [
+        {
+            "credential_id": cred_id,
+            "kind": kind,
+            "scope": scope,
+            "successes": successes,
+            "failures": failures,
+            "last_success_at": now if successes else None,
+        }
+        for (cred_id, kind, scope), (successes, failures) in counts.items()
+        if cred_id in existing
+    ]
+    if not rows:
+        return
+    statement = insert(CredentialStat).values(rows)
+    statement = statement.on_conflict_do_update(
+        constraint="uq_credentialstat_cred_kind_scope",
+        set_={
+            "successes": CredentialStat.successes + statement.excluded.successes,
+            "failures": CredentialStat.failures + statement.excluded.failures,
+            "last_success_at": func.coalesce(
+                statement.excluded.last_success_at, CredentialStat.last_success_at
+            ),
+        },
+    )
+    session.execute(statement)
+    session.commit()
+
+
+def delete_credential_stats_by_credential_id(
+    session: Session, credential_id: int
+) -> None:
+    statement = delete(CredentialStat).where(
+        col(CredentialStat.credential_id) == credential_id
+    )
+    session.exec(statement)
+    session.commit()
@@ -1,22 +1,27 @@
+import logging
 from datetime import datetime
 from typing import Any
 
 from sqlalchemy.sql.expression import or_
 from sqlmodel import Session, asc, func, select
 
+from app.automation.connection_pool import connection_pool
 from app.automation.devices import (
     DeviceAuthenticationError,
     DeviceConnectionError,
     get_metadata,
     get_metadata_all,
-    show_interfaces_status,
+    parse_interfaces_status,
 )
 from app.crud.arps import update_arp_running
-from app.crud.create_nornir import create_hosts
+from app.crud.health import set_health_status
 from app.crud.interfaces import update_interface_metadata
 from app.crud.ip_interfaces import update_ip_interface_running
 from app.crud.mac_addresses import update_mac_address_running
-from app.models import Credential, Device, DeviceCreate, DeviceUpdate
+from app.crud.sync_fingerprints import fingerprint, sync_if_changed
+from app.models import Device, DeviceCreate, DeviceUpdate
+
+logger = logging.getLogger(__name__)
 
 
 def get_devices(
@@ -62,14 +67,6 @@ def get_device_by_name(session: Session, hostname: str):
     return devices
 
 
-def _get_device_and_credential(session: Session):
-    statement = select(Device, Credential).outerjoin(
-        Credential, Device.credential_id == Credential.id
-    )
-    devices = session.exec(statement).all()
-    return devices
-
-
 def get_devices_count(session: Session, skip: int, limit: int, search: str = ""):
 
     count_statement = select(func.count()).select_from(Device)
@@ -96,24 +93,19 @@ def create_device(session: Session, device_in: DeviceCreate) -> Device:
     session.add(device)
     session.commit()
     session.refresh(device)
-    # Generate new hosts.yaml file
-    devices_db = _get_device_and_credential(session=session)
-    create_hosts(devices_db)
     return device
 
 
 def bulk_create_devices(
     session: Session, devices_in: list[DeviceCreate]
 ) -> list[Device]:
-    """Insert many devices with a single commit and a single inventory regen."""
+    """Insert many devices with a single commit."""
     devices = [Device.model_validate(s) for s in devices_in]
     for device in devices:
         session.add(device)
     session.commit()
     for device in devices:
         session.refresh(device)
-    devices_db = _get_device_and_credential(session=session)
-    create_hosts(devices_db)
     return devices
 
 
@@ -124,16 +116,15 @@ def update_device(
     Update an device.
     """
 
+    old_hostname = device_db.hostname
     update_dict = device_in.model_dump(exclude_unset=True)
     update_dict["updated_at"] = datetime.now()
     device_db.sqlmodel_update(update_dict)
     session.add(device_db)
     session.commit()
     session.refresh(device_db)
-
-    # Generate new hosts.yaml file
-    devices_db = _get_device_and_credential(session=session)
-    create_hosts(devices_db)
+    if device_db.hostname != old_hostname:
+        connection_pool.forget(old_hostname)
     return device_db
 
 
@@ -142,7 +133,6 @@ def update_device_delete_group(*, session: Session, group_name: str) -> Any:
     Update an device.
     """
 
-    # Generate new hosts.yaml file
     statement = select(Device)
     devices_db = session.exec(statement).all()
     device_change_groups = []
@@ -160,26 +150,129 @@ def update_device_delete_group(*, session: Session, group_name: str) -> Any:
         session.add(device_db)
         session.commit()
         session.refresh(device_db)
-    devices_db = _get_device_and_credential(session=session)
-    create_hosts(devices_db)
     return True
 
 
+def _ingest_tables(*, session: Session, device_db: Device, host_facts: dict) -> None:
+    """Write the collected MAC/ARP/IP/interface tables for one device.
+
+    Each table is fingerprinted first; a table identical to the one the
+    previous pass collected is not rewritten, only marked verified. A table
+    whose getter failed (host_facts["errors"]) is left as it was rather than
+    emptied.
+    """
+    device_id = device_db.id or 0
+    failed = host_facts.get("errors", {})
+    macs = host_facts.get("get_mac_address_table", [])
+    arps = host_facts.get("get_arp_table", [])
+    ips = host_facts.get("get_interfaces_ip", {})
+    intfs_status = (
+        host_facts.get("get_interfaces", {}) if device_db.platform == "junos" else {}
+    )
+
+    if "get_mac_address_table" not in failed:
+        sync_if_changed(
+            session,
+            device_id,
+            "mac_address",
+            fingerprint(macs),
+            lambda: update_mac_address_running(
+                session=session, mac_addresses_in=macs, device_id=device_id
+            ),
+        )
+
+    if "get_arp_table" not in failed:
+        sync_if_changed(
+            session,
+            device_id,
+            "arp",
+            # age ticks on every poll and is not stored
+            fingerprint(arps, ignore=("age",)),
+            lambda: update_arp_running(
+                session=session, arps_in=arps, device_id=device_id
+            ),
+        )
+
+    if "get_interfaces_ip" not in failed:
+        sync_if_changed(
+            session,
+            device_id,
+            "ip_interface",
+            fingerprint(ips),
+            lambda: update_ip_interface_running(
+                session=session, ip_interfaces_in=ips, device_id=device_id
+            ),
+        )
+
+    # Interface status/config came back over the same session as the
+    # getters. A failed command or unparsable output is not a device without
+    # ports: keep the stored interfaces and leave the rest of the sync alone.
+    if "cli" in failed or (
+        device_db.platform == "junos" and "get_interfaces" in failed
+    ):
+        return
+    try:
+        interfaces_in = parse_interfaces_status(device_db, host_facts.get("cli", {}))
+    except Exception:
+        logger.exception("Parsing interface status of %s failed", device_db.hostname)
+        return
+
+    sync_if_changed(
+        session,
+        device_id,
+        "interface",
+        fingerprint({"status": interfaces_in, "junos": intfs_status}),
+        lambda: update_interface_metadata(
+            session=session,
+            interfaces_in=interfaces_in,
+            interfaces_status=intfs_status,
+            device=device_db,
+        ),
+    )
+
+
+def _apply_facts(*, session: Session, device_db: Device, host_facts: dict) -> None:
+    """Store the facts and tables collected from one reachable device."""
+    set_health_status(device_db, "UP")
+    get_facts = host_facts.get("get_facts", {})
+
+    if get_facts.get("model"):
+        device_db.model = get_facts["model"]
+    elif device_db.platform == "junos" and not device_db.model:
+        device_db.model = "cRPD"
+
+    if get_facts.get("os_version"):
+        device_db.os_version = str(get_facts["os_version"])
+    if get_facts.get("serial_number"):
+        device_db.serial_number = str(get_facts["serial_number"])
+    if get_facts.get("vendor"):
+        device_db.vendor = get_facts["vendor"]
+    elif device_db.platform == "junos" and not device_db.vendor:
+        device_db.vendor = "Juniper"
+
+    device_db.updated_at = datetime.now()
+    session.add(device_db)
+    session.commit()
+    session.refresh(device_db)
+
+    _ingest_tables(session=session, device_db=device_db, host_facts=host_facts)
+
+
 def update_device_metadata(*, session: Session, device_db: Device) -> Any:
     """
     Update an device.
     """
     try:
-        facts = get_metadata(device=device_db)
+        facts = get_metadata(device=device_db, cli=True)
     except DeviceAuthenticationError as exc:
-        device_db.health_status = "AUTH_ERROR"
+        set_health_status(device_db, "AUTH_ERROR")
         device_db.updated_at = datetime.now()
         session.add(device_db)
         session.commit()
         session.refresh(device_db)
         raise exc
     except DeviceConnectionError as exc:
-        device_db.health_status = "DOWN"
+        set_health_status(device_db, "DOWN")
         device_db.updated_at = datetime.now()
         session.add(device_db)
         session.commit()
@@ -187,141 +280,45 @@ def update_device_metadata(*, session: Session, device_db: Device) -> Any:
         raise exc
 
     if facts:
-        device_db.health_status = "UP"
-        host_facts = facts.get(device_db.hostname, {})
-        get_facts = host_facts.get("get_facts", {})
-
-        if get_facts.get("model"):
-            device_db.model = get_facts["model"]
-        elif device_db.platform == "junos" and not device_db.model:
-            device_db.model = "cRPD"
-
-        if get_facts.get("os_version"):
-            device_db.os_version = str(get_facts["os_version"])
-        if get_facts.get("serial_number"):
-            device_db.serial_number = str(get_facts["serial_number"])
-        if get_facts.get("vendor"):
-            device_db.vendor = get_facts["vendor"]
-        elif device_db.platform == "junos" and not device_db.vendor:
-            device_db.vendor = "Juniper"
-
-        device_db.updated_at = datetime.now()
-        session.add(device_db)
-        session.commit()
-        session.refresh(device_db)
-
-        macs = host_facts.get("get_mac_address_table", [])
-        arps = host_facts.get("get_arp_table", [])
-        ips = host_facts.get("get_interfaces_ip", {})
-        intfs_status = host_facts.get("get_interfaces", {})
-
-        update_mac_address_running(
-            session=session,
-            mac_addresses_in=macs,
-            device_id=device_db.id,
-        )
-        update_arp_running(
+        _apply_facts(
             session=session,
-            arps_in=arps,
-            device_id=device_db.id,
-        )
-        update_ip_interface_running(
-            session=session,
-            ip_interfaces_in=ips,
-            device_id=device_db.id,
-        )
-
-        # Update interfaces safely:
-        try:
-            interfaces_in = show_interfaces_status(device=device_db)
-        except Exception:
-            interfaces_in = []
-
-        update_interface_metadata(
-            session=session,
-            interfaces_in=interfaces_in,
-            interfaces_status=intfs_status if device_db.platform == "junos" else {},
-            device=device_db,
+            device_db=device_db,
+            host_facts=facts.get(device_db.hostname, {}),
         )
         return device_db
     return False
 
 
 def delete_device(session: Session, device_db: Device):
-
+    hostname = device_db.hostname
     session.delete(device_db)
     session.commit()
-    devices_db = _get_device_and_credential(session=session)
-    create_hosts(devices_db)
+    connection_pool.forget(hostname)
     return True
 
 
-def update_device_metadata_all(*, session: Session, device_db: Device) -> Any:
+def update_device_metadata_all(*, session: Session) -> dict[str, int]:
     """
     Update all devices metadata.
+
+    Each device's results are written as soon as that device finishes, in
+    a session of its own (the handler runs on Nornir worker threads), so
+    memory holds a few devices' tables rather than the whole fleet's.
     """
+    bind = session.get_bind()
+    synced: list[str] = []
+
+    def ingest(hostname: str, host_facts: dict) -> None:
+        with Session(bind) as host_session:
+            device_db = host_session.exec(
+                select(Device).where(Device.hostname == hostname)
+            ).first()
+            if device_db is None:
+                return
+            _apply_facts(
+                session=host_session, device_db=device_db, host_facts=host_facts
+            )
+        synced.append(hostname)
 
-    facts = get_metadata_all()
-    if facts:
-        devices_db = get_devices(
-            session=session, skip=0, limit=500, ipaddress="", hostname=""
-        )
-        for device_db in devices_db:
-            if device_db.hostname in facts:
-                host_facts = facts[device_db.hostname]
-                get_facts = host_facts.get("get_facts", {})
-
-                if get_facts.get("model"):
-                    device_db.model = get_facts["model"]
-                elif device_db.platform == "junos" and not device_db.model:
-                    device_db.model = "cRPD"
-
-                if get_facts.get("os_version"):
-                    device_db.os_version = str(get_facts["os_version"])
-                if get_facts.get("serial_number"):
-                    device_db.serial_number = str(get_facts["serial_number"])
-                if get_facts.get("vendor"):
-                    device_db.vendor = get_facts["vendor"]
-                elif device_db.platform == "junos" and not device_db.vendor:
-                    device_db.vendor = "Juniper"
-
-                device_db.updated_at = datetime.now()
-                session.add(device_db)
-                session.commit()
-                session.refresh(device_db)
-
-                macs = host_facts.get("get_mac_address_table", [])
-                arps = host_facts.get("get_arp_table", [])
-                ips = host_facts.get("get_interfaces_ip", {})
-                intfs_status = host_facts.get("get_interfaces", {})
-
-                update_mac_address_running(
-                    session=session,
-                    mac_addresses_in=macs,
-                    device_id=device_db.id,
-                )
-                update_arp_running(
-                    session=session,
-                    arps_in=arps,
-                    device_id=device_db.id,
-                )
-                update_ip_interface_running(
-                    session=session,
-                    ip_interfaces_in=ips,
-                    device_id=device_db.id,
-                )
-
-                try:
-                    interfaces_in = show_interfaces_status(device=device_db)
-                except Exception:
-                    interfaces_in = []
-
-                update_interface_metadata(
-                    session=session,
-                    interfaces_in=interfaces_in,
-                    interfaces_status=intfs_status
-                    if device_db.platform == "junos"
-                    else {},
-                    device=device_db,
-                )
-    return True
+    failed = get_metadata_all(ingest)
+    return {"synced": len(synced), "failed": len(failed)}
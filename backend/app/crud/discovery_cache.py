@@ -0,0 +1,69 @@
+import json
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, delete, select
+
+from app.core.config import settings
+from app.models import DiscoveryCacheEntry
+
+
+def load_identify_cache(
+    session: Session, ips: Iterable[str], port: int
+) -> dict[tuple[str, int], tuple[str, dict[str, Any]]]:
+    """Unexpired cached identify results for ips, keyed by (ip, port)."""
+    cutoff = datetime.now(UTC) - timedelta(hours=settings.DISCOVERY_CACHE_MAX_AGE_HOURS)
+    rows = session.exec(
+        select(DiscoveryCacheEntry)
+        .where(DiscoveryCacheEntry.port == port)
+        .where(col(DiscoveryCacheEntry.ip).in_(set(ips)))
+        .where(DiscoveryCacheEntry.identified_at >= cutoff)
+    ).all()
+    return {(r.ip, r.port): (r.host_key, json.loads(r.candidate)) for r in rows}
+
+
+def store_identify_results(
+    session: Session, candidates: Iterable[dict[str, Any]]
+) -> None:
+    """Cache fresh "identified" results under their host key; drop the entry
+    of any host that was re-identified with another outcome."""
+    now = datetime.now(UTC)
+    rows: dict[tuple[str, int], dict[str, Any]] = {}
+    stale = []
+    for candidate in candidates:
+        if candidate.get("cached"):
+            continue
+        if candidate["status"] == "identified" and candidate.get("host_key"):
+            rows[(candidate["ip"], candidate["port"])] = {
+                "ip": candidate["ip"],
+                "port": candidate["port"],
+                "host_key": candidate["host_key"],
+                "candidate": json.dumps(candidate),
+                "identified_at": now,
+            }
+        elif candidate.get("host_key"):
+            # Reachable but no longer identifiable with these credentials
+            stale.append((candidate["ip"], candidate["port"]))
+    if stale:
+        session.exec(
+            delete(DiscoveryCacheEntry).where(
+                tuple_(col(DiscoveryCacheEntry.ip), col(DiscoveryCacheEntry.port)).in_(
+                    stale
+                )
+            )
+        )
+    if rows:
+        statement = insert(DiscoveryCacheEntry).values(list(rows.values()))
+        statement = statement.on_conflict_do_update(
+            constraint="uq_discoverycache_ip_port",
+            set_={
+                "host_key": statement.excluded.host_key,
+                "candidate": statement.excluded.candidate,
+                "identified_at": statement.excluded.identified_at,
+            },
+        )
+        session.execute(statement)
+    session.commit()
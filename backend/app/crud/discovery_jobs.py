@@ -0,0 +1,216 @@
+import json
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import insert, update
+from sqlmodel import Session, col, func, or_, select
+
+from app.core.crypto import decrypt_password
+from app.models import (
+    Credential,
+    DiscoveryCandidatePublic,
+    DiscoveryJob,
+    DiscoveryJobHost,
+    DiscoveryJobProgress,
+    DiscoveryJobPublic,
+)
+
+UNFINISHED_STATUSES = ("pending", "running")
+
+
+def create_discovery_job(
+    session: Session,
+    *,
+    ips: list[str],
+    port: int,
+    credential_ids: list[int],
+    username: str,
+) -> DiscoveryJob:
+    """Persist a job and one pending host row per distinct IP."""
+    unique_ips = list(dict.fromkeys(ips))
+    job = DiscoveryJob(
+        port=port,
+        credential_ids=",".join(str(cred_id) for cred_id in credential_ids),
+        username=username,
+        total=len(unique_ips),
+    )
+    session.add(job)
+    session.flush()
+    if unique_ips:
+        session.execute(
+            insert(DiscoveryJobHost),
+            [{"job_id": job.id, "ip": ip} for ip in unique_ips],
+        )
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def load_job_credentials(session: Session, job: DiscoveryJob) -> list[dict[str, Any]]:
+    """Decrypted credentials of a job, in order; deleted ones are skipped."""
+    credentials = []
+    for cred_id in job.credential_ids.split(","):
+        credential = session.get(Credential, int(cred_id)) if cred_id else None
+        if credential:
+            credentials.append(
+                {
+                    "id": credential.id,
+                    "username": credential.username,
+                    "password": decrypt_password(credential.password or ""),
+                }
+            )
+    return credentials
+
+
+def get_pending_ips(session: Session, job_id: int) -> list[str]:
+    return list(
+        session.exec(
+            select(DiscoveryJobHost.ip)
+            .where(DiscoveryJobHost.job_id == job_id)
+            .where(DiscoveryJobHost.status == "pending")
+            .order_by(col(DiscoveryJobHost.id))
+        ).all()
+    )
+
+
+def record_host_result(
+    session: Session, job_id: int, candidate: dict[str, Any]
+) -> None:
+    """Checkpoint one identified host so a resumed job skips it."""
+    session.execute(
+        update(DiscoveryJobHost)
+        .where(col(DiscoveryJobHost.job_id) == job_id)
+        .where(col(DiscoveryJobHost.ip) == candidate["ip"])
+        .values(
+            status=candidate["status"],
+            candidate=json.dumps(candidate),
+            finished_at=datetime.now(UTC),
+        )
+    )
+    session.commit()
+
+
+def set_job_status(
+    session: Session, job: DiscoveryJob, status: str, error: str = ""
+) -> None:
+    job.status = status
+    job.error = error
+    if status not in UNFINISHED_STATUSES:
+        job.finished_at = datetime.now(UTC)
+    session.add(job)
+    session.commit()
+
+
+def _abandoned(stale_seconds: float) -> Any:
+    """Pending, or running without a heartbeat for stale_seconds."""
+    cutoff = datetime.now(UTC) - timedelta(seconds=stale_seconds)
+    return or_(
+        col(DiscoveryJob.status) == "pending",
+        (col(DiscoveryJob.status) == "running")
+        & (
+            col(DiscoveryJob.heartbeat_at).is_(None)
+            | (col(DiscoveryJob.heartbeat_at) < cutoff)
+        ),
+    )
+
+
+def claim_job(session: Session, job_id: int, owner: str, stale_seconds: float) -> bool:
+    """Atomically mark a pending or abandoned job running under owner.
+
+    The check and the update are one statement, so when several workers try
+    to claim the same job exactly one of them gets it.
+    """
+    claimed = session.execute(
+        update(DiscoveryJob)
+        .where(col(DiscoveryJob.id) == job_id)
+        .where(_abandoned(stale_seconds))
+        .values(status="running", owner=owner, heartbeat_at=datetime.now(UTC))
+        .returning(col(DiscoveryJob.id))
+    ).first()
+    session.commit()
+    return claimed is not None
+
+
+def heartbeat_job(session: Session, job_id: int, owner: str) -> bool:
+    """Refresh the heartbeat of a job owner still holds; False once lost."""
+    held = session.execute(
+        update(DiscoveryJob)
+        .where(col(DiscoveryJob.id) == job_id)
+        .where(col(DiscoveryJob.owner) == owner)
+        .where(col(DiscoveryJob.status) == "running")
+        .values(heartbeat_at=datetime.now(UTC))
+        .returning(col(DiscoveryJob.id))
+    ).first()
+    session.commit()
+    return held is not None
+
+
+def get_resumable_job_ids(session: Session, stale_seconds: float) -> list[int]:
+    """Jobs no live process is working on: pending, or running but stale."""
+    return [
+        job_id
+        for job_id in session.exec(
+            select(DiscoveryJob.id)
+            .where(_abandoned(stale_seconds))
+            .order_by(col(DiscoveryJob.id))
+        ).all()
+        if job_id is not None
+    ]
+
+
+def get_finished_host_ids(session: Session, job_id: int) -> list[int]:
+    return [
+        host_id
+        for host_id in session.exec(
+            select(DiscoveryJobHost.id)
+            .where(DiscoveryJobHost.job_id == job_id)
+            .where(DiscoveryJobHost.status != "pending")
+        ).all()
+        if host_id is not None
+    ]
+
+
+def get_candidates(
+    session: Session, job_id: int, host_ids: Iterable[int] | None = None
+) -> list[DiscoveryCandidatePublic]:
+    """Finished candidates of a job (optionally only host_ids), in submit order."""
+    statement = (
+        select(DiscoveryJobHost.candidate)
+        .where(DiscoveryJobHost.job_id == job_id)
+        .where(DiscoveryJobHost.status != "pending")
+        .order_by(col(DiscoveryJobHost.id))
+    )
+    if host_ids is not None:
+        statement = statement.where(col(DiscoveryJobHost.id).in_(list(host_ids)))
+    return [
+        DiscoveryCandidatePublic(**json.loads(candidate))
+        for candidate in session.exec(statement).all()
+    ]
+
+
+def get_job_progress(session: Session, job: DiscoveryJob) -> DiscoveryJobProgress:
+    completed = session.exec(
+        select(func.count())
+        .select_from(DiscoveryJobHost)
+        .where(DiscoveryJobHost.job_id == job.id)
+        .where(DiscoveryJobHost.status != "pending")
+    ).one()
+    return DiscoveryJobProgress(
+        id=job.id or 0, status=job.status, total=job.total, completed=completed
+    )
+
+
+def get_job_public(
+    session: Session, job: DiscoveryJob, *, with_candidates: bool = True
+) -> DiscoveryJobPublic:
+    progress = get_job_progress(session, job)
+    return DiscoveryJobPublic(
+        **progress.model_dump(),
+        port=job.port,
+        username=job.username,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        candidates=get_candidates(session, progress.id) if with_candidates else [],
+    )
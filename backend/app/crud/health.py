@@ -0,0 +1,194 @@
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import Integer, String, column, func, literal, update, values
+from sqlalchemy import select as sa_select
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, asc, col, delete, select
+
+from app.core.config import settings
+from app.models import Device, HealthProbe, HealthRollup, LatencyPoint
+
+ROLLUP_RESOLUTIONS = ("minute", "hour")
+
+# Rows per INSERT when recording a fleet's worth of probes
+PROBE_BATCH_SIZE = 1000
+
+
+def set_health_status(device_db: Device, status: str) -> None:
+    """Set health_status on an ORM device, stamping the transition time."""
+    if device_db.health_status != status:
+        device_db.health_status = status
+        device_db.health_changed_at = datetime.now(UTC)
+
+
+def apply_health_statuses(session: Session, results: dict[int, str]) -> dict[int, str]:
+    """Write TCP probe outcomes ({device_id: "UP"|"DOWN"}) to the devices.
+
+    A reachable device stays AUTH_ERROR until a sync logs in successfully.
+    Only devices whose status actually changes are written, in a single
+    UPDATE ... FROM (VALUES ...) statement that also stamps
+    health_changed_at. Returns the effective status of every probed device.
+    """
+    current = dict(
+        session.exec(
+            select(Device.id, Device.health_status).where(
+                col(Device.id).in_(list(results))
+            )
+        ).all()
+    )
+    effective: dict[int, str] = {}
+    transitions: list[tuple[int, str]] = []
+    for device_id, status in results.items():
+        if device_id not in current:
+            continue
+        if status == "UP" and current[device_id] == "AUTH_ERROR":
+            status = "AUTH_ERROR"
+        effective[device_id] = status
+        if current[device_id] != status:
+            transitions.append((device_id, status))
+
+    if transitions:
+        changed = values(
+            column("id", Integer), column("status", String), name="changed"
+        ).data(transitions)
+        session.execute(
+            update(Device)
+            .where(col(Device.id) == changed.c.id)
+            .values(health_status=changed.c.status, health_changed_at=datetime.now(UTC))
+        )
+        session.commit()
+    return effective
+
+
+def record_probes(
+    session: Session, results: Iterable[Any], ts: datetime | None = None
+) -> int:
+    """Append one HealthProbe row per result (anything with device_id and
+    rtt_ms, e.g. ProbeResult). Returns the number of rows written.
+    """
+    ts = ts or datetime.now(UTC)
+    rows = [{"device_id": r.device_id, "ts": ts, "rtt_ms": r.rtt_ms} for r in results]
+    for start in range(0, len(rows), PROBE_BATCH_SIZE):
+        session.execute(
+            insert(HealthProbe).values(rows[start : start + PROBE_BATCH_SIZE])
+        )
+    session.commit()
+    return len(rows)
+
+
+def rollup_probes(session: Session, now: datetime | None = None) -> None:
+    """Refresh recent minute/hour rollups from raw probes and apply retention.
+
+    Buckets from the start of the previous hour onwards are recomputed in
+    full on every call, so the job is idempotent and tolerates late runs.
+    """
+    now = now or datetime.now(UTC)
+    since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+    for resolution in ROLLUP_RESOLUTIONS:
+        bucket = func.date_trunc(resolution, HealthProbe.ts)
+        rtt = col(HealthProbe.rtt_ms)
+        rollup = (
+            sa_select(
+                col(HealthProbe.device_id),
+                literal(resolution),
+                bucket,
+                func.count(),
+                # count(rtt) skips NULLs, i.e. counts successful probes
+                func.count(rtt),
+                func.min(rtt),
+                func.avg(rtt),
+                func.max(rtt),
+            )
+            .where(col(HealthProbe.ts) >= since)
+            .group_by(col(HealthProbe.device_id), bucket)
+        )
+        statement = insert(HealthRollup).from_select(
+            [
+                "device_id",
+                "resolution",
+                "bucket_start",
+                "samples",
+                "up",
+                "rtt_min",
+                "rtt_avg",
+                "rtt_max",
+            ],
+            rollup,
+        )
+        session.execute(
+            statement.on_conflict_do_update(
+                constraint="uq_healthrollup_device_resolution_bucket",
+                set_={
+                    field: statement.excluded[field]
+                    for field in ("samples", "up", "rtt_min", "rtt_avg", "rtt_max")
+                },
+            )
+        )
+
+    session.exec(
+        delete(HealthProbe).where(
+            col(HealthProbe.ts)
+            < now - timedelta(hours=settings.HEALTH_PROBE_RETENTION_HOURS)
+        )
+    )
+    retention_days = {
+        "minute": settings.HEALTH_ROLLUP_MINUTE_RETENTION_DAYS,
+        "hour": settings.HEALTH_ROLLUP_HOUR_RETENTION_DAYS,
+    }
+    for resolution, days in retention_days.items():
+        session.exec(
+            delete(HealthRollup).where(
+                col(HealthRollup.resolution) == resolution,
+                col(HealthRollup.bucket_start) < now - timedelta(days=days),
+            )
+        )
+    session.commit()
+
+
+def get_latency(
+    session: Session, device_id: int, resolution: str, since: datetime
+) -> list[LatencyPoint]:
+    if resolution == "raw":
+        probes = session.exec(
+            select(HealthProbe.ts, HealthProbe.rtt_ms)
+            .where(HealthProbe.device_id == device_id)
+            .where(col(HealthProbe.ts) >= since)
+            .order_by(asc(HealthProbe.ts))
+        ).all()
+        return [
+            LatencyPoint(
+                ts=ts,
+                samples=1,
+                up=int(rtt_ms is not None),
+                rtt_min=rtt_ms,
+                rtt_avg=rtt_ms,
+                rtt_max=rtt_ms,
+            )
+            for ts, rtt_ms in probes
+        ]
+    rollups = session.exec(
+        select(HealthRollup)
+        .where(HealthRollup.device_id == device_id)
+        .where(HealthRollup.resolution == resolution)
+        .where(col(HealthRollup.bucket_start) >= since)
+        .order_by(asc(HealthRollup.bucket_start))
+    ).all()
+    return [
+        LatencyPoint(
+            ts=r.bucket_start,
+            samples=r.samples,
+            up=r.up,
+            rtt_min=r.rtt_min,
+            rtt_avg=r.rtt_avg,
+            rtt_max=r.rtt_max,
+        )
+        for r in rollups
+    ]
+
+
+def delete_health_by_device_id(session: Session, device_id: int) -> None:
+    session.exec(delete(HealthProbe).where(col(HealthProbe.device_id) == device_id))
+    session.exec(delete(HealthRollup).where(col(HealthRollup.device_id) == device_id))
+    session.commit()
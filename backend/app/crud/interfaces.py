@@ -9,6 +9,7 @@ from app.automation.interfaces import (
     configure_interface_status,
     show_run_interface,
 )
+from app.crud.sync_fingerprints import invalidate_fingerprint
 from app.models import (
     Device,
     Interface,
@@ -91,6 +92,7 @@ def create_interface(session: Session, interface_in: InterfaceCreate) -> Interfa
 
     interface = Interface.model_validate(interface_in)
     session.add(interface)
+    invalidate_fingerprint(session, "interface", interface.device_id)
     session.commit()
     session.refresh(interface)
 
@@ -112,8 +114,12 @@ def update_interface(
     # so omitted fields (e.g. port) don't get clobbered with None
     update_dict = interface_in.model_dump(exclude_unset=True)
     update_dict["updated_at"] = datetime.now()
+    previous_device_id = interface_db.device_id
     interface_db.sqlmodel_update(update_dict)
     session.add(interface_db)
+    invalidate_fingerprint(
+        session, "interface", previous_device_id, interface_db.device_id
+    )
     session.commit()
     session.refresh(interface_db)
     # update running config — configure_interface needs the full merged
@@ -150,6 +156,7 @@ def update_interface_status(
         update_dict["status"] = "disabled"
     interface_db.sqlmodel_update(update_dict)
     session.add(interface_db)
+    invalidate_fingerprint(session, "interface", interface_db.device_id)
     session.commit()
     session.refresh(interface_db)
     # update running config
@@ -163,6 +170,21 @@ def update_interface_status(
     return interface_db
 
 
+# Columns refreshed from the device on every sync
+_SYNC_FIELDS = (
+    "description",
+    "status",
+    "vlan",
+    "duplex",
+    "speed",
+    "type",
+    "mode",
+    "native_vlan",
+    "allowed_vlan",
+    "allowed_vlan_add",
+)
+
+
 def update_interface_metadata(
     *,
     session: Session,
@@ -182,22 +204,26 @@ def update_interface_metadata(
         'speed': '10 Mbps',
         'type': '10Gbase-SR'
     }
+    Loads the device's interfaces once, diffs in memory and writes only
+    inserted, changed or removed rows, in a single transaction.
     """
+    existing_all = session.exec(
+        select(Interface)
+        .where(Interface.device_id == device.id)
+        .order_by(asc(Interface.id))
+    ).all()
+    by_port: dict[str, Interface] = {}
+    for record in existing_all:
+        # Keep the oldest row per port; duplicates predate this reconciliation
+        if record.port in by_port:
+            session.delete(record)
+        else:
+            by_port[record.port] = record
+
+    now = datetime.now()
+    seen_ports: set[str] = set()
     for interface_info in interfaces_in:
-        interface_dict = {
-            "port": interface_info["port"],
-            "description": interface_info["description"],
-            "status": interface_info["status"],
-            "vlan": interface_info["vlan"],
-            "duplex": interface_info["duplex"],
-            "speed": interface_info["speed"],
-            "type": interface_info["type"],
-            "mode": interface_info["mode"],
-            "native_vlan": interface_info["native_vlan"],
-            "allowed_vlan": interface_info["allowed_vlan"],
-            "allowed_vlan_add": interface_info["allowed_vlan_add"],
-            "device_id": device.id,
-        }
+        interface_dict = {field: interface_info[field] for field in _SYNC_FIELDS}
         if device.platform == "junos":
             if interface_info["port"] in interfaces_status:
                 if interfaces_status[interface_info["port"]]["is_up"]:
@@ -205,22 +231,34 @@ def update_interface_metadata(
                 else:
                     interface_dict["status"] = "down"
 
-        interface_db = get_interface(
-            session=session, port=interface_info["port"], device_id=device.id
-        )
-
-        if interface_db:
-            update_interface(
-                session=session,
-                interface_db=interface_db[0],
-                interface_in=InterfaceUpdate(**interface_dict),
-                device=device,
-                update_running_config=0,
-            )
-        else:
-            create_interface(
-                session=session, interface_in=InterfaceCreate(**interface_dict)
+        port = interface_info["port"]
+        seen_ports.add(port)
+        interface_db = by_port.get(port)
+        if interface_db is None:
+            interface_db = Interface.model_validate(
+                InterfaceCreate(port=port, device_id=device.id, **interface_dict),
+                update={"created_at": now, "updated_at": now},
             )
+            session.add(interface_db)
+            by_port[port] = interface_db
+            continue
+
+        changes = {
+            field: value
+            for field, value in interface_dict.items()
+            if getattr(interface_db, field) != value
+        }
+        if changes:
+            changes["updated_at"] = now
+            interface_db.sqlmodel_update(changes)
+            session.add(interface_db)
+
+    # An empty list means the status fetch failed, not that every port vanished
+    if interfaces_in:
+        for port, interface_db in by_port.items():
+            if port not in seen_ports:
+                session.delete(interface_db)
+    session.commit()
 
     return True
 
@@ -228,6 +266,7 @@ def update_interface_metadata(
 def delete_interface(session: Session, interface_db: Interface):
 
     session.delete(interface_db)
+    invalidate_fingerprint(session, "interface", interface_db.device_id)
     session.commit()
     return True
 
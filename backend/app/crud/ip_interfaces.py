@@ -4,6 +4,7 @@ from typing import Any
 from sqlalchemy.sql.expression import or_
 from sqlmodel import Session, asc, func, select
 
+from app.crud.sync_fingerprints import invalidate_fingerprint
 from app.models import Device, IpInterface, IpInterfaceCreate, IpInterfaceUpdate
 
 
@@ -112,6 +113,7 @@ def create_ip_interface(
 
     ip_interface = IpInterface.model_validate(ip_interface_in)
     session.add(ip_interface)
+    invalidate_fingerprint(session, "ip_interface", ip_interface.device_id)
     session.commit()
     session.refresh(ip_interface)
 
@@ -130,8 +132,12 @@ def update_ip_interface(
 
     update_dict = ip_interface_in.model_dump(exclude_unset=True)
     update_dict["updated_at"] = datetime.now()
+    previous_device_id = ip_interface_db.device_id
     ip_interface_db.sqlmodel_update(update_dict)
     session.add(ip_interface_db)
+    invalidate_fingerprint(
+        session, "ip_interface", previous_device_id, ip_interface_db.device_id
+    )
     session.commit()
     session.refresh(ip_interface_db)
 
@@ -141,6 +147,7 @@ def update_ip_interface(
 def delete_ip_interface(session: Session, ip_interface_db: IpInterface):
 
     session.delete(ip_interface_db)
+    invalidate_fingerprint(session, "ip_interface", ip_interface_db.device_id)
     session.commit()
     return True
 
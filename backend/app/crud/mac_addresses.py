@@ -1,11 +1,19 @@
 from datetime import datetime
 from typing import Any
 
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql.expression import or_
 from sqlmodel import Session, asc, col, func, select
 
+from app.crud.sync_fingerprints import invalidate_fingerprint
 from app.models import Device, MacAddress, MacAddressCreate, MacAddressUpdate
 
+# Rows per INSERT ... ON CONFLICT / UPDATE statement during sync
+UPSERT_BATCH_SIZE = 1000
+# Columns refreshed from the device on every sync
+_SYNC_FIELDS = ("vlan", "static", "active", "moves", "last_move")
+
 
 def get_mac_addresses(
     session: Session,
@@ -102,6 +110,7 @@ def create_mac_address(
 ) -> MacAddress:
     mac_address = MacAddress.model_validate(mac_address_in)
     session.add(mac_address)
+    invalidate_fingerprint(session, "mac_address", mac_address.device_id)
     session.commit()
     session.refresh(mac_address)
     return mac_address
@@ -112,8 +121,12 @@ def update_mac_address(
 ) -> Any:
     update_dict = mac_address_in.model_dump(exclude_unset=True)
     update_dict["updated_at"] = datetime.now()
+    previous_device_id = mac_address_db.device_id
     mac_address_db.sqlmodel_update(update_dict)
     session.add(mac_address_db)
+    invalidate_fingerprint(
+        session, "mac_address", previous_device_id, mac_address_db.device_id
+    )
     session.commit()
     session.refresh(mac_address_db)
     return mac_address_db
@@ -121,6 +134,7 @@ def update_mac_address(
 
 def delete_mac_address(session: Session, mac_address_db: MacAddress):
     session.delete(mac_address_db)
+    invalidate_fingerprint(session, "mac_address", mac_address_db.device_id)
     session.commit()
     return True
 
@@ -136,25 +150,66 @@ def delete_mac_by_device_id(session: Session, device_id: int):
 
 
 def update_mac_address_running(
-    session: Session, mac_addresses_in: dict, device_id: int
+    session: Session, mac_addresses_in: list[dict], device_id: int
 ) -> Any:
+    """Reconcile the device's MAC table in a handful of statements.
+
+    Existing rows are loaded once and diffed in memory: new or changed
+    entries are upserted on the (device_id, mac, interface) key in batches,
+    entries that are unchanged only get updated_at bumped. One commit per
+    device.
+    """
+    now = datetime.now()
+    incoming: dict[tuple[str, str], dict[str, Any]] = {}
     for mac_address_in in mac_addresses_in:
-        mac_address_in["mac"] = mac_address_in["mac"].lower().replace(":", "")
-        mac_address_in["device_id"] = device_id
-        mac_address_db = get_mac_addresses_by_mac(
-            session=session,
-            mac=mac_address_in["mac"],
-            device_id=device_id,
-            interface=mac_address_in["interface"],
-        )
-        if mac_address_db:
-            update_mac_address(
-                session=session,
-                mac_address_db=mac_address_db,
-                mac_address_in=MacAddressUpdate(**mac_address_in),
-            )
+        row = MacAddressCreate(
+            **{
+                **mac_address_in,
+                "mac": mac_address_in["mac"].lower().replace(":", ""),
+                "device_id": device_id,
+            }
+        ).model_dump()
+        incoming[(row["mac"], row["interface"])] = row
+
+    existing = {
+        (mac, interface): (id, tuple(values))
+        for id, mac, interface, *values in session.exec(
+            select(
+                MacAddress.id,
+                MacAddress.mac,
+                MacAddress.interface,
+                *(getattr(MacAddress, field) for field in _SYNC_FIELDS),
+            ).where(MacAddress.device_id == device_id)
+        ).all()
+    }
+
+    changed: list[dict[str, Any]] = []
+    unchanged_ids: list[int] = []
+    for key, row in incoming.items():
+        current = existing.get(key)
+        if current and current[1] == tuple(row[field] for field in _SYNC_FIELDS):
+            unchanged_ids.append(current[0])
         else:
-            create_mac_address(
-                session=session, mac_address_in=MacAddressCreate(**mac_address_in)
-            )
+            changed.append({**row, "created_at": now, "updated_at": now})
+
+    for start in range(0, len(changed), UPSERT_BATCH_SIZE):
+        statement = insert(MacAddress).values(
+            changed[start : start + UPSERT_BATCH_SIZE]
+        )
+        statement = statement.on_conflict_do_update(
+            constraint="uq_macaddress_device_mac_interface",
+            set_={
+                **{field: statement.excluded[field] for field in _SYNC_FIELDS},
+                "updated_at": now,
+            },
+        )
+        session.execute(statement)
+    for start in range(0, len(unchanged_ids), UPSERT_BATCH_SIZE):
+        id_batch = unchanged_ids[start : start + UPSERT_BATCH_SIZE]
+        session.execute(
+            update(MacAddress)
+            .where(col(MacAddress.id).in_(id_batch))
+            .values(updated_at=now)
+        )
+    session.commit()
     return True
@@ -0,0 +1,105 @@
+import hashlib
+import json
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, delete, select, update
+
+from app.models import SyncFingerprint
+
+
+def fingerprint(data: Any, ignore: Iterable[str] = ()) -> str:
+    """Order-independent SHA-256 of a collected table.
+
+    List rows are hashed as a sorted multiset, since getters do not return
+    entries in a stable order; keys in ``ignore`` (e.g. ARP age, which
+    ticks on every poll and is never stored) are dropped from dict rows.
+    """
+    ignored = set(ignore)
+
+    def canonical(value: Any) -> str:
+        if isinstance(value, dict):
+            value = {k: v for k, v in value.items() if k not in ignored}
+        return json.dumps(value, sort_keys=True, default=str)
+
+    if isinstance(data, list):
+        payload = "[" + ",".join(sorted(canonical(row) for row in data)) + "]"
+    else:
+        payload = canonical(data)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def sync_if_changed(
+    session: Session,
+    device_id: int,
+    table_name: str,
+    digest: str,
+    ingest: Callable[[], Any],
+) -> bool:
+    """Run ``ingest`` only when the table's fingerprint changed.
+
+    An unchanged table costs a single UPDATE of verified_at. The new
+    fingerprint is recorded after ingestion succeeds, so a failed write is
+    retried on the next pass. Returns True when ingestion ran.
+    """
+    now = datetime.now(UTC)
+    current = session.exec(
+        select(SyncFingerprint.fingerprint).where(
+            SyncFingerprint.device_id == device_id,
+            SyncFingerprint.table_name == table_name,
+        )
+    ).first()
+    if current == digest:
+        session.execute(
+            update(SyncFingerprint)
+            .where(
+                col(SyncFingerprint.device_id) == device_id,
+                col(SyncFingerprint.table_name) == table_name,
+            )
+            .values(verified_at=now)
+        )
+        session.commit()
+        return False
+
+    ingest()
+    statement = insert(SyncFingerprint).values(
+        device_id=device_id,
+        table_name=table_name,
+        fingerprint=digest,
+        verified_at=now,
+        changed_at=now,
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            constraint="uq_syncfingerprint_device_table",
+            set_={"fingerprint": digest, "verified_at": now, "changed_at": now},
+        )
+    )
+    session.commit()
+    return True
+
+
+def delete_fingerprints_by_device_id(session: Session, device_id: int) -> None:
+    statement = delete(SyncFingerprint).where(
+        col(SyncFingerprint.device_id) == device_id
+    )
+    session.exec(statement)
+    session.commit()
+
+
+def invalidate_fingerprint(
+    session: Session, table_name: str, *device_ids: int | None
+) -> None:
+    """Drop a table's fingerprint so the next sync re-ingests it.
+
+    Called when rows are edited outside a sync; the DELETE rides on the
+    caller's commit.
+    """
+    session.exec(
+        delete(SyncFingerprint).where(
+            col(SyncFingerprint.device_id).in_({i for i in device_ids if i}),
+            col(SyncFingerprint.table_name) == table_name,
+        )
+    )
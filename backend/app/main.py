@@ -2,13 +2,21 @@ from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
 import sentry_sdk
+from apscheduler.triggers.cron import CronTrigger
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.automation.connection_pool import connection_pool
 from app.core.config import settings
-from app.core.scheduler import health_check_all_devices, scheduler, sync_all_devices
+from app.core.scheduler import (
+    backup_all_devices,
+    health_check_all_devices,
+    resume_discovery_jobs,
+    scheduler,
+    sync_all_devices,
+)
 from app.crud.create_nornir import regenerate_inventory
 
 
@@ -33,9 +41,21 @@ async def lifespan(_app: FastAPI) -> AsyncGenerator[None]:
         "interval",
         minutes=settings.HEALTH_CHECK_INTERVAL_MINUTES,
     )
+    if settings.CONFIG_BACKUP_CRON:
+        scheduler.add_job(
+            backup_all_devices,
+            CronTrigger.from_crontab(
+                settings.CONFIG_BACKUP_CRON, timezone=settings.TIMEZONE
+            ),
+            id="config-backup",
+            coalesce=True,
+        )
+    scheduler.add_job(connection_pool.evict_idle, "interval", seconds=60)
+    resume_discovery_jobs()
     scheduler.start()
     yield
     scheduler.shutdown()
+    connection_pool.close_all()
 
 
 app = FastAPI(
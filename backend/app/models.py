@@ -252,6 +252,8 @@ class Device(DeviceBase, table=True):
     hostname: str = Field(unique=True, index=True)
     created_at: datetime = Field(default=datetime.now())
     updated_at: datetime = Field(default=datetime.now())
+    # When health_status last changed value, i.e. "down since"
+    health_changed_at: datetime | None = None
     mac_addresses: list["MacAddress"] = Relationship(back_populates="device")
     arps: list["Arp"] = Relationship(back_populates="device")
     ip_interfaces: list["IpInterface"] = Relationship(back_populates="device")
@@ -262,6 +264,7 @@ class DevicePublic(DeviceBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    health_changed_at: datetime | None = None
 
 
 class DevicesPublic(SQLModel):
@@ -368,6 +371,13 @@ class MacAddressUpdate(MacAddressBase):
 
 # Database model, database table inferred from class name
 class MacAddress(MacAddressBase, table=True):
+    # Natural key the sync upserts on (INSERT ... ON CONFLICT)
+    __table_args__ = (
+        UniqueConstraint(
+            "device_id", "mac", "interface", name="uq_macaddress_device_mac_interface"
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     mac: str = Field(index=True)
     device_id: int = Field(default=None, foreign_key="device.id", nullable=False)
@@ -393,7 +403,8 @@ class MacAddressesPublic(SQLModel):
 class ArpBase(SQLModel):
     ip: str
     interface: str
-    mac: str | None = None
+    # "" for incomplete entries: part of the unique key, so never NULL
+    mac: str = ""
     age: int | None = None
     device_id: int | None = None
 
@@ -411,6 +422,13 @@ class ArpUpdate(ArpBase):
 
 # Database model, database table inferred from class name
 class Arp(ArpBase, table=True):
+    # Natural key the sync upserts on (INSERT ... ON CONFLICT)
+    __table_args__ = (
+        UniqueConstraint(
+            "device_id", "ip", "mac", "interface", name="uq_arp_device_ip_mac_interface"
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     ip: str = Field(index=True)
     device_id: int = Field(default=None, foreign_key="device.id", nullable=False)
@@ -530,6 +548,14 @@ class DiscoveryScanPublic(SQLModel):
     hosts: list[DiscoveryHostPublic]
 
 
+# Progress/summary event of a streaming scan (POST /discovery/scan/stream)
+class DiscoveryScanProgress(SQLModel):
+    cidr: str
+    total_hosts: int
+    scanned: int
+    open_count: int
+
+
 class DiscoveryIdentifyRequest(SQLModel):
     ips: list[str]
     port: int = 22
@@ -551,12 +577,47 @@ class DiscoveryCandidatePublic(SQLModel):
     serial_number: str | None = None
     credential_id: int | None = None
     error: str | None = None
+    # Served from the identify cache: SSH host key unchanged, no login made
+    cached: bool = False
 
 
 class DiscoveryIdentifyPublic(SQLModel):
     candidates: list[DiscoveryCandidatePublic]
 
 
+class DiscoveryCrawlRequest(SQLModel):
+    # Seed devices; empty crawls outward from every registered device
+    device_ids: list[int] = []
+    credential_ids: list[int]
+    port: int = 22
+    max_depth: int = 2
+    max_devices: int = 100
+
+
+class DiscoveryNeighborPublic(SQLModel):
+    hostname: str | None = None
+    ip: str | None = None
+    # "cdp" | "lldp"
+    protocol: str
+    local_port: str | None = None
+    remote_port: str | None = None
+    # Hops from the nearest seed, and the hostname it was learned from
+    depth: int
+    via: str
+    existing_device_id: int | None = None
+
+
+class DiscoveryCrawlError(SQLModel):
+    hostname: str
+    error: str
+
+
+class DiscoveryCrawlPublic(SQLModel):
+    neighbors: list[DiscoveryNeighborPublic]
+    candidates: list[DiscoveryCandidatePublic]
+    errors: list[DiscoveryCrawlError]
+
+
 class DiscoveryAddRequest(SQLModel):
     devices: list[DeviceCreate]
 
@@ -572,6 +633,175 @@ class DiscoveryAddPublic(SQLModel):
     errors: list[DiscoveryAddError]
 
 
+# Background identify run over an arbitrary IP list (POST /discovery/jobs).
+# Every IP is a DiscoveryJobHost row checkpointed as soon as it finishes, so
+# a restart resumes with only the hosts still pending.
+class DiscoveryJob(SQLModel, table=True):
+    __tablename__ = "discoveryjob"
+
+    id: int | None = Field(default=None, primary_key=True)
+    status: str = "pending"  # pending | running | completed | error
+    port: int = 22
+    credential_ids: str = ""  # comma-joined, tried in this order
+    username: str = ""
+    total: int = 0
+    error: str = ""
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), index=True)
+    finished_at: datetime | None = None
+    # Process running the job and its last sign of life; another process
+    # only takes over a running job once heartbeat_at goes stale
+    owner: str = ""
+    heartbeat_at: datetime | None = None
+
+
+class DiscoveryJobHost(SQLModel, table=True):
+    __tablename__ = "discoveryjobhost"
+    __table_args__ = (
+        UniqueConstraint("job_id", "ip", name="uq_discoveryjobhost_job_ip"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    job_id: int = Field(foreign_key="discoveryjob.id", index=True)
+    ip: str
+    # "pending" until identified, then the candidate status
+    status: str = "pending"
+    candidate: str = ""  # JSON of the DiscoveryCandidatePublic
+    finished_at: datetime | None = None
+
+
+class DiscoveryJobCreate(SQLModel):
+    ips: list[str]
+    port: int = 22
+    credential_ids: list[int]
+
+
+class DiscoveryJobProgress(SQLModel):
+    id: int
+    status: str
+    total: int
+    completed: int
+
+
+class DiscoveryJobPublic(DiscoveryJobProgress):
+    port: int
+    username: str
+    error: str
+    created_at: datetime
+    finished_at: datetime | None
+    candidates: list[DiscoveryCandidatePublic] = []
+
+
+class DiscoveryJobsPublic(SQLModel):
+    data: list[DiscoveryJobPublic]
+    count: int
+
+
+# Last identify result per (ip, port), valid while the SSH host key seen in
+# the pre-auth handshake still matches and DISCOVERY_CACHE_MAX_AGE_HOURS holds
+class DiscoveryCacheEntry(SQLModel, table=True):
+    __tablename__ = "discoverycache"
+    __table_args__ = (UniqueConstraint("ip", "port", name="uq_discoverycache_ip_port"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    ip: str
+    port: int
+    host_key: str  # "ssh-ed25519 SHA256:..."
+    candidate: str  # JSON of the identify result
+    identified_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+# Which credential logged in to discovered hosts, per /24 ("subnet") and per
+# SSH server software string seen before auth ("banner"); identify tries the
+# credential with the most successes in the host's scopes first
+class CredentialStat(SQLModel, table=True):
+    __tablename__ = "credentialstat"
+    __table_args__ = (
+        UniqueConstraint(
+            "credential_id", "kind", "scope", name="uq_credentialstat_cred_kind_scope"
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    credential_id: int = Field(foreign_key="credential.id", index=True)
+    kind: str  # "subnet" | "banner"
+    scope: str  # e.g. "10.1.2.0/24" or "Cisco-1.25"
+    successes: int = 0
+    failures: int = 0
+    last_success_at: datetime | None = None
+
+
+# Content hash of the table last collected from a device, one row per
+# device/table; the sync skips ingestion while the hash is unchanged
+class SyncFingerprint(SQLModel, table=True):
+    __tablename__ = "syncfingerprint"
+    __table_args__ = (
+        UniqueConstraint(
+            "device_id", "table_name", name="uq_syncfingerprint_device_table"
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    device_id: int = Field(foreign_key="device.id", index=True)
+    # "mac_address" | "arp" | "ip_interface" | "interface", or
+    # "running_config" for the config-change marker of scheduled backups
+    table_name: str
+    fingerprint: str
+    # Last pass that collected this table; changed_at is the last pass that
+    # actually rewrote it
+    verified_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    changed_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+# Append-only TCP connect probes from the scheduled health check; rtt_ms is
+# NULL when the probe failed. Pruned after HEALTH_PROBE_RETENTION_HOURS.
+class HealthProbe(SQLModel, table=True):
+    __tablename__ = "healthprobe"
+
+    id: int | None = Field(default=None, primary_key=True)
+    device_id: int = Field(foreign_key="device.id", index=True)
+    ts: datetime = Field(default_factory=lambda: datetime.now(UTC), index=True)
+    rtt_ms: float | None = None
+
+
+# Per-minute / per-hour aggregates of HealthProbe, kept longer than the raw rows
+class HealthRollup(SQLModel, table=True):
+    __tablename__ = "healthrollup"
+    __table_args__ = (
+        UniqueConstraint(
+            "device_id",
+            "resolution",
+            "bucket_start",
+            name="uq_healthrollup_device_resolution_bucket",
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    device_id: int = Field(foreign_key="device.id")
+    # "minute" | "hour"
+    resolution: str
+    bucket_start: datetime = Field(index=True)
+    samples: int = 0
+    up: int = 0
+    rtt_min: float | None = None
+    rtt_avg: float | None = None
+    rtt_max: float | None = None
+
+
+class LatencyPoint(SQLModel):
+    ts: datetime
+    samples: int
+    up: int
+    rtt_min: float | None
+    rtt_avg: float | None
+    rtt_max: float | None
+
+
+class DeviceLatencyPublic(SQLModel):
+    device_id: int
+    resolution: str
+    data: list[LatencyPoint]
+
+
 # Config Revisions — snapshots of device running-config stored in per-device
 # git repos; this table holds only metadata pointing at commit hashes
 class ConfigRevision(SQLModel, table=True):
@@ -605,6 +835,36 @@ class ConfigRevisionsPublic(SQLModel):
     count: int
 
 
+# One scheduled backup pass over the whole fleet
+class ConfigBackupRunBase(SQLModel):
+    total: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    failed_hosts: str = Field(default="")  # comma-separated hostnames
+    duration_seconds: float = 0
+
+
+class ConfigBackupRun(ConfigBackupRunBase, table=True):
+    __tablename__ = "configbackuprun"
+
+    id: int | None = Field(default=None, primary_key=True)
+    started_at: datetime = Field(default_factory=lambda: datetime.now(UTC), index=True)
+    finished_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class ConfigBackupRunPublic(ConfigBackupRunBase):
+    id: int
+    started_at: datetime
+    finished_at: datetime
+
+
+class ConfigBackupRunsPublic(SQLModel):
+    data: list[ConfigBackupRunPublic]
+    count: int
+
+
 class ConfigRevisionContentPublic(SQLModel):
     revision: ConfigRevisionPublic
     config: str
@@ -1,9 +1,15 @@
+import asyncio
+import re
+import time
+from typing import Any
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, delete
 
 from app.automation import discovery as disc
 from app.core.config import settings
+from app.crud.credential_stats import delete_credential_stats_by_credential_id
 from app.models import Credential, Device
 from app.tests.utils.utils import random_lower_string
 
@@ -35,6 +41,377 @@ def test_expand_cidr_rejects_ipv6():
         disc.expand_cidr("2001:db8::/64")
 
 
+def test_iter_cidr_is_lazy_for_slash_16():
+    total, hosts = disc.iter_cidr("10.20.0.0/16", 65534)
+    assert total == 65534
+    assert next(hosts) == "10.20.0.1"
+    assert next(hosts) == "10.20.0.2"
+
+
+def test_iter_cidr_small_prefixes():
+    assert disc.iter_cidr("10.0.0.7/32", 10)[0] == 1
+    assert list(disc.iter_cidr("10.0.0.7/32", 10)[1]) == ["10.0.0.7"]
+    assert disc.iter_cidr("10.0.0.6/31", 10)[0] == 2
+
+
+def test_iter_cidr_rejects_too_large_with_hint():
+    with pytest.raises(ValueError, match="use /16 or smaller"):
+        disc.iter_cidr("10.0.0.0/15", 65534)
+
+
+def test_sweep_reports_every_address(monkeypatch):
+    async def fake_probe(ip: str, port: int, timeout: float) -> float | None:
+        await asyncio.sleep(0)
+        return 1.5 if ip.endswith((".3", ".9")) else None
+
+    monkeypatch.setattr(disc, "probe", fake_probe)
+
+    async def collect() -> list[tuple[str, float | None]]:
+        _, ips = disc.iter_cidr("10.0.0.0/28", 64)
+        return [
+            r async for r in disc.sweep(ips, 22, concurrency=4, rate=0, timeout=1.0)
+        ]
+
+    results = asyncio.run(collect())
+    assert len(results) == 14
+    assert sorted(ip for ip, rtt in results if rtt is not None) == [
+        "10.0.0.3",
+        "10.0.0.9",
+    ]
+
+
+class FakeShell:
+    """Interactive channel replaying a scripted reply to each command."""
+
+    def __init__(self, banner: str, replies: dict[str, list[str]]) -> None:
+        self.pending = [banner]
+        self.replies = replies
+        self.sent: list[str] = []
+
+    def settimeout(self, timeout: float) -> None:
+        pass
+
+    def recv(self, size: int) -> bytes:
+        if not self.pending:
+            raise TimeoutError
+        return self.pending.pop(0).encode()
+
+    def sendall(self, data: bytes) -> None:
+        command = data.decode()
+        self.sent.append(command)
+        self.pending.extend(self.replies.get(command, []))
+
+    def get_pty(self, **kwargs: Any) -> None:
+        pass
+
+    def invoke_shell(self) -> None:
+        pass
+
+
+class FakeTransport:
+    """SSH connection past key exchange: server identity, then one login."""
+
+    def __init__(
+        self,
+        shell: FakeShell | None = None,
+        software: str = "OpenSSH_8.7",
+        fingerprint: str = "SHA256:x",
+    ) -> None:
+        self.shell = shell
+        self.remote_version = f"SSH-2.0-{software}"
+        self.fingerprint = fingerprint
+        self.closed = False
+
+    def get_remote_server_key(self) -> Any:
+        transport = self
+
+        class Key:
+            fingerprint = transport.fingerprint
+
+            def get_name(self) -> str:
+                return "ssh-rsa"
+
+        return Key()
+
+    def auth_password(self, username: str, password: str) -> None:
+        pass
+
+    def open_session(self, timeout: float | None = None) -> FakeShell | None:
+        return self.shell
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _fake_connect(monkeypatch, make=lambda ip: FakeTransport()) -> list[str]:
+    """Patch _ssh_connect; returns the IPs connected to, in order."""
+    connects: list[str] = []
+
+    def connect(ip, port, timeout=5):
+        connects.append(ip)
+        return make(ip)
+
+    monkeypatch.setattr(disc, "_ssh_connect", connect)
+    return connects
+
+
+def test_read_until_answers_pager():
+    shell = FakeShell("Cisco IOS Software\n --More-- ", {" ": ["Version 17.3\nsw1#"]})
+    out = disc._read_until(shell, re.compile(r"sw1#$"), time.monotonic() + 5)
+    assert out.endswith("sw1#")
+    assert shell.sent == [" "]
+
+
+def test_read_until_stops_at_deadline():
+    shell = FakeShell("partial output", {})
+    out = disc._read_until(shell, re.compile(r"sw1#$"), time.monotonic() + 5)
+    assert out == "partial output"
+
+
+def _junos_shell() -> FakeShell:
+    return FakeShell(
+        "Welcome\r\nadmin@r1> ",
+        {
+            "\n": ["\r\nadmin@r1> "],
+            "set cli screen-length 0\n": [
+                "\r\nScreen length set to 0\r\n",
+                "admin@r1> ",
+            ],
+            "show version\n": [
+                "show version\r\nHostname: r1.lab\r\nModel: mx204\r\n",
+                "Junos: 23.2R1\r\n\r\nadmin@r1> ",
+            ],
+            "show chassis hardware\n": [
+                "show chassis hardware\r\nHardware inventory:\r\n"
+                "Item             Version  Part number  Serial number     "
+                "Description\r\n"
+                "Chassis                                BT0217AF0012      MX204\r\n"
+                "\r\nadmin@r1> ",
+            ],
+        },
+    )
+
+
+def _fake_ssh(monkeypatch, shell: FakeShell) -> list[str]:
+    return _fake_connect(monkeypatch, lambda ip: FakeTransport(shell))
+
+
+def test_ssh_detect_reads_to_prompt_without_sleeping(monkeypatch):
+    shell = _junos_shell()
+    _fake_ssh(monkeypatch, shell)
+
+    def no_sleep(seconds):
+        raise AssertionError("_ssh_detect must not sleep")
+
+    monkeypatch.setattr(disc.time, "sleep", no_sleep)
+    device_type, hostname, text = disc._ssh_detect(
+        "10.0.0.1", 22, {"username": "admin", "password": "x"}
+    )
+    assert device_type == "juniper_junos"
+    assert hostname == "r1"
+    assert "Junos: 23.2R1" in text
+    assert "BT0217AF0012" in text
+    assert shell.sent == [
+        "\n",
+        "set cli screen-length 0\n",
+        "show version\n",
+        "show chassis hardware\n",
+    ]
+
+
+def test_ssh_detect_skips_banner_line_that_looks_like_a_prompt(monkeypatch):
+    shell = FakeShell(
+        "*** NOTICE ***\r\nUnauthorized access is prohibited #",
+        {
+            "\n": ["\r\n\r\nsw1#", "\r\nsw1#"],
+            "terminal length 0\n": ["terminal length 0\r\nsw1#"],
+            "show version\n": ["show version\r\nVersion 17.3\r\nsw1#"],
+        },
+    )
+    _fake_ssh(monkeypatch, shell)
+
+    _, hostname, text = disc._ssh_detect(
+        "10.0.0.1", 22, {"username": "admin", "password": "x"}
+    )
+    assert hostname == "sw1"
+    assert "Version 17.3" in text
+    assert shell.sent[:2] == ["\n", "terminal length 0\n"]
+
+
+def test_ssh_detect_runs_session_hook_on_same_login(monkeypatch):
+    shell = _junos_shell()
+    shell.replies["show lldp neighbors\n"] = [
+        "show lldp neighbors\r\nLocal Interface    Parent Interface\r\n",
+        "ge-0/0/0           -\r\nadmin@r1> ",
+    ]
+    _fake_ssh(monkeypatch, shell)
+    seen: list[tuple[str, str]] = []
+
+    disc._ssh_detect(
+        "10.0.0.1",
+        22,
+        {"username": "admin", "password": "x"},
+        on_session=lambda platform, send: seen.append(
+            (platform, send("show lldp neighbors"))
+        ),
+    )
+    assert seen == [
+        ("junos", "Local Interface    Parent Interface\nge-0/0/0           -")
+    ]
+
+
+def test_identify_host_collects_facts_over_one_session(monkeypatch):
+    connects = _fake_ssh(monkeypatch, _junos_shell())
+
+    def no_napalm(*args):
+        raise AssertionError("NAPALM must not be used by default")
+
+    monkeypatch.setattr(disc, "_get_facts", no_napalm)
+    candidate = disc.identify_host(
+        "10.0.0.1", 22, [{"id": 7, "username": "admin", "password": "x"}]
+    )
+    assert candidate["status"] == "identified"
+    assert candidate["error"] is None
+    assert candidate["credential_id"] == 7
+    assert (candidate["hostname"], candidate["raw_hostname"]) == ("r1", "r1.lab")
+    assert candidate["vendor"] == "Juniper"
+    assert candidate["model"] == "mx204"
+    assert candidate["os_version"] == "23.2R1"
+    assert candidate["serial_number"] == "BT0217AF0012"
+    # Host key and login share one connection
+    assert candidate["host_key"] == "ssh-rsa SHA256:x"
+    assert connects == ["10.0.0.1"]
+
+
+def test_identify_host_tries_learned_credential_first(monkeypatch):
+    import paramiko
+
+    tried: list[int] = []
+
+    def fake_detect(ip, port, cred, transport=None, on_session=None):
+        tried.append(cred["id"])
+        if cred["id"] != 3:
+            raise paramiko.AuthenticationException("Authentication failed.")
+        return "arista_eos", "sw1", "Arista DCS-7050\nSoftware image version: 4.30\n"
+
+    monkeypatch.setattr(disc, "_ssh_detect", fake_detect)
+    _fake_connect(monkeypatch)
+    creds = [{"id": i, "username": "u", "password": "p"} for i in (1, 2, 3)]
+
+    candidate = disc.identify_host("10.1.1.5", 22, creds, credential_stats={})
+    assert tried == [1, 2, 3]
+    assert candidate["failed_credential_ids"] == [1, 2]
+    assert candidate["ssh_banner"] == "OpenSSH_8.7"
+
+    tried.clear()
+    stats = {("subnet", "10.1.1.0/24"): {3: 4}}
+    candidate = disc.identify_host("10.1.1.6", 22, creds, credential_stats=stats)
+    assert tried == [3]
+    assert (candidate["status"], candidate["credential_id"]) == ("identified", 3)
+    assert candidate["failed_credential_ids"] == []
+
+
+@pytest.mark.parametrize(
+    "outcomes,expected",
+    [
+        # The working credential finishes last, after a timeout and a reject
+        ({1: "unreachable", 2: "auth", 3: "ok"}, ("identified", 3, [2])),
+        ({1: "unreachable", 2: "auth", 3: "unreachable"}, ("auth_failed", None, [2])),
+        ({1: "unreachable", 2: "unreachable"}, ("unreachable", None, [])),
+    ],
+)
+def test_parallel_detect_prefers_success_then_auth_failure(
+    monkeypatch, outcomes, expected
+):
+    import paramiko
+
+    delays = {1: 0.0, 2: 0.02, 3: 0.05}
+
+    def fake_detect(ip, port, cred, transport=None, on_session=None):
+        time.sleep(delays[cred["id"]])
+        outcome = outcomes[cred["id"]]
+        if outcome == "auth":
+            raise paramiko.AuthenticationException("Authentication failed.")
+        if outcome == "unreachable":
+            raise TimeoutError("timed out")
+        return "arista_eos", "sw1", "Arista DCS-7050\nSoftware image version: 4.30\n"
+
+    monkeypatch.setattr(disc, "_ssh_detect", fake_detect)
+    _fake_connect(monkeypatch)
+    monkeypatch.setattr(settings, "DISCOVERY_PARALLEL_CREDENTIALS", True)
+    creds = [{"id": i, "username": "u", "password": "p"} for i in outcomes]
+
+    candidate = disc.identify_host("10.1.1.7", 22, creds)
+    assert (
+        candidate["status"],
+        candidate["credential_id"],
+        candidate["failed_credential_ids"],
+    ) == expected
+
+
+def test_identify_host_serves_cache_while_host_key_matches(monkeypatch):
+    logins: list[str] = []
+
+    def fake_detect(ip, port, cred, transport=None, on_session=None):
+        # The login reuses the connection whose host key was checked
+        assert transport is not None
+        logins.append(ip)
+        return "cisco_ios", "sw1", "Cisco IOS Software, Version 15.2(4)M\n"
+
+    host_keys = {"10.2.0.1": "SHA256:same", "10.2.0.2": "SHA256:new"}
+    monkeypatch.setattr(disc, "_ssh_detect", fake_detect)
+    connects = _fake_connect(
+        monkeypatch, lambda ip: FakeTransport(None, "Cisco-1.25", host_keys[ip])
+    )
+    cached = {"ip": "", "port": 22, "status": "identified", "credential_id": 1}
+    cache = {
+        ("10.2.0.1", 22): ("ssh-rsa SHA256:same", {**cached, "ip": "10.2.0.1"}),
+        ("10.2.0.2", 22): ("ssh-rsa SHA256:old", {**cached, "ip": "10.2.0.2"}),
+    }
+    creds = [{"id": 1, "username": "u", "password": "p"}]
+
+    hit = disc.identify_host("10.2.0.1", 22, creds, cache=cache)
+    assert hit["cached"] is True
+    assert logins == []
+
+    miss = disc.identify_host("10.2.0.2", 22, creds, cache=cache)
+    assert (miss["cached"], miss["host_key"]) == (False, "ssh-rsa SHA256:new")
+    assert logins == ["10.2.0.2"]
+    assert connects == ["10.2.0.1", "10.2.0.2"]
+
+    # A cached credential outside the caller's list is not trusted
+    other = [{"id": 2, "username": "u", "password": "p"}]
+    assert disc.identify_host("10.2.0.1", 22, other, cache=cache)["cached"] is False
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        (
+            "Arista DCS-7280SR-48C6-F\nHardware version: 11.00\n"
+            "Serial number: JPE123\nSoftware image version: 4.30.1F\n",
+            ("DCS-7280SR-48C6-F", "4.30.1F", "JPE123"),
+        ),
+        (
+            "Cisco Nexus Operating System (NX-OS) Software\n"
+            "  BIOS: version 05.39\n  NXOS: version 9.3(8)\n"
+            "  cisco Nexus9000 C9300v Chassis\n"
+            "  Processor Board ID 9N3KD63KWT0\n",
+            ("Nexus9000 C9300v", "9.3(8)", "9N3KD63KWT0"),
+        ),
+        (
+            "Cisco IOS XE Software, Version 17.03.04a\n"
+            "cisco C9300-24T (X86) processor with 1419044K/6147K bytes\n"
+            "Processor board ID FCW2149L0T5\n",
+            ("C9300-24T", "17.03.04a", "FCW2149L0T5"),
+        ),
+    ],
+)
+def test_parse_version_info_platforms(text, expected):
+    info = disc._parse_version_info(text)
+    assert (info["model"], info["os_version"], info["serial_number"]) == expected
+
+
 def test_sanitize_hostname():
     assert disc.sanitize_hostname("core-sw-01.corp.net") == "core_sw_01"
     assert disc.sanitize_hostname("plain") == "plain"
@@ -59,6 +436,7 @@ def credential(db: Session):
     db.commit()
     db.refresh(cred)
     yield cred
+    delete_credential_stats_by_credential_id(db, cred.id)
     db.delete(cred)
     db.commit()
 
@@ -107,13 +485,58 @@ def test_scan_forbidden_for_normal_user(client: TestClient, normal_user_token_he
     assert r.status_code == 403
 
 
+def test_scan_stream_events(
+    client: TestClient, superuser_token_headers, db: Session, monkeypatch
+):
+    sw = Device(hostname=f"exist_{random_lower_string()[:6]}", ipaddress="10.9.8.5")
+    db.add(sw)
+    db.commit()
+    db.refresh(sw)
+
+    async def fake_sweep(ips, port, **kwargs):
+        for ip in ips:
+            yield ip, (2.0 if ip in ("10.9.8.5", "10.9.8.6") else None)
+
+    monkeypatch.setattr("app.api.routes.discovery.sweep", fake_sweep)
+    r = client.post(
+        f"{settings.API_V1_STR}/devices/discovery/scan/stream",
+        headers=superuser_token_headers,
+        json={"cidr": "10.9.8.0/29"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0], block.split("data: ", 1)[1])
+        for block in r.text.strip().split("\n\n")
+    ]
+    hosts = [data for name, data in events if name == "event: host"]
+    assert len(hosts) == 2
+    assert f'"existing_hostname":"{sw.hostname}"' in hosts[0]
+    assert events[-1][0] == "event: done"
+    assert '"scanned":6' in events[-1][1]
+    assert '"open_count":2' in events[-1][1]
+    db.delete(sw)
+    db.commit()
+
+
+def test_scan_stream_rejects_larger_than_slash_16(
+    client: TestClient, superuser_token_headers
+):
+    r = client.post(
+        f"{settings.API_V1_STR}/devices/discovery/scan/stream",
+        headers=superuser_token_headers,
+        json={"cidr": "10.0.0.0/15"},
+    )
+    assert r.status_code == 400
+
+
 # ---------------------------------------------------------------- identify
 def test_identify_happy(
     client: TestClient, superuser_token_headers, credential: Credential, monkeypatch
 ):
     monkeypatch.setattr(
         "app.api.routes.discovery.identify_hosts_parallel",
-        lambda ips, port, creds: [
+        lambda ips, port, creds, **kwargs: [
             {
                 "ip": ips[0],
                 "port": port,
@@ -185,9 +608,83 @@ def test_identify_forbidden_for_normal_user(
     assert r.status_code == 403
 
 
+# ---------------------------------------------------------------- crawl
+def test_crawl_from_seed_device(
+    client: TestClient,
+    superuser_token_headers,
+    credential: Credential,
+    db: Session,
+    monkeypatch,
+):
+    sw = Device(hostname=f"seed_{random_lower_string()[:6]}", ipaddress="10.9.7.1")
+    db.add(sw)
+    db.commit()
+    db.refresh(sw)
+    calls: dict[str, Any] = {}
+
+    def crawl(seeds, known, port, creds, **kwargs):
+        calls.update(seeds=[d.id for d in seeds], **kwargs)
+        return {
+            "neighbors": [
+                {
+                    "hostname": "sw2",
+                    "ip": "10.9.7.2",
+                    "protocol": "cdp",
+                    "local_port": "Gi1/0/1",
+                    "remote_port": "Gi1/0/48",
+                    "depth": 1,
+                    "via": seeds[0].hostname,
+                    "existing_device_id": None,
+                }
+            ],
+            "candidates": [{"ip": "10.9.7.2", "port": port, "status": "unreachable"}],
+            "errors": [],
+        }
+
+    monkeypatch.setattr("app.api.routes.discovery.crawl_neighbors", crawl)
+    r = client.post(
+        f"{settings.API_V1_STR}/devices/discovery/crawl",
+        headers=superuser_token_headers,
+        json={"device_ids": [sw.id], "credential_ids": [credential.id]},
+    )
+    assert r.status_code == 200
+    assert calls["seeds"] == [sw.id]
+    assert calls["max_depth"] == 2
+    body = r.json()
+    assert body["neighbors"][0]["via"] == sw.hostname
+    assert body["candidates"][0]["status"] == "unreachable"
+    db.delete(sw)
+    db.commit()
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [{"max_depth": 0}, {"max_depth": 6}, {"max_devices": 1001}],
+)
+def test_crawl_rejects_limits(
+    client: TestClient, superuser_token_headers, credential: Credential, payload
+):
+    r = client.post(
+        f"{settings.API_V1_STR}/devices/discovery/crawl",
+        headers=superuser_token_headers,
+        json={"credential_ids": [credential.id], **payload},
+    )
+    assert r.status_code == 422
+
+
+def test_crawl_unknown_device(
+    client: TestClient, superuser_token_headers, credential: Credential
+):
+    r = client.post(
+        f"{settings.API_V1_STR}/devices/discovery/crawl",
+        headers=superuser_token_headers,
+        json={"device_ids": [999999], "credential_ids": [credential.id]},
+    )
+    assert r.status_code == 404
+
+
 # ---------------------------------------------------------------- add
-def test_add_partial(client: TestClient, superuser_token_headers, monkeypatch):
-    monkeypatch.setattr("app.crud.devices.create_hosts", lambda devices_db: None)
+def test_add_partial(client: TestClient, superuser_token_headers):
     h1 = f"disc_{random_lower_string()[:6]}"
     payload = {
         "devices": [
@@ -218,3 +715,75 @@ def test_add_forbidden_for_normal_user(client: TestClient, normal_user_token_hea
         json={"devices": [{"hostname": "x", "ipaddress": "10.0.0.1"}]},
     )
     assert r.status_code == 403
+
+
+# ---------------------------------------------------------------- jobs
+def test_identify_job_create_and_poll(
+    client: TestClient,
+    superuser_token_headers,
+    credential: Credential,
+    db: Session,
+    monkeypatch,
+):
+    from app.crud.discovery_jobs import record_host_result
+    from app.models import DiscoveryJob, DiscoveryJobHost
+
+    queued: list[int] = []
+    monkeypatch.setattr("app.api.routes.discovery.queue_discovery_job", queued.append)
+    ips = [f"10.7.{i // 250}.{i % 250 + 1}" for i in range(40)]
+    r = client.post(
+        f"{settings.API_V1_STR}/devices/discovery/jobs",
+        headers=superuser_token_headers,
+        json={"ips": ips, "credential_ids": [credential.id]},
+    )
+    assert r.status_code == 200
+    job = r.json()
+    assert (job["status"], job["total"], job["completed"]) == ("pending", 40, 0)
+    assert queued == [job["id"]]
+
+    record_host_result(
+        db, job["id"], {"ip": ips[3], "port": 22, "status": "auth_failed"}
+    )
+    r = client.get(
+        f"{settings.API_V1_STR}/devices/discovery/jobs/{job['id']}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["completed"] == 1
+    assert r.json()["candidates"][0]["ip"] == ips[3]
+
+    job_db = db.get(DiscoveryJob, job["id"])
+    job_db.status = "completed"
+    db.add(job_db)
+    db.commit()
+    r = client.get(
+        f"{settings.API_V1_STR}/devices/discovery/jobs/{job['id']}/stream",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    blocks = r.text.strip().split("\n\n")
+    assert blocks[0].startswith("event: candidate")
+    assert blocks[-1].startswith("event: done")
+
+    db.exec(delete(DiscoveryJobHost).where(DiscoveryJobHost.job_id == job["id"]))
+    db.delete(job_db)
+    db.commit()
+
+
+def test_identify_job_rejects_bad_ip(
+    client: TestClient, superuser_token_headers, credential: Credential
+):
+    r = client.post(
+        f"{settings.API_V1_STR}/devices/discovery/jobs",
+        headers=superuser_token_headers,
+        json={"ips": ["10.0.0.1", "nope"], "credential_ids": [credential.id]},
+    )
+    assert r.status_code == 422
+
+
+def test_identify_job_unknown(client: TestClient, superuser_token_headers):
+    r = client.get(
+        f"{settings.API_V1_STR}/devices/discovery/jobs/987654",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 404
@@ -0,0 +1,193 @@
+import threading
+import time
+from copy import copy
+
+import pytest
+from nornir.core.inventory import Host
+from nornir.core.task import Task
+
+from app.automation import connection_pool as pool_mod
+from app.automation.connection_pool import ConnectionPool
+from app.crud.create_nornir import regenerate_inventory
+
+
+class FakeDriver:
+    def __init__(self, alive: bool | dict = True) -> None:
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+
+class FakePlugin:
+    def __init__(self, alive: bool | dict = True) -> None:
+        self.connection = FakeDriver(alive)
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def inventory(monkeypatch) -> dict[str, Host]:
+    regenerate_inventory()
+    hosts = {"sw1": Host(name="sw1", hostname="192.0.2.1", platform="ios")}
+    monkeypatch.setattr(
+        pool_mod,
+        "select_hosts",
+        lambda name=None: {n: copy(h) for n, h in hosts.items() if name in (None, n)},
+    )
+    return hosts
+
+
+def _open(plugin: FakePlugin, conn: str = "netmiko"):
+    """Task that 'logs in' by leaving plugin on the host."""
+
+    def task(task: Task) -> None:
+        task.host.connections.setdefault(conn, plugin)
+
+    return task
+
+
+def _connections(seen: list[dict]):
+    def task(task: Task) -> None:
+        seen.append(dict(task.host.connections))
+
+    return task
+
+
+def test_session_reuses_live_connection(inventory) -> None:
+    pool = ConnectionPool(idle_seconds=300)
+    plugin = FakePlugin()
+    with pool.session(name="sw1") as nr:
+        nr.run(task=_open(plugin))
+        # Outside a task the view holds no sessions
+        assert not nr.inventory.hosts["sw1"].connections
+    seen: list[dict] = []
+    with pool.session(name="sw1") as nr:
+        nr.run(task=_connections(seen))
+    assert seen[0]["netmiko"] is plugin
+    assert not plugin.closed
+    assert pool.stats()["misses"] == 1
+    assert pool.stats()["hits"] == 1
+
+
+def test_dead_connection_is_dropped(inventory) -> None:
+    pool = ConnectionPool(idle_seconds=300)
+    plugin = FakePlugin(alive={"is_alive": False})
+    with pool.session(name="sw1") as nr:
+        nr.run(task=_open(plugin, "napalm"))
+    seen: list[dict] = []
+    with pool.session(name="sw1") as nr:
+        nr.run(task=_connections(seen))
+    assert "napalm" not in seen[0]
+    assert plugin.closed
+    assert pool.stats()["evictions"] == 1
+
+
+def test_idle_connections_are_evicted(inventory) -> None:
+    pool = ConnectionPool(idle_seconds=0)
+    plugin = FakePlugin()
+    with pool.session(name="sw1") as nr:
+        nr.run(task=_open(plugin))
+    # With a zero TTL nothing outlives the task
+    assert plugin.closed
+
+    pool = ConnectionPool(idle_seconds=300)
+    plugin = FakePlugin()
+    with pool.session(name="sw1") as nr:
+        nr.run(task=_open(plugin))
+    pool._idle_seconds = 0
+    assert pool.evict_idle() == 1
+    assert plugin.closed
+    assert not pool._entries
+
+
+def test_failed_task_closes_connections(inventory) -> None:
+    pool = ConnectionPool(idle_seconds=300)
+    plugin = FakePlugin()
+
+    def boom(task: Task) -> None:
+        task.host.connections["netmiko"] = plugin
+        raise RuntimeError("boom")
+
+    with pool.session(name="sw1") as nr:
+        assert nr.run(task=boom).failed
+    assert plugin.closed
+
+
+def test_changed_definition_closes_connections(inventory) -> None:
+    pool = ConnectionPool(idle_seconds=300)
+    plugin = FakePlugin()
+    with pool.session(name="sw1") as nr:
+        nr.run(task=_open(plugin))
+    inventory["sw1"] = Host(name="sw1", hostname="192.0.2.99", platform="ios")
+    seen: list[dict] = []
+    with pool.session(name="sw1") as nr:
+        assert nr.inventory.hosts["sw1"].hostname == "192.0.2.99"
+        nr.run(task=_connections(seen))
+    assert seen == [{}]
+    assert plugin.closed
+
+
+def test_group_run_holds_each_host_only_for_its_task(monkeypatch) -> None:
+    regenerate_inventory()
+    hosts = {
+        name: Host(name=name, hostname="192.0.2.1", platform="ios")
+        for name in ("sw1", "sw2")
+    }
+    monkeypatch.setattr(
+        pool_mod,
+        "select_hosts",
+        lambda name=None: {n: copy(h) for n, h in hosts.items() if name in (None, n)},
+    )
+    pool = ConnectionPool(idle_seconds=300, wait_seconds=5)
+    sw1_done = threading.Event()
+    started = time.monotonic()
+    release = threading.Event()
+
+    def slow_on_sw2(task: Task) -> None:
+        if task.host.name == "sw2":
+            release.wait(5)
+        else:
+            sw1_done.set()
+
+    def run_group() -> None:
+        with pool.session() as nr:
+            nr.run(task=slow_on_sw2)
+
+    group = threading.Thread(target=run_group)
+    group.start()
+    try:
+        assert sw1_done.wait(5)
+        # sw1 finished its part of the group run, so it is free again even
+        # though the run is still busy on sw2
+        with pool.session(name="sw1") as nr:
+            assert not nr.run(task=_connections([])).failed
+        assert time.monotonic() - started < 2
+    finally:
+        release.set()
+        group.join()
+
+
+def test_busy_host_fails_after_wait(inventory) -> None:
+    pool = ConnectionPool(idle_seconds=300, wait_seconds=0.1)
+    entry = pool._entry("sw1")
+    entry.lock.acquire()
+    try:
+        with pool.session(name="sw1") as nr:
+            result = nr.run(task=_connections([]))
+    finally:
+        entry.lock.release()
+    assert result.failed
+    assert isinstance(result["sw1"].exception, pool_mod.DeviceBusyError)
+
+
+def test_forget_closes_and_drops_entry(inventory) -> None:
+    pool = ConnectionPool(idle_seconds=300)
+    plugin = FakePlugin()
+    with pool.session(name="sw1") as nr:
+        nr.run(task=_open(plugin))
+    pool.forget("sw1")
+    assert plugin.closed
+    assert "sw1" not in pool._entries
@@ -0,0 +1,97 @@
+from nornir.core.filter import F
+from sqlmodel import Session
+
+from app.automation.db_inventory import DBInventory
+from app.automation.nornir_factory import select_hosts
+from app.crud.create_nornir import regenerate_inventory
+from app.crud.credentials import create_credential
+from app.crud.devices import create_device, update_device
+from app.crud.groups import create_group
+from app.models import (
+    CredentialCreate,
+    Device,
+    DeviceCreate,
+    DeviceUpdate,
+    GroupCreate,
+)
+from app.tests.utils.utils import random_lower_string
+
+
+def _device(db: Session, **kwargs) -> Device:
+    device_in = DeviceCreate(
+        hostname=f"inv_{random_lower_string()[:8]}",
+        ipaddress="192.0.2.10",
+        **kwargs,
+    )
+    return create_device(session=db, device_in=device_in)
+
+
+def test_host_built_from_device_and_credential(db: Session) -> None:
+    regenerate_inventory()
+    credential = create_credential(
+        session=db,
+        credential_in=CredentialCreate(
+            username="netops", password="s3cret", enable_password="en4ble"
+        ),
+    )
+    device = _device(db, platform="eos", credential_id=credential.id, port=2222)
+
+    hosts = select_hosts(name=device.hostname)
+
+    host = hosts[device.hostname]
+    assert host.hostname == "192.0.2.10"
+    assert host.port == 2222
+    assert host.username == "netops"
+    assert host.password == "s3cret"
+    netmiko = host.get_connection_parameters("netmiko")
+    assert netmiko.platform == "arista_eos"
+    assert netmiko.extras["secret"] == "en4ble"
+
+
+def test_device_edits_are_visible_without_regeneration(db: Session) -> None:
+    device = _device(db, platform="ios")
+    update_device(
+        session=db,
+        device_db=device,
+        device_in=DeviceUpdate(ipaddress="192.0.2.20"),
+    )
+    hosts = select_hosts(name=device.hostname)
+    assert hosts[device.hostname].hostname == "192.0.2.20"
+
+
+def test_group_filter_is_exact(db: Session) -> None:
+    regenerate_inventory()
+    group = f"grp{random_lower_string()[:6]}"
+    create_group(
+        session=db, group_in=GroupCreate(name=group, description="", site="lab")
+    )
+    member = _device(db, platform="ios", groups=group)
+    _device(db, platform="ios", groups=f"{group}x")
+
+    hosts = select_hosts(F(groups__contains=group))
+
+    assert list(hosts) == [member.hostname]
+
+
+def test_groups_and_defaults_load_from_yaml(tmp_path) -> None:
+    (tmp_path / "defaults.yaml").write_text(
+        "username: admin\nconnection_options:\n  napalm:\n    extras:\n"
+        "      optional_args: {transport: ssh}\n"
+    )
+    (tmp_path / "groups.yaml").write_text(
+        "core:\n  groups: [site]\n  data: {role: core}\nsite:\n  platform: ios\n"
+    )
+    plugin = DBInventory(
+        group_file=str(tmp_path / "groups.yaml"),
+        defaults_file=str(tmp_path / "defaults.yaml"),
+    )
+
+    groups, defaults = plugin.load_groups()
+
+    assert defaults.username == "admin"
+    assert defaults.connection_options["napalm"].extras == {
+        "optional_args": {"transport": "ssh"}
+    }
+    assert [g.name for g in groups["core"].groups] == ["site"]
+    assert groups["core"].data == {"role": "core"}
+    assert groups["core"].get_connection_parameters().platform == "ios"
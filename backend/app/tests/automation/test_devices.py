@@ -0,0 +1,55 @@
+from nornir.core import Nornir
+from nornir.core.inventory import Host, Hosts, Inventory
+from nornir.core.task import Result, Task
+
+from app.automation import devices as dev
+from app.automation.runners import PlatformLimitedRunner
+from app.models import Device
+
+EOS_STATUS = """Port       Name        Status       Vlan     Duplex Speed  Type
+Et1        uplink      connected    trunk    full   1G     EbraTestPhyPort
+Et2                    notconnect   10       auto   auto   EbraTestPhyPort
+"""
+
+
+def test_parse_interfaces_status_eos():
+    device = Device(hostname="sw1", ipaddress="192.0.2.1", platform="eos")
+    interfaces = dev.parse_interfaces_status(
+        device, {"show interface status": EOS_STATUS}
+    )
+    assert [i["port"] for i in interfaces] == ["Ethernet1", "Ethernet2"]
+    assert interfaces[0]["mode"] == "trunk"
+    assert interfaces[0]["description"] == "uplink"
+    assert interfaces[1]["vlan"] == "10"
+
+
+def test_parse_interfaces_status_missing_output():
+    device = Device(hostname="sw1", ipaddress="192.0.2.1", platform="eos")
+    assert dev.parse_interfaces_status(device, {}) == []
+
+
+def test_interface_status_commands_cover_platforms():
+    for platform in ("ios", "nxos_ssh", "eos", "junos"):
+        assert dev.INTERFACE_STATUS_COMMANDS[platform]
+
+
+def test_stream_host_results_hands_off_and_releases() -> None:
+    def collect(task: Task) -> Result:
+        if task.host.name == "bad":
+            raise RuntimeError("unreachable")
+        return Result(host=task.host, result={"get_facts": {"model": "x"}})
+
+    seen: dict[str, dict] = {}
+    stream = dev._StreamHostResults(lambda name, facts: seen.update({name: facts}))
+    hosts = Hosts({name: Host(name=name) for name in ("sw1", "sw2", "bad")})
+    nr = Nornir(
+        inventory=Inventory(hosts=hosts), runner=PlatformLimitedRunner()
+    ).with_processors([stream])
+
+    result = nr.run(task=collect)
+
+    assert set(seen) == {"sw1", "sw2"}
+    assert seen["sw1"]["get_facts"]["model"] == "x"
+    assert set(stream.failed) == {"bad"}
+    # payloads are dropped once handed off
+    assert result["sw1"][0].result is None
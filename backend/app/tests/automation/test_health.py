@@ -0,0 +1,53 @@
+import asyncio
+import socket
+import time
+
+from app.automation.health import RateLimiter, check_devices_parallel, probe_devices
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_probe_devices_yields_up_and_down() -> None:
+    async def scenario() -> dict[int, tuple[str, float | None]]:
+        server = await asyncio.start_server(
+            lambda _r, w: w.close(), host="127.0.0.1", port=0
+        )
+        port = server.sockets[0].getsockname()[1]
+        devices = [
+            {"id": 1, "ip": "127.0.0.1", "port": port},
+            {"id": 2, "ip": "127.0.0.1", "port": _closed_port()},
+        ]
+        async with server:
+            return {
+                r.device_id: (r.status, r.rtt_ms)
+                async for r in probe_devices(
+                    devices, concurrency=10, rate=0, timeout=1.0
+                )
+            }
+
+    results = asyncio.run(scenario())
+    assert results[1][0] == "UP"
+    assert results[1][1] is not None
+    assert results[2] == ("DOWN", None)
+
+
+def test_rate_limiter_spaces_acquisitions() -> None:
+    async def scenario() -> float:
+        limiter = RateLimiter(rate=50)
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+        return time.monotonic() - start
+
+    # 6 acquisitions at 50/s need at least 5 intervals of 20 ms
+    assert asyncio.run(scenario()) >= 0.09
+
+
+def test_check_devices_parallel_sync_wrapper() -> None:
+    results = check_devices_parallel(
+        [{"id": 7, "ip": "127.0.0.1", "port": _closed_port()}]
+    )
+    assert results == {7: "DOWN"}
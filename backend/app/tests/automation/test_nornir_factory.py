@@ -0,0 +1,34 @@
+from sqlmodel import Session
+
+from app.automation import nornir_factory
+from app.crud.create_nornir import regenerate_inventory
+from app.crud.devices import create_device
+from app.models import DeviceCreate
+from app.tests.utils.utils import random_lower_string
+
+
+def test_factory_reuses_parsed_config() -> None:
+    regenerate_inventory()
+    first, _ = nornir_factory._get_base()
+    assert nornir_factory._get_base()[0] is first
+
+    nornir_factory.invalidate_inventory()
+    assert nornir_factory._get_base()[0] is not first
+
+
+def test_views_do_not_share_hosts(db: Session) -> None:
+    regenerate_inventory()
+    name = f"nf_{random_lower_string()[:8]}"
+    create_device(
+        session=db, device_in=DeviceCreate(hostname=name, ipaddress="192.0.2.30")
+    )
+    view_a = nornir_factory.make_view(nornir_factory.select_hosts(name=name))
+    view_b = nornir_factory.make_view(nornir_factory.select_hosts(name=name))
+    assert list(view_a.inventory.hosts) == [name]
+    assert view_a.inventory.hosts[name] is not view_b.inventory.hosts[name]
+    assert view_a.data is not view_b.data
+
+
+def test_select_hosts_unknown_host_is_empty() -> None:
+    regenerate_inventory()
+    assert not nornir_factory.select_hosts(name="no-such-device")
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from nornir.core import Nornir
+from nornir.core.inventory import Host, Hosts, Inventory
+from nornir.core.task import Result, Task
+
+from app.automation.nornir_factory import get_runner
+from app.automation.runners import PlatformLimitedRunner
+from app.core.config import parse_platform_limits, settings
+
+
+def _nornir(runner: PlatformLimitedRunner, platforms: dict[str, str]) -> Nornir:
+    hosts = Hosts(
+        {
+            name: Host(name=name, platform=platform)
+            for name, platform in platforms.items()
+        }
+    )
+    return Nornir(inventory=Inventory(hosts=hosts), runner=runner)
+
+
+def test_platform_limit_caps_concurrency() -> None:
+    lock = threading.Lock()
+    running: dict[str, int] = {"junos": 0, "ios": 0}
+    peak: dict[str, int] = {"junos": 0, "ios": 0}
+
+    def probe(task: Task) -> Result:
+        platform = task.host.platform
+        with lock:
+            running[platform] += 1
+            peak[platform] = max(peak[platform], running[platform])
+        time.sleep(0.05)
+        with lock:
+            running[platform] -= 1
+        return Result(host=task.host)
+
+    platforms = {f"j{i}": "junos" for i in range(6)}
+    platforms.update({f"i{i}": "ios" for i in range(6)})
+    nr = _nornir(
+        PlatformLimitedRunner(num_workers=8, platform_limits={"junos": 2}), platforms
+    )
+
+    result = nr.run(task=probe)
+
+    assert not result.failed
+    assert len(result) == 12
+    assert peak["junos"] <= 2
+    assert peak["ios"] > 2
+
+
+def test_parse_platform_limits() -> None:
+    assert parse_platform_limits("junos:4, eos:8") == {"junos": 4, "eos": 8}
+    assert parse_platform_limits("") == {}
+    assert parse_platform_limits({"junos": 1}) == {"junos": 1}
+
+
+def test_runner_sized_per_operation(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "NORNIR_READ_WORKERS", 30)
+    monkeypatch.setattr(settings, "NORNIR_CONFIG_WORKERS", 3)
+    assert get_runner("read").num_workers == 30
+    assert get_runner("config").num_workers == 3
@@ -0,0 +1,310 @@
+from typing import Any
+
+import pytest
+
+from app.automation import topology
+from app.models import Device
+
+IOS_CDP = """-------------------------
+Device ID: dist2.example.com
+Entry address(es):
+  IP address: 10.0.0.2
+Platform: cisco WS-C3850-24T,  Capabilities: Router Switch IGMP
+Interface: GigabitEthernet1/0/1,  Port ID (outgoing port): GigabitEthernet1/0/24
+Holdtime : 150 sec
+
+Management address(es):
+  IP address: 192.0.2.2
+
+-------------------------
+Device ID: phone1
+Entry address(es):
+  IP address: 10.9.9.9
+Platform: Cisco IP Phone 8841,  Capabilities: Host Phone
+Interface: GigabitEthernet1/0/5,  Port ID (outgoing port): Port 1
+"""
+
+NXOS_CDP = """----------------------------------------
+Device ID:leaf3(FDO21120U8N)
+System Name: leaf3
+
+Interface address(es): 1
+    IPv4 Address: 10.1.1.3
+Platform: N9K-C93180YC-EX, Capabilities: Router Switch
+Interface: Ethernet1/49, Port ID (outgoing port): Ethernet1/50
+Holdtime: 170 sec
+
+Mgmt address(es):
+    IPv4 Address: 192.0.2.13
+"""
+
+EOS_LLDP = """Interface Ethernet1 detected 1 LLDP neighbors:
+
+  Neighbor 001c.7300.0001/Ethernet1, age 4 seconds
+  Discovered 1 day, 2:03:04 ago; Last changed 1 day, 2:03:04 ago
+  - Chassis ID type: MAC address (4)
+    Chassis ID     : 001c.7300.0001
+  - Port ID type: Interface name (5)
+    Port ID     : "Ethernet1"
+  - Time To Live: 120 seconds
+  - System Name: "spine1"
+  - Management Address Subtype: IPv4 (1)
+    Management Address        : 192.0.2.21
+
+Interface Ethernet2 detected 0 LLDP neighbors:
+"""
+
+JUNOS_LLDP_TABLE = """Local Interface    Parent Interface    Chassis Id          Port info          System Name
+ge-0/0/0           -                   00:05:86:71:e2:c0   ge-0/0/1           r2
+ge-0/0/1           -                   00:05:86:71:e2:c1   ge-0/0/2           r3
+"""
+
+JUNOS_LLDP_GE0 = """LLDP Neighbor Information:
+Local Information:
+Index: 1 Time to live: 120 Time mark: Mon Jan  1 00:00:00 2026 Age: 10 secs
+Local Interface    : ge-0/0/0
+Parent Interface   : -
+Local Port ID      : 513
+
+Neighbour Information:
+Chassis type       : Mac address
+Chassis ID         : 00:05:86:71:e2:c0
+Port type          : Locally assigned
+Port ID            : 514
+Port description   : ge-0/0/1
+System name        : r2
+
+  Address Type      : IPv4(1)
+  Address           : 192.0.2.32
+
+Management Info
+  Type              : IPv4
+  Address           : 192.0.2.32
+"""
+
+
+def test_parse_cdp_ios_prefers_management_address():
+    neighbors = topology.parse_cdp_neighbors(IOS_CDP)
+    assert neighbors[0] == {
+        "hostname": "dist2.example.com",
+        "ip": "192.0.2.2",
+        "local_port": "GigabitEthernet1/0/1",
+        "remote_port": "GigabitEthernet1/0/24",
+        "protocol": "cdp",
+    }
+    # No management section: falls back to the entry address
+    assert neighbors[1]["ip"] == "10.9.9.9"
+
+
+def test_parse_cdp_nxos_strips_serial():
+    (neighbor,) = topology.parse_cdp_neighbors(NXOS_CDP)
+    assert neighbor["hostname"] == "leaf3"
+    assert neighbor["ip"] == "192.0.2.13"
+    assert neighbor["local_port"] == "Ethernet1/49"
+
+
+def test_parse_lldp_eos():
+    (neighbor,) = topology.parse_lldp_neighbors("eos", EOS_LLDP)
+    assert neighbor["hostname"] == "spine1"
+    assert neighbor["ip"] == "192.0.2.21"
+    assert neighbor["local_port"] == "Ethernet1"
+    assert neighbor["remote_port"] == "Ethernet1"
+
+
+def test_collect_junos_walks_interfaces():
+    outputs = {
+        "show lldp neighbors": JUNOS_LLDP_TABLE,
+        "show lldp neighbors interface ge-0/0/0": JUNOS_LLDP_GE0,
+        "show lldp neighbors interface ge-0/0/1": "",
+    }
+    sent: list[str] = []
+
+    def send(command: str) -> str:
+        sent.append(command)
+        return outputs[command]
+
+    collected = topology._collect_outputs(send, "junos")
+    assert sent == list(outputs)
+    (neighbor,) = topology.parse_neighbors("junos", collected)
+    assert neighbor["hostname"] == "r2"
+    assert neighbor["ip"] == "192.0.2.32"
+    assert neighbor["local_port"] == "ge-0/0/0"
+
+
+def test_parse_neighbors_merges_cdp_and_lldp():
+    lldp = """------------------------------------------------
+Local Intf: Gi1/0/1
+Chassis id: 0011.2233.4455
+Port id: Gi1/0/24
+System Name: dist2.example.com
+"""
+    neighbors = topology.parse_neighbors(
+        "ios",
+        {"show cdp neighbors detail": IOS_CDP, "show lldp neighbors detail": lldp},
+    )
+    # The LLDP entry names the port Gi1/0/1, not GigabitEthernet1/0/1; it is
+    # still the same neighbor by name once the crawl dedupes on hostname
+    assert [n["hostname"] for n in neighbors] == [
+        "dist2.example.com",
+        "phone1",
+        "dist2.example.com",
+    ]
+    assert neighbors[2]["ip"] is None
+
+
+def _neighbor(hostname: str, ip: str | None) -> dict[str, Any]:
+    return {
+        "hostname": hostname,
+        "ip": ip,
+        "local_port": None,
+        "remote_port": None,
+        "protocol": "lldp",
+    }
+
+
+@pytest.fixture
+def fake_lab(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """r1 - r2 (registered), then r3 - r4 - r5 (new)"""
+    tables = {
+        "r1": [_neighbor("r2", "192.0.2.2")],
+        "r2": [_neighbor("r1.lab", "192.0.2.1"), _neighbor("r3", "192.0.2.3")],
+        "r3": [_neighbor("r2", None), _neighbor("r4", "192.0.2.4")],
+        "r4": [_neighbor("r3", "192.0.2.3"), _neighbor("r5", "192.0.2.5")],
+        "r5": [],
+    }
+    identified: list[str] = []
+
+    def identify(ip: str, port: int, credentials: list[dict], **kwargs: Any) -> dict:
+        identified.append(ip)
+        return {
+            "ip": ip,
+            "port": port,
+            "status": "identified",
+            "hostname": "r" + ip.rsplit(".", 1)[1],
+            "platform": "eos",
+            "credential_id": credentials[0]["id"],
+        }
+
+    monkeypatch.setattr(topology, "identify_host", identify)
+    monkeypatch.setattr(topology, "get_neighbors", lambda d: tables[d.hostname])
+    monkeypatch.setattr(
+        topology, "get_neighbors_direct", lambda c, cred: tables[c["hostname"]]
+    )
+    return identified
+
+
+def _devices() -> list[Device]:
+    return [
+        Device(id=1, hostname="r1", ipaddress="192.0.2.1", platform="eos"),
+        Device(id=2, hostname="r2", ipaddress="192.0.2.2", platform="eos"),
+    ]
+
+
+def test_crawl_walks_through_known_devices(fake_lab: list[str]):
+    devices = _devices()
+    result = topology.crawl_neighbors(
+        devices[:1],
+        devices,
+        22,
+        [{"id": 7, "username": "u", "password": "p"}],
+        max_depth=5,
+        max_devices=10,
+    )
+    neighbors = {n["hostname"]: n for n in result["neighbors"]}
+    assert list(neighbors) == ["r2", "r3", "r4", "r5"]
+    assert neighbors["r2"]["existing_device_id"] == 2
+    assert neighbors["r3"]["depth"] == 2
+    assert neighbors["r3"]["via"] == "r2"
+    # Known devices are never identified; each new IP exactly once
+    assert fake_lab == ["192.0.2.3", "192.0.2.4", "192.0.2.5"]
+    assert result["errors"] == []
+
+
+def test_crawl_depth_and_device_limits(fake_lab: list[str]):
+    devices = _devices()
+    creds = [{"id": 7, "username": "u", "password": "p"}]
+    result = topology.crawl_neighbors(
+        devices[:1], devices, 22, creds, max_depth=2, max_devices=10
+    )
+    assert [n["hostname"] for n in result["neighbors"]] == ["r2", "r3"]
+    assert fake_lab == ["192.0.2.3"]
+
+    fake_lab.clear()
+    result = topology.crawl_neighbors(
+        devices[:1], devices, 22, creds, max_depth=5, max_devices=1
+    )
+    assert [c["ip"] for c in result["candidates"]] == ["192.0.2.3"]
+    assert fake_lab == ["192.0.2.3"]
+
+
+def test_crawl_reports_unreachable_neighbors(
+    fake_lab: list[str], monkeypatch: pytest.MonkeyPatch
+):
+    def fail(device: Device) -> list:
+        raise RuntimeError("timed out")
+
+    monkeypatch.setattr(topology, "get_neighbors", fail)
+    devices = _devices()
+    result = topology.crawl_neighbors(
+        devices,
+        devices,
+        22,
+        [{"id": 7, "username": "u", "password": "p"}],
+        max_depth=2,
+        max_devices=10,
+    )
+    assert result["neighbors"] == []
+    assert result["errors"] == [
+        {"hostname": "r1", "error": "timed out"},
+        {"hostname": "r2", "error": "timed out"},
+    ]
+
+
+def test_crawl_reads_neighbors_over_identify_login(monkeypatch: pytest.MonkeyPatch):
+    """r1 (registered) - r3 (new, logged in) and r4 (new, served from cache)"""
+    direct: list[str] = []
+    caches: list[Any] = []
+
+    def identify(ip: str, port: int, credentials: list[dict], **kwargs: Any) -> dict:
+        caches.append(kwargs["cache"])
+        cached = (ip, port) in kwargs["cache"]
+        if not cached:
+            kwargs["on_session"](
+                "ios", lambda command: IOS_CDP if "cdp" in command else ""
+            )
+        return {
+            "ip": ip,
+            "port": port,
+            "status": "identified",
+            "hostname": "r" + ip.rsplit(".", 1)[1],
+            "platform": "ios",
+            "credential_id": 7,
+            "cached": cached,
+        }
+
+    def neighbors_direct(candidate: dict, cred: dict) -> list:
+        direct.append(candidate["ip"])
+        return []
+
+    monkeypatch.setattr(topology, "identify_host", identify)
+    monkeypatch.setattr(
+        topology,
+        "get_neighbors",
+        lambda d: [_neighbor("r3", "192.0.2.3"), _neighbor("r4", "192.0.2.4")],
+    )
+    monkeypatch.setattr(topology, "get_neighbors_direct", neighbors_direct)
+    devices = _devices()
+    result = topology.crawl_neighbors(
+        devices[:1],
+        devices,
+        22,
+        [{"id": 7, "username": "u", "password": "p"}],
+        max_depth=2,
+        max_devices=10,
+        load_cache=lambda ips: {("192.0.2.4", 22): ("ssh-rsa SHA256:x", {})},
+    )
+    # r3's CDP table came from its identify session; only cached r4 logs in
+    assert direct == ["192.0.2.4"]
+    by_name = {n["hostname"]: n for n in result["neighbors"]}
+    assert by_name["dist2.example.com"]["via"] == "r3"
+    assert caches and all(("192.0.2.4", 22) in cache for cache in caches)
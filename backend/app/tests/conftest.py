@@ -13,14 +13,22 @@ from app.models import (
     ComplianceProfile,
     ComplianceResult,
     ComplianceRun,
+    ConfigBackupRun,
     ConfigRevision,
     Credential,
+    CredentialStat,
     Device,
+    DiscoveryCacheEntry,
+    DiscoveryJob,
+    DiscoveryJobHost,
     Group,
+    HealthProbe,
+    HealthRollup,
     IpInterface,
     Item,
     MacAddress,
     OAuthAccount,
+    SyncFingerprint,
     User,
     WebAuthnCredential,
 )
@@ -37,12 +45,20 @@ def db() -> Generator[Session]:
         session.execute(delete(Arp))
         session.execute(delete(MacAddress))
         session.execute(delete(IpInterface))
+        session.execute(delete(CredentialStat))
         session.execute(delete(Credential))
         # children before parents — these all carry FKs onto device/group
         session.execute(delete(ComplianceResult))
         session.execute(delete(ComplianceRun))
         session.execute(delete(ComplianceProfile))
         session.execute(delete(ConfigRevision))
+        session.execute(delete(ConfigBackupRun))
+        session.execute(delete(SyncFingerprint))
+        session.execute(delete(HealthProbe))
+        session.execute(delete(HealthRollup))
+        session.execute(delete(DiscoveryCacheEntry))
+        session.execute(delete(DiscoveryJobHost))
+        session.execute(delete(DiscoveryJob))
         session.execute(delete(Group))
         session.execute(delete(Device))
         session.execute(delete(WebAuthnCredential))
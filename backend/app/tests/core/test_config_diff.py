@@ -0,0 +1,136 @@
+import random
+import subprocess
+from pathlib import Path
+
+from app.core.config_diff import _intern, diff_opcodes, unified_diff
+
+RUNNING = """hostname r1
+!
+interface Ethernet1
+ description uplink
+ shutdown
+!
+interface Ethernet2
+ description spare
+!
+router bgp 65000
+ neighbor 192.0.2.1 remote-as 65001
+!
+end
+"""
+
+CHANGED = """hostname r1
+!
+interface Ethernet1
+ description uplink
+!
+interface Ethernet3
+ description new
+!
+router bgp 65000
+ neighbor 192.0.2.1 remote-as 65001
+ neighbor 192.0.2.2 remote-as 65002
+!
+end
+"""
+
+
+def test_identical_configs_have_empty_diff():
+    assert unified_diff(RUNNING, RUNNING) == ""
+
+
+def test_unified_diff_format():
+    assert unified_diff(
+        "hostname old\nntp server 1\n", "hostname new\nntp server 1\n"
+    ) == (
+        "--- a\n+++ b\n@@ -1,2 +1,2 @@\n-hostname old\n+hostname new\n ntp server 1\n"
+    )
+
+
+def test_opcodes_cover_both_sides():
+    rng = random.Random(7)
+    for _ in range(500):
+        a = [rng.choice("abcde") for _ in range(rng.randint(0, 25))]
+        b = list(a)
+        for _ in range(rng.randint(0, 6)):
+            pos = rng.randint(0, len(b))
+            if rng.random() < 0.5 and b:
+                del b[min(pos, len(b) - 1)]
+            else:
+                b.insert(pos, rng.choice("abcxyz"))
+        ia, ib = _intern(a, b)
+        i = j = 0
+        for tag, i1, i2, j1, j2 in diff_opcodes(ia, ib, 0, len(a), 0, len(b)):
+            assert (i1, j1) == (i, j)
+            if tag == "equal":
+                assert a[i1:i2] == b[j1:j2]
+            i, j = i2, j2
+        assert (i, j) == (len(a), len(b))
+
+
+def test_matches_git_diff(tmp_path: Path):
+    lines = []
+    for i in range(2000):
+        lines += [f"interface Ethernet1/{i}", f" description port {i}", "!"]
+    old = "\n".join(lines) + "\n"
+    for i in range(1, len(lines), 97):
+        lines[i] = " shutdown"
+    lines.insert(500, "interface Loopback0")
+    del lines[3000:3003]
+    new = "\n".join(lines) + "\n"
+    (tmp_path / "a").write_text(old)
+    (tmp_path / "b").write_text(new)
+    git = subprocess.run(
+        ["git", "diff", "--no-index", "--no-color", "a", "b"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    def hunks(diff: str) -> list[str]:
+        # git appends the enclosing "function" line to hunk headers
+        out = [line for line in diff.splitlines() if line[:1] in " +-@"][2:]
+        return [line.split(" @@")[0] if line.startswith("@@") else line for line in out]
+
+    assert hunks(unified_diff(old, new)) == hunks(git)
+
+
+def test_section_diff_is_per_block():
+    diff = unified_diff(RUNNING, CHANGED, sections=True)
+    headers = [line for line in diff.splitlines() if line.startswith("@@")]
+    assert headers == [
+        "@@ -4,3 +4,2 @@ interface Ethernet1",
+        "@@ -7,2 +6,2 @@ interface Ethernet3",
+        "@@ -10,4 +9,5 @@ router bgp 65000",
+    ]
+    # Context stays inside the block
+    assert " hostname r1" not in diff
+    assert "+ neighbor 192.0.2.2 remote-as 65002" in diff
+
+
+def test_section_diff_applies_with_patch(tmp_path: Path):
+    lines = []
+    for i in range(300):
+        lines += [
+            f"interface Ethernet1/{i}",
+            f" description port {i}",
+            " mtu 9000",
+            "!",
+        ]
+    old = "\n".join(lines) + "\n"
+    # Changes at the top, middle and bottom of blocks, plus added and
+    # removed blocks, so block boundaries cut the context on either side
+    for i in range(0, len(lines), 37):
+        lines[i + 1] = " shutdown"
+    for i in range(2, len(lines), 53):
+        lines[i] = " mtu 1500"
+    lines[400:404] = ["interface Loopback0", " ip address 10.0.0.1/32", "!"]
+    del lines[800:808]
+    new = "\n".join(lines) + "\n"
+    for old_text, new_text in ((old, new), (RUNNING, CHANGED)):
+        (tmp_path / "config").write_text(old_text)
+        (tmp_path / "diff").write_text(unified_diff(old_text, new_text, sections=True))
+        subprocess.run(
+            ["patch", "-F0", "--quiet", "config", "diff"], cwd=tmp_path, check=True
+        )
+        assert (tmp_path / "config").read_text() == new_text
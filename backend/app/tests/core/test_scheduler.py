@@ -0,0 +1,192 @@
+import asyncio
+import itertools
+import threading
+import time
+
+import pytest
+from sqlmodel import Session, col, select
+
+from app.core import scheduler
+from app.core.db import try_advisory_lock
+from app.models import Device
+from app.tests.utils.utils import random_lower_string
+
+
+@pytest.fixture
+def devices(db: Session):
+    created = []
+    for i in range(6):
+        sw = Device(
+            hostname=f"fleet_{random_lower_string()[:8]}", ipaddress=f"192.0.2.{i}"
+        )
+        db.add(sw)
+        created.append(sw)
+    db.commit()
+    for sw in created:
+        db.refresh(sw)
+    yield created
+    for sw in created:
+        db.delete(sw)
+    db.commit()
+
+
+def test_run_fleet_pass_counts_failures(devices: list[Device]):
+    failing = {devices[0].id, devices[1].id}
+
+    def worker(device_id: int) -> None:
+        if device_id in failing:
+            raise RuntimeError("unreachable")
+
+    summary = asyncio.run(scheduler.run_fleet_pass("test", worker, max_workers=4))
+    assert summary["failed"] >= 2
+    assert devices[0].hostname in summary["failed_hosts"]
+    assert summary["succeeded"] == summary["total"] - summary["failed"]
+    assert summary["duration_seconds"] >= 0
+
+
+def test_run_fleet_pass_bounds_concurrency(devices: list[Device]):
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def worker(_device_id: int) -> None:
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+
+    summary = asyncio.run(scheduler.run_fleet_pass("test", worker, max_workers=2))
+    assert peak <= 2
+    assert summary["failed"] == 0
+
+
+def test_sync_all_devices_uses_fresh_sessions(devices: list[Device], monkeypatch):
+    sessions: list[Session] = []
+
+    def fake_update(*, session: Session, device_db: Device) -> None:
+        sessions.append(session)
+
+    monkeypatch.setattr(scheduler, "update_device_metadata", fake_update)
+    summary = asyncio.run(scheduler.sync_all_devices())
+    assert summary["total"] >= len(devices)
+    # sessions holds strong references, so identity is meaningful here
+    assert len(sessions) == summary["total"]
+    assert all(a is not b for a, b in itertools.combinations(sessions, 2))
+
+
+def test_run_fleet_pass_times_out_slow_devices(devices: list[Device]):
+    slow = devices[0].id
+    release = threading.Event()
+
+    def worker(device_id: int) -> str:
+        if device_id == slow:
+            release.wait(5)
+        return "changed" if device_id % 2 else "unchanged"
+
+    try:
+        summary = asyncio.run(
+            scheduler.run_fleet_pass("test", worker, max_workers=2, timeout=0.2)
+        )
+    finally:
+        release.set()
+    assert summary["timed_out"] == 1
+    assert devices[0].hostname in summary["failed_hosts"]
+    # Devices queued behind the slow one still got their full timeout
+    assert sum(summary["outcomes"].values()) == summary["total"] - 1
+    assert summary["duration_seconds"] < 5
+
+
+def test_backup_all_devices_records_run(
+    db: Session, devices: list[Device], monkeypatch
+):
+    from app.crud import config_revisions
+    from app.models import ConfigBackupRun
+
+    changed = {devices[0].id}
+    failing = {devices[1].id}
+
+    def fake_snapshot(session, device, **kwargs):
+        if device.id in failing:
+            raise RuntimeError("unreachable")
+        return object() if device.id in changed else None
+
+    monkeypatch.setattr(config_revisions, "snapshot_if_changed", fake_snapshot)
+    summary = asyncio.run(scheduler.backup_all_devices())
+    run = db.exec(
+        select(ConfigBackupRun).order_by(col(ConfigBackupRun.id).desc())
+    ).first()
+    assert run is not None
+    assert run.total == summary["total"]
+    assert run.changed >= 1
+    assert run.unchanged == run.total - run.changed - run.failed
+    assert devices[1].hostname in run.failed_hosts.split(",")
+    db.delete(run)
+    db.commit()
+
+
+def test_backup_skipped_while_another_process_holds_lock(
+    db: Session, devices: list[Device], monkeypatch
+):
+    from app.crud import config_revisions
+    from app.models import ConfigBackupRun
+
+    snapshots: list[int] = []
+    monkeypatch.setattr(
+        config_revisions,
+        "snapshot_if_changed",
+        lambda session, device, **kwargs: snapshots.append(device.id),
+    )
+    runs_before = len(db.exec(select(ConfigBackupRun)).all())
+    # Another worker's pass holds the advisory lock on its own connection
+    with try_advisory_lock(scheduler.BACKUP_LOCK_KEY) as acquired:
+        assert acquired
+        assert scheduler.config_backup_running()
+        assert asyncio.run(scheduler.backup_all_devices()) == {}
+    assert snapshots == []
+    assert len(db.exec(select(ConfigBackupRun)).all()) == runs_before
+    assert not scheduler.config_backup_running()
+
+
+def test_backup_running_check_never_takes_lock(monkeypatch):
+    # If the check took the lock, a pass starting meanwhile would be skipped
+    def no_lock(key):
+        raise AssertionError("config_backup_running must not take the lock")
+
+    monkeypatch.setattr(scheduler, "try_advisory_lock", no_lock)
+    assert not scheduler.config_backup_running()
+
+
+def test_health_check_writes_results_in_chunks(
+    db: Session, devices: list[Device], monkeypatch
+):
+    from app.automation import health
+    from app.crud import health as crud_health
+
+    written: list[list[int]] = []
+    rollups: list[bool] = []
+
+    async def fake_probe_devices(payload):
+        for device in payload:
+            if device["id"] in {d.id for d in devices}:
+                yield health.ProbeResult(
+                    device_id=device["id"], status="UP", rtt_ms=1.0
+                )
+
+    def fake_apply(session, results):
+        written.append(list(results))
+        return results
+
+    monkeypatch.setattr(health, "probe_devices", fake_probe_devices)
+    monkeypatch.setattr(crud_health, "apply_health_statuses", fake_apply)
+    monkeypatch.setattr(crud_health, "record_probes", lambda session, chunk: None)
+    monkeypatch.setattr(
+        crud_health, "rollup_probes", lambda session: rollups.append(True)
+    )
+    monkeypatch.setattr(scheduler, "HEALTH_FLUSH_SIZE", 4)
+    asyncio.run(scheduler.health_check_all_devices())
+    assert [len(chunk) for chunk in written] == [4, 2]
+    assert sorted(sum(written, [])) == sorted(d.id for d in devices)
+    assert rollups == [True]
@@ -1,13 +1,21 @@
 import hashlib
+import os
+import shutil
+import subprocess
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from types import SimpleNamespace
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session, delete
+from sqlmodel import Session, col, delete, select
 
+from app.automation import config_backup
+from app.automation.config_backup import normalize_config, restore_device_managed
 from app.core import config_store
 from app.core.config import settings
 from app.crud import config_revisions as crud_revisions
-from app.models import ConfigRevision, Device
+from app.models import ConfigRevision, Device, SyncFingerprint
 
 
 @pytest.fixture(autouse=True)
@@ -66,6 +74,150 @@ def test_diff_commits():
     assert "+hostname new" in diff
 
 
+def test_diff_commits_cached(monkeypatch):
+    h1, _ = config_store.commit_config(
+        3,
+        "hostname old\n!\ninterface Eth1\n",
+        message="m",
+        author_name="a",
+        author_email="",
+    )
+    h2, _ = config_store.commit_config(
+        3,
+        "hostname new\n!\ninterface Eth1\n",
+        message="m",
+        author_name="a",
+        author_email="",
+    )
+    reads: list[str] = []
+    get_config_at = config_store.get_config_at
+
+    def counting(device_id: int, commit_hash: str) -> str:
+        reads.append(commit_hash)
+        return get_config_at(device_id, commit_hash)
+
+    monkeypatch.setattr(config_store, "get_config_at", counting)
+    first = config_store.diff_commits(3, h1, h2)
+    assert config_store.diff_commits(3, h1, h2) == first
+    assert reads == [h1, h2]
+    # Section mode is cached separately
+    assert (
+        "@@ -1,2 +1,2 @@ hostname new\n-hostname old\n+hostname new\n !\n"
+        in config_store.diff_commits(3, h1, h2, sections=True)
+    )
+    assert len(reads) == 4
+
+    config_store.delete_repo(3)
+    assert not any(key[0] == 3 for key in config_store._diff_cache)
+
+
+def _git(repo_dir, device_id: int, *args: str) -> str:
+    env = {
+        **os.environ,
+        "GIT_CONFIG_GLOBAL": "/dev/null",
+        "GIT_CONFIG_SYSTEM": "/dev/null",
+        "GIT_AUTHOR_NAME": "a",
+        "GIT_AUTHOR_EMAIL": "a@b",
+        "GIT_COMMITTER_NAME": config_store.COMMITTER_NAME,
+        "GIT_COMMITTER_EMAIL": config_store.COMMITTER_EMAIL,
+        "GIT_AUTHOR_DATE": "1700000000 +0000",
+        "GIT_COMMITTER_DATE": "1700000000 +0000",
+    }
+    return subprocess.run(
+        ["git", *args],
+        cwd=repo_dir / str(device_id),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+needs_git = pytest.mark.skipif(shutil.which("git") is None, reason="git not found")
+
+
+def _config(revision: int) -> str:
+    lines = [f"interface Ethernet{i}\n description port {i}\n" for i in range(300)]
+    lines[revision] = f"interface Ethernet{revision}\n shutdown\n"
+    return f"hostname sw{revision}\n" + "".join(lines)
+
+
+@needs_git
+def test_repo_is_plain_git(repo_dir):
+    hashes = [
+        config_store.commit_config(
+            4,
+            _config(i),
+            message=f"manual: sw\n\n\nrev {i}  ",
+            author_name="a",
+            author_email="a@b",
+        )[0]
+        for i in range(3)
+    ]
+    _git(repo_dir, 4, "fsck", "--strict")
+    assert _git(repo_dir, 4, "status", "--porcelain") == ""
+    assert _git(repo_dir, 4, "log", "--format=%H").split() == hashes[::-1]
+    assert _git(repo_dir, 4, "log", "-1", "--format=%B") == "manual: sw\n\nrev 2\n\n"
+    assert _git(repo_dir, 4, "show", f"{hashes[1]}:running-config.txt") == _config(1)
+    assert "+ shutdown" in config_store.diff_commits(4, hashes[0], hashes[1])
+
+
+@needs_git
+def test_commit_hash_matches_git_cli(repo_dir, monkeypatch):
+    (repo_dir / "5").mkdir()
+    _git(repo_dir, 5, "init", "-q", "-b", "main")
+    (repo_dir / "5" / "running-config.txt").write_text("hostname sw5\n")
+    _git(repo_dir, 5, "add", "running-config.txt")
+    _git(repo_dir, 5, "commit", "-q", "-m", "manual: sw5")
+    expected = _git(repo_dir, 5, "rev-parse", "HEAD").strip()
+
+    monkeypatch.setattr(config_store.time, "time", lambda: 1700000000)
+    config_store.delete_repo(5)
+    commit_hash, _ = config_store.commit_config(
+        5,
+        "hostname sw5\n",
+        message="manual: sw5",
+        author_name="a",
+        author_email="a@b",
+    )
+    assert commit_hash == expected
+
+
+@needs_git
+def test_reads_packed_repo_after_git_gc(repo_dir):
+    hashes = [
+        config_store.commit_config(
+            6, _config(i), message="m", author_name="a", author_email="a@b"
+        )[0]
+        for i in range(5)
+    ]
+    _git(repo_dir, 6, "gc", "-q", "--aggressive")
+    assert not list((repo_dir / "6" / ".git" / "objects").glob("??/*"))
+    assert not (repo_dir / "6" / ".git" / "refs" / "heads" / "main").exists()
+
+    for i, commit_hash in enumerate(hashes):
+        assert config_store.get_config_at(6, commit_hash) == _config(i)
+    # Unchanged against the packed HEAD, then a new commit on top of it
+    assert config_store.commit_config(
+        6, _config(4), message="m", author_name="a", author_email="a@b"
+    ) == (hashes[-1], False)
+    new_hash, changed = config_store.commit_config(
+        6, _config(5), message="m", author_name="a", author_email="a@b"
+    )
+    assert changed is True
+    assert _git(repo_dir, 6, "rev-parse", "HEAD^").strip() == hashes[-1]
+
+
+def test_get_config_at_unknown_commit():
+    config_store.commit_config(
+        7, "hostname sw7\n", message="m", author_name="a", author_email="a@b"
+    )
+    with pytest.raises(config_store.ConfigStoreError):
+        config_store.get_config_at(7, "0" * 40)
+    with pytest.raises(config_store.ConfigStoreError):
+        config_store.get_config_at(7, "HEAD; rm -rf /")
+
+
 def test_snapshot_records_revision(db: Session, device: Device, monkeypatch):
     monkeypatch.setattr(
         crud_revisions, "get_running_config", lambda sw: "hostname testsw1\n"
@@ -105,6 +257,186 @@ def test_snapshot_records_revision(db: Session, device: Device, monkeypatch):
     assert pre.commit_hash == revision.commit_hash
 
 
+@pytest.mark.parametrize(
+    "platform, raw, normalized",
+    [
+        (
+            "ios",
+            "Building configuration...\n\nCurrent configuration : 2041 bytes\n"
+            "!\n! Last configuration change at 02:00:01 UTC Sun Oct 18 2026 by admin\n"
+            "! NVRAM config last updated at 01:00:00 UTC Sun Oct 18 2026 by admin\n"
+            "!\nhostname r1\n!\nntp clock-period 36028857\nntp server 192.0.2.1\n",
+            "\n!\n!\nhostname r1\n!\nntp server 192.0.2.1\n",
+        ),
+        (
+            "nxos_ssh",
+            "!Command: show running-config\n"
+            "!Running configuration last done at: Sun Oct 18 02:00:01 2026\n"
+            "!Time: Sun Oct 18 09:41:12 2026\n\nversion 10.3(2) Bios:version\n",
+            "!Command: show running-config\n\nversion 10.3(2) Bios:version\n",
+        ),
+        (
+            "junos",
+            "## Last commit: 2026-10-18 02:00:01 UTC by admin\nversion 23.2R1;\n",
+            "version 23.2R1;\n",
+        ),
+        # Only a platform's own patterns apply
+        ("eos", "ntp clock-period 36028857\n", "ntp clock-period 36028857\n"),
+    ],
+)
+def test_normalize_config(platform: str, raw: str, normalized: str):
+    assert normalize_config(platform, raw) == normalized
+
+
+@pytest.mark.parametrize(
+    "platform, stored, expected",
+    [
+        # Put back beside the other ntp lines
+        (
+            "ios",
+            "hostname r1\nntp server 192.0.2.1\nend\n",
+            "hostname r1\nntp clock-period 36028861\nntp server 192.0.2.1\nend\n",
+        ),
+        # A revision from before normalization: its stale value is replaced
+        (
+            "ios",
+            "hostname r1\nntp clock-period 11\nend\n",
+            "hostname r1\nntp clock-period 36028861\nend\n",
+        ),
+        ("eos", "hostname r1\nend\n", "hostname r1\nend\n"),
+    ],
+)
+def test_restore_device_managed(platform: str, stored: str, expected: str):
+    running = "hostname r1\nntp clock-period 36028861\nntp server 192.0.2.1\nend\n"
+    assert restore_device_managed(platform, stored, running) == expected
+
+
+def test_replace_keeps_device_managed_lines(device: Device, monkeypatch):
+    pushed: list[tuple[str, bool]] = []
+
+    class Result(dict):
+        failed = False
+
+    def run(task, configuration, replace, dry_run):
+        pushed.append((configuration, replace))
+        return Result({device.hostname: [SimpleNamespace(diff="", changed=False)]})
+
+    @contextmanager
+    def fake_nornir(name, operation):
+        yield SimpleNamespace(run=run)
+
+    monkeypatch.setattr(config_backup, "pooled_nornir", fake_nornir)
+    monkeypatch.setattr(
+        config_backup,
+        "get_running_config",
+        lambda sw: "hostname testsw1\nntp clock-period 36028861\nend\n",
+    )
+    stored = "hostname testsw1\nend\n"
+    config_backup.replace_config(device, stored, dry_run=True)
+    config_backup.replace_config(device, stored, dry_run=True, replace=False)
+    assert pushed == [
+        ("hostname testsw1\nntp clock-period 36028861\nend\n", True),
+        (stored, False),
+    ]
+
+
+def test_snapshot_ignores_volatile_lines(
+    db: Session, device: Device, repo_dir, monkeypatch
+):
+    fetches = iter(
+        [
+            "! Last configuration change at 02:00:01 UTC Sun Oct 18 2026\n"
+            "hostname testsw1\nntp clock-period 36028857\n",
+            "! Last configuration change at 09:12:44 UTC Sun Oct 18 2026\n"
+            "hostname testsw1\nntp clock-period 36028861\n",
+        ]
+    )
+    monkeypatch.setattr(crud_revisions, "get_running_config", lambda sw: next(fetches))
+
+    def snapshot() -> ConfigRevision | None:
+        return crud_revisions.snapshot_device_config(
+            db, device, action="scheduled", username="scheduler", user_email=""
+        )
+
+    revision = snapshot()
+    assert revision is not None
+    assert config_store.get_config_at(device.id, revision.commit_hash) == (
+        "hostname testsw1\n"
+    )
+    git_dir = repo_dir / str(device.id) / ".git"
+    objects = sorted((git_dir / "objects").rglob("*"))
+    assert snapshot() is None
+    assert sorted((git_dir / "objects").rglob("*")) == objects
+
+
+@pytest.mark.parametrize(
+    "platform, output, marker",
+    [
+        (
+            "ios",
+            "! Last configuration change at 02:00:01 UTC Sun Oct 18 2026 by admin\n",
+            "! Last configuration change at 02:00:01 UTC Sun Oct 18 2026 by admin",
+        ),
+        (
+            "nxos_ssh",
+            "!Running configuration last done at: Sun Oct 18 02:00:01 2026\n",
+            "!Running configuration last done at: Sun Oct 18 02:00:01 2026",
+        ),
+        (
+            "junos",
+            "0   2026-10-18 02:00:01 UTC by admin via cli\n"
+            "1   2026-10-17 09:12:44 UTC by admin via netconf\n",
+            "0   2026-10-18 02:00:01 UTC by admin via cli",
+        ),
+    ],
+)
+def test_config_change_probes(platform: str, output: str, marker: str):
+    from app.automation.config_backup import CONFIG_CHANGE_PROBES
+
+    _, pattern = CONFIG_CHANGE_PROBES[platform]
+    match = pattern.search(output)
+    assert match is not None
+    assert match.group(0).strip() == marker
+
+
+def test_snapshot_if_changed_skips_fetch_while_marker_unchanged(
+    db: Session, device: Device, monkeypatch
+):
+    markers = iter(["change at 1", "change at 1", "change at 2"])
+    fetches: list[str] = []
+
+    def fake_fetch(sw: Device) -> str:
+        fetches.append(sw.hostname)
+        return f"hostname testsw1\n! fetch {len(fetches)}\n"
+
+    monkeypatch.setattr(
+        crud_revisions, "get_config_change_marker", lambda sw: next(markers)
+    )
+    monkeypatch.setattr(crud_revisions, "get_running_config", fake_fetch)
+
+    def backup() -> ConfigRevision | None:
+        return crud_revisions.snapshot_if_changed(
+            db, device, username="scheduler", user_email=""
+        )
+
+    first = backup()
+    assert first is not None and first.action == "scheduled"
+    assert backup() is None  # marker unchanged: no SSH fetch at all
+    assert len(fetches) == 1
+    assert backup() is not None  # marker moved
+    assert len(fetches) == 2
+
+    # Platforms without a marker always fetch
+    monkeypatch.setattr(crud_revisions, "get_config_change_marker", lambda sw: None)
+    backup()
+    assert len(fetches) == 3
+
+    crud_revisions.delete_revisions_by_device_id(db, device.id)
+    assert not db.exec(
+        select(SyncFingerprint).where(SyncFingerprint.device_id == device.id)
+    ).all()
+
+
 def test_rollback_requires_confirm(
     client: TestClient,
     superuser_token_headers,
@@ -176,3 +508,56 @@ def test_revisions_forbidden_for_normal_user(
         headers=normal_user_token_headers,
     )
     assert response.status_code == 403
+
+
+def test_backup_runs_list_and_start(
+    client: TestClient, superuser_token_headers, db: Session, monkeypatch
+):
+    from app.api.routes import revisions as revisions_route
+    from app.crud.config_backups import record_backup_run
+    from app.models import ConfigBackupRun
+
+    run_started = datetime.now(UTC)
+    run = record_backup_run(
+        db,
+        {
+            "total": 3,
+            "failed": 1,
+            "timed_out": 1,
+            "failed_hosts": ["sw3"],
+            "outcomes": {"changed": 1, "unchanged": 1},
+            "duration_seconds": 1.5,
+        },
+        run_started,
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/devices/revisions/backups",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    latest = response.json()["data"][0]
+    assert latest["id"] == run.id
+    assert (latest["changed"], latest["unchanged"], latest["failed"]) == (1, 1, 1)
+    assert latest["failed_hosts"] == "sw3"
+    assert run.started_at == run_started
+
+    queued: list[bool] = []
+    monkeypatch.setattr(
+        revisions_route, "queue_config_backup", lambda: queued.append(True)
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/devices/revisions/backups",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert queued == [True]
+
+    monkeypatch.setattr(revisions_route, "config_backup_running", lambda: True)
+    response = client.post(
+        f"{settings.API_V1_STR}/devices/revisions/backups",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 409
+    assert queued == [True]
+    db.exec(delete(ConfigBackupRun).where(col(ConfigBackupRun.id) == run.id))
+    db.commit()
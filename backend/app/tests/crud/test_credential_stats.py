@@ -0,0 +1,83 @@
+import pytest
+from sqlmodel import Session, col, select
+
+from app.automation.discovery import rank_credentials
+from app.core.crypto import encrypt_password
+from app.crud.credential_stats import (
+    delete_credential_stats_by_credential_id,
+    load_credential_stats,
+    record_credential_results,
+)
+from app.models import Credential, CredentialStat
+from app.tests.utils.utils import random_lower_string
+
+
+@pytest.fixture
+def credentials(db: Session):
+    creds = [
+        Credential(
+            username=f"cs_{random_lower_string()[:6]}",
+            password=encrypt_password("secret"),
+        )
+        for _ in range(3)
+    ]
+    db.add_all(creds)
+    db.commit()
+    for cred in creds:
+        db.refresh(cred)
+    yield creds
+    for cred in creds:
+        delete_credential_stats_by_credential_id(db, cred.id)
+        db.delete(cred)
+    db.commit()
+
+
+def test_record_and_rank(db: Session, credentials: list[Credential]):
+    first, second, third = (c.id for c in credentials)
+    record_credential_results(
+        db,
+        [
+            {
+                "ip": "198.51.100.10",
+                "ssh_banner": "Cisco-1.25",
+                "credential_id": third,
+                "failed_credential_ids": [first, second],
+            },
+            {
+                "ip": "198.51.100.11",
+                "ssh_banner": None,
+                "credential_id": third,
+                "failed_credential_ids": [first],
+            },
+            # deleted credential: ignored
+            {"ip": "198.51.100.12", "credential_id": 987654},
+        ],
+    )
+    # counts accumulate across calls
+    record_credential_results(db, [{"ip": "203.0.113.5", "credential_id": second}])
+
+    rows = {
+        (r.credential_id, r.kind, r.scope): (r.successes, r.failures)
+        for r in db.exec(
+            select(CredentialStat).where(
+                col(CredentialStat.credential_id).in_([first, second, third])
+            )
+        ).all()
+    }
+    assert rows[(third, "subnet", "198.51.100.0/24")] == (2, 0)
+    assert rows[(third, "banner", "Cisco-1.25")] == (1, 0)
+    assert rows[(first, "subnet", "198.51.100.0/24")] == (0, 2)
+    assert rows[(second, "subnet", "203.0.113.0/24")] == (1, 0)
+
+    stats = load_credential_stats(db, ["198.51.100.99"])
+    assert ("subnet", "203.0.113.0/24") not in stats
+    creds = [{"id": c.id} for c in credentials]
+    # learned /24 winner goes first; the rest keep the caller's order
+    assert [c["id"] for c in rank_credentials(creds, "198.51.100.99", None, stats)] == [
+        third,
+        first,
+        second,
+    ]
+    # other subnet, same SSH server software
+    assert rank_credentials(creds, "192.0.2.1", "Cisco-1.25", stats)[0]["id"] == third
+    assert rank_credentials(creds, "192.0.2.1", None, stats) == creds
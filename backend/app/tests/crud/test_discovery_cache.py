@@ -0,0 +1,71 @@
+from datetime import UTC, datetime, timedelta
+
+from sqlmodel import Session, delete
+
+from app.core.config import settings
+from app.crud.discovery_cache import load_identify_cache, store_identify_results
+from app.models import DiscoveryCacheEntry
+
+
+def _candidate(ip: str, status: str, host_key: str | None) -> dict:
+    return {
+        "ip": ip,
+        "port": 22,
+        "status": status,
+        "host_key": host_key,
+        "model": "C9300",
+    }
+
+
+def test_store_and_invalidate(db: Session):
+    ips = ["198.51.100.21", "198.51.100.22", "198.51.100.23"]
+    store_identify_results(
+        db,
+        [
+            _candidate(ips[0], "identified", "ssh-rsa SHA256:a"),
+            _candidate(ips[1], "identified", "ssh-rsa SHA256:b"),
+            _candidate(ips[2], "identified", None),  # no handshake: not cached
+        ],
+    )
+    cache = load_identify_cache(db, ips, 22)
+    assert set(cache) == {(ips[0], 22), (ips[1], 22)}
+    assert cache[(ips[0], 22)][0] == "ssh-rsa SHA256:a"
+    assert cache[(ips[0], 22)][1]["model"] == "C9300"
+    assert load_identify_cache(db, ips, 2222) == {}
+
+    store_identify_results(
+        db,
+        [
+            # re-identified under a new key: replaced
+            _candidate(ips[0], "identified", "ssh-rsa SHA256:a2"),
+            # reachable but now fails: dropped
+            _candidate(ips[1], "auth_failed", "ssh-rsa SHA256:b"),
+            # cache hits are not re-stored
+            {**_candidate(ips[2], "identified", "ssh-rsa SHA256:c"), "cached": True},
+        ],
+    )
+    cache = load_identify_cache(db, ips, 22)
+    assert set(cache) == {(ips[0], 22)}
+    assert cache[(ips[0], 22)][0] == "ssh-rsa SHA256:a2"
+
+    db.exec(delete(DiscoveryCacheEntry))
+    db.commit()
+
+
+def test_expired_entries_are_ignored(db: Session):
+    old = datetime.now(UTC) - timedelta(
+        hours=settings.DISCOVERY_CACHE_MAX_AGE_HOURS + 1
+    )
+    db.add(
+        DiscoveryCacheEntry(
+            ip="198.51.100.30",
+            port=22,
+            host_key="ssh-rsa SHA256:x",
+            candidate="{}",
+            identified_at=old,
+        )
+    )
+    db.commit()
+    assert load_identify_cache(db, ["198.51.100.30"], 22) == {}
+    db.exec(delete(DiscoveryCacheEntry))
+    db.commit()
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.automation import discovery as disc
+from app.core.crypto import encrypt_password
+from app.core.scheduler import run_discovery_job
+from app.crud.credential_stats import delete_credential_stats_by_credential_id
+from app.crud.discovery_jobs import (
+    claim_job,
+    create_discovery_job,
+    get_job_public,
+    get_resumable_job_ids,
+    heartbeat_job,
+    record_host_result,
+)
+from app.models import Credential, DiscoveryJob, DiscoveryJobHost
+from app.tests.utils.utils import random_lower_string
+
+STALE = 120
+
+
+@pytest.fixture
+def credential(db: Session):
+    cred = Credential(
+        username=f"job_{random_lower_string()[:6]}",
+        password=encrypt_password("secret"),
+    )
+    db.add(cred)
+    db.commit()
+    db.refresh(cred)
+    yield cred
+    delete_credential_stats_by_credential_id(db, cred.id)
+    db.delete(cred)
+    db.commit()
+
+
+@pytest.fixture
+def job_cleanup(db: Session):
+    yield
+    db.exec(delete(DiscoveryJobHost))
+    db.exec(delete(DiscoveryJob))
+    db.commit()
+
+
+def _candidate(ip: str, port: int, status: str = "identified") -> dict:
+    return {"ip": ip, "port": port, "status": status, "hostname": ip.replace(".", "_")}
+
+
+def test_create_job_dedupes_ips(db: Session, credential: Credential, job_cleanup):
+    job = create_discovery_job(
+        db,
+        ips=["192.0.2.1", "192.0.2.2", "192.0.2.1"],
+        port=22,
+        credential_ids=[credential.id],
+        username="admin@example.com",
+    )
+    assert job.total == 2
+    assert job.credential_ids == str(credential.id)
+    assert job.id in get_resumable_job_ids(db, STALE)
+    public = get_job_public(db, job)
+    assert (public.status, public.completed, public.candidates) == ("pending", 0, [])
+
+
+def test_run_job_checkpoints_and_resumes(
+    db: Session, credential: Credential, job_cleanup, monkeypatch
+):
+    ips = [f"192.0.2.{i}" for i in range(1, 6)]
+    job = create_discovery_job(
+        db, ips=ips, port=2222, credential_ids=[credential.id], username="admin"
+    )
+    # The first host finished before a restart
+    record_host_result(db, job.id, _candidate(ips[0], 2222))
+
+    seen: list[tuple[str, int, str]] = []
+
+    def fake_identify(ip, port, credentials, **kwargs):
+        seen.append((ip, port, credentials[0]["password"]))
+        if ip == ips[-1]:
+            raise RuntimeError("boom")
+        return _candidate(ip, port)
+
+    monkeypatch.setattr(disc, "identify_host", fake_identify)
+    asyncio.run(run_discovery_job(job.id))
+
+    assert sorted(ip for ip, _, _ in seen) == ips[1:]
+    assert {(port, password) for _, port, password in seen} == {(2222, "secret")}
+    db.refresh(job)
+    assert job.status == "completed"
+    assert job.finished_at is not None
+    public = get_job_public(db, job)
+    assert public.completed == 5
+    statuses = {c.ip: c.status for c in public.candidates}
+    assert statuses[ips[0]] == "identified"
+    assert statuses[ips[-1]] == "error"
+    assert job.id not in get_resumable_job_ids(db, STALE)
+
+    # A finished job is never re-run
+    seen.clear()
+    asyncio.run(run_discovery_job(job.id))
+    assert seen == []
+
+
+def test_run_job_without_credentials_errors(db: Session, job_cleanup):
+    job = create_discovery_job(
+        db, ips=["192.0.2.9"], port=22, credential_ids=[987654], username="admin"
+    )
+    asyncio.run(run_discovery_job(job.id))
+    db.refresh(job)
+    assert job.status == "error"
+    assert db.exec(
+        select(DiscoveryJobHost.status).where(DiscoveryJobHost.job_id == job.id)
+    ).all() == ["pending"]
+
+
+def test_claim_is_exclusive_until_heartbeat_goes_stale(
+    db: Session, credential: Credential, job_cleanup
+):
+    job = create_discovery_job(
+        db, ips=["192.0.2.1"], port=22, credential_ids=[credential.id], username="a"
+    )
+    assert claim_job(db, job.id, "worker-1", STALE)
+    assert not claim_job(db, job.id, "worker-2", STALE)
+    assert heartbeat_job(db, job.id, "worker-1")
+    assert job.id not in get_resumable_job_ids(db, STALE)
+
+    # worker-1 died: its heartbeat ages past the stale window
+    db.refresh(job)
+    job.heartbeat_at = datetime.now(UTC) - timedelta(seconds=STALE + 1)
+    db.add(job)
+    db.commit()
+    assert job.id in get_resumable_job_ids(db, STALE)
+    assert claim_job(db, job.id, "worker-2", STALE)
+    assert not heartbeat_job(db, job.id, "worker-1")
+    db.refresh(job)
+    assert (job.status, job.owner) == ("running", "worker-2")
+
+
+def test_run_job_skips_job_owned_by_live_worker(
+    db: Session, credential: Credential, job_cleanup, monkeypatch
+):
+    job = create_discovery_job(
+        db, ips=["192.0.2.1"], port=22, credential_ids=[credential.id], username="a"
+    )
+    assert claim_job(db, job.id, "other-worker", STALE)
+    seen: list[str] = []
+    monkeypatch.setattr(
+        disc, "identify_host", lambda ip, *args, **kwargs: seen.append(ip)
+    )
+    asyncio.run(run_discovery_job(job.id))
+    assert seen == []
+    db.refresh(job)
+    assert (job.status, job.owner) == ("running", "other-worker")
+
+
+def test_run_job_survives_record_and_heartbeat_errors(
+    db: Session, credential: Credential, job_cleanup, monkeypatch
+):
+    from app.core.config import settings
+    from app.crud import discovery_jobs
+
+    ips = ["192.0.2.1", "192.0.2.2", "192.0.2.3"]
+    job = create_discovery_job(
+        db, ips=ips, port=22, credential_ids=[credential.id], username="a"
+    )
+    real_record = discovery_jobs.record_host_result
+    real_heartbeat = discovery_jobs.heartbeat_job
+    beats: list[bool] = []
+
+    def flaky_record(session, job_id, candidate):
+        if candidate["ip"] == ips[1]:
+            raise RuntimeError("db blip")
+        real_record(session, job_id, candidate)
+
+    def flaky_heartbeat(session, job_id, owner):
+        beats.append(True)
+        if len(beats) == 1:
+            raise RuntimeError("db blip")
+        return real_heartbeat(session, job_id, owner)
+
+    def slow_identify(ip, port, credentials, **kwargs):
+        time.sleep(0.1)
+        return _candidate(ip, port)
+
+    monkeypatch.setattr(settings, "DISCOVERY_JOB_STALE_SECONDS", 0.04)
+    monkeypatch.setattr(discovery_jobs, "record_host_result", flaky_record)
+    monkeypatch.setattr(discovery_jobs, "heartbeat_job", flaky_heartbeat)
+    monkeypatch.setattr(disc, "identify_host", slow_identify)
+    asyncio.run(run_discovery_job(job.id))
+
+    # One failed heartbeat doesn't give the job up; one failed write only
+    # leaves that host pending
+    assert len(beats) > 1
+    db.refresh(job)
+    assert job.status == "completed"
+    statuses = {c.ip: c.status for c in get_job_public(db, job).candidates}
+    assert statuses == {ips[0]: "identified", ips[2]: "identified"}
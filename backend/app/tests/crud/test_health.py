@@ -0,0 +1,115 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, delete, select
+
+from app.api.routes.devices import read_device_latency
+from app.automation.health import ProbeResult
+from app.core.config import settings
+from app.crud.health import (
+    apply_health_statuses,
+    get_latency,
+    record_probes,
+    rollup_probes,
+)
+from app.models import Device, HealthProbe, HealthRollup
+from app.tests.utils.utils import random_lower_string
+
+
+@pytest.fixture
+def device(db: Session):
+    sw = Device(hostname=f"hp_{random_lower_string()[:8]}", ipaddress="192.0.2.50")
+    db.add(sw)
+    db.commit()
+    db.refresh(sw)
+    yield sw
+    db.exec(delete(HealthProbe).where(HealthProbe.device_id == sw.id))
+    db.exec(delete(HealthRollup).where(HealthRollup.device_id == sw.id))
+    db.delete(sw)
+    db.commit()
+
+
+def test_rollups_aggregate_probes(db: Session, device: Device):
+    now = datetime.now(UTC).replace(second=30, microsecond=0)
+    record_probes(db, [ProbeResult(device.id, "UP", 10.0)], ts=now)
+    record_probes(db, [ProbeResult(device.id, "UP", 30.0)], ts=now)
+    record_probes(db, [ProbeResult(device.id, "DOWN", None)], ts=now)
+
+    rollup_probes(db, now=now)
+    # re-running recomputes the same buckets rather than double counting
+    rollup_probes(db, now=now)
+
+    since = now - timedelta(hours=1)
+    (minute,) = get_latency(db, device.id, "minute", since)
+    assert minute.samples == 3
+    assert minute.up == 2
+    assert minute.rtt_min == 10.0
+    assert minute.rtt_avg == 20.0
+    assert minute.rtt_max == 30.0
+    assert len(get_latency(db, device.id, "hour", since - timedelta(hours=1))) == 1
+    assert [p.up for p in get_latency(db, device.id, "raw", since)] == [1, 1, 0]
+
+
+def test_retention_prunes_old_rows(db: Session, device: Device):
+    now = datetime.now(UTC)
+    old = now - timedelta(hours=settings.HEALTH_PROBE_RETENTION_HOURS + 1)
+    record_probes(db, [ProbeResult(device.id, "UP", 5.0)], ts=old)
+    record_probes(db, [ProbeResult(device.id, "UP", 6.0)], ts=now)
+
+    rollup_probes(db, now=now)
+
+    rows = db.exec(
+        select(HealthProbe.rtt_ms).where(HealthProbe.device_id == device.id)
+    ).all()
+    assert rows == [6.0]
+
+
+def test_read_device_latency(db: Session, device: Device):
+    record_probes(db, [ProbeResult(device.id, "UP", 4.2)])
+
+    body = read_device_latency(
+        session=db, current_user=None, id=device.id, resolution="raw", hours=24
+    )
+    assert body.resolution == "raw"
+    assert body.data[0].rtt_avg == 4.2
+
+    with pytest.raises(HTTPException) as exc:
+        read_device_latency(
+            session=db, current_user=None, id=999999, resolution="raw", hours=24
+        )
+    assert exc.value.status_code == 404
+
+
+def test_apply_health_statuses_writes_only_transitions(db: Session, device: Device):
+    other = Device(
+        hostname=f"hp_{random_lower_string()[:8]}",
+        ipaddress="192.0.2.51",
+        health_status="AUTH_ERROR",
+    )
+    db.add(other)
+    db.commit()
+    db.refresh(other)
+
+    effective = apply_health_statuses(db, {device.id: "DOWN", other.id: "UP"})
+
+    assert effective == {device.id: "DOWN", other.id: "AUTH_ERROR"}
+    db.refresh(device)
+    db.refresh(other)
+    assert device.health_status == "DOWN"
+    down_since = device.health_changed_at
+    assert down_since is not None
+    # AUTH_ERROR survives a successful TCP probe and is not rewritten
+    assert other.health_changed_at is None
+
+    apply_health_statuses(db, {device.id: "DOWN"})
+    db.refresh(device)
+    assert device.health_changed_at == down_since
+
+    apply_health_statuses(db, {device.id: "UP"})
+    db.refresh(device)
+    assert device.health_status == "UP"
+    assert device.health_changed_at > down_since
+
+    db.delete(other)
+    db.commit()
@@ -0,0 +1,83 @@
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.crud.interfaces import update_interface_metadata
+from app.models import Device, Interface
+from app.tests.utils.utils import random_lower_string
+
+
+@pytest.fixture
+def device(db: Session):
+    sw = Device(
+        hostname=f"intf_{random_lower_string()[:8]}",
+        ipaddress="192.0.2.30",
+        platform="ios",
+    )
+    db.add(sw)
+    db.commit()
+    db.refresh(sw)
+    yield sw
+    db.exec(delete(Interface).where(Interface.device_id == sw.id))
+    db.delete(sw)
+    db.commit()
+
+
+def _intf(port: str, **overrides: str) -> dict:
+    interface = {
+        "port": port,
+        "description": "",
+        "status": "connected",
+        "vlan": "10",
+        "duplex": "full",
+        "speed": "1000",
+        "type": "10/100/1000BaseTX",
+        "mode": "access",
+        "native_vlan": "1",
+        "allowed_vlan": "1",
+        "allowed_vlan_add": "1",
+    }
+    interface.update(overrides)
+    return interface
+
+
+def _rows(db: Session, device: Device) -> dict[str, Interface]:
+    db.expire_all()
+    rows = db.exec(select(Interface).where(Interface.device_id == device.id)).all()
+    return {row.port: row for row in rows}
+
+
+def test_interface_sync_inserts_updates_and_deletes(db: Session, device: Device):
+    update_interface_metadata(
+        session=db,
+        interfaces_in=[_intf("Gi0/1"), _intf("Gi0/2"), _intf("Gi0/3")],
+        device=device,
+        interfaces_status={},
+    )
+    before = {port: row.updated_at for port, row in _rows(db, device).items()}
+    assert set(before) == {"Gi0/1", "Gi0/2", "Gi0/3"}
+
+    update_interface_metadata(
+        session=db,
+        interfaces_in=[_intf("Gi0/1"), _intf("Gi0/2", status="notconnect")],
+        device=device,
+        interfaces_status={},
+    )
+    after = _rows(db, device)
+    assert set(after) == {"Gi0/1", "Gi0/2"}
+    assert after["Gi0/2"].status == "notconnect"
+    # Unchanged rows are not rewritten
+    assert after["Gi0/1"].updated_at == before["Gi0/1"]
+    assert after["Gi0/2"].updated_at > before["Gi0/2"]
+
+
+def test_interface_sync_keeps_rows_when_collection_empty(db: Session, device: Device):
+    update_interface_metadata(
+        session=db,
+        interfaces_in=[_intf("Gi0/1")],
+        device=device,
+        interfaces_status={},
+    )
+    update_interface_metadata(
+        session=db, interfaces_in=[], device=device, interfaces_status={}
+    )
+    assert set(_rows(db, device)) == {"Gi0/1"}
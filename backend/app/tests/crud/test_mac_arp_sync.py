@@ -0,0 +1,98 @@
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.crud.arps import update_arp_running
+from app.crud.mac_addresses import update_mac_address_running
+from app.models import Arp, Device, MacAddress
+from app.tests.utils.utils import random_lower_string
+
+
+@pytest.fixture
+def device(db: Session):
+    sw = Device(hostname=f"sync_{random_lower_string()[:8]}", ipaddress="192.0.2.20")
+    db.add(sw)
+    db.commit()
+    db.refresh(sw)
+    yield sw
+    db.exec(delete(MacAddress).where(MacAddress.device_id == sw.id))
+    db.exec(delete(Arp).where(Arp.device_id == sw.id))
+    db.delete(sw)
+    db.commit()
+
+
+def _mac(mac: str, interface: str, vlan: int) -> dict:
+    return {
+        "mac": mac,
+        "interface": interface,
+        "vlan": vlan,
+        "static": False,
+        "active": True,
+        "moves": 0,
+        "last_move": 0,
+    }
+
+
+def test_mac_sync_upserts_on_natural_key(db: Session, device: Device):
+    update_mac_address_running(
+        db,
+        [
+            _mac("AA:BB:CC:00:00:01", "Gi0/1", 10),
+            _mac("AA:BB:CC:00:00:02", "Gi0/2", 10),
+        ],
+        device.id,
+    )
+    update_mac_address_running(
+        db,
+        [
+            _mac("aa:bb:cc:00:00:01", "Gi0/1", 20),
+            _mac("AA:BB:CC:00:00:02", "Gi0/2", 10),
+        ],
+        device.id,
+    )
+    db.expire_all()
+    rows = db.exec(
+        select(MacAddress)
+        .where(MacAddress.device_id == device.id)
+        .order_by(MacAddress.mac)
+    ).all()
+    assert [(r.mac, r.vlan) for r in rows] == [
+        ("aabbcc000001", 20),
+        ("aabbcc000002", 10),
+    ]
+
+
+def test_mac_sync_collapses_duplicate_entries(db: Session, device: Device):
+    entry = _mac("aa:bb:cc:00:00:03", "Gi0/3", 10)
+    update_mac_address_running(db, [entry, dict(entry)], device.id)
+    rows = db.exec(select(MacAddress).where(MacAddress.device_id == device.id)).all()
+    assert len(rows) == 1
+
+
+def test_arp_sync_upserts_on_natural_key(db: Session, device: Device):
+    arp = {
+        "ip": "192.0.2.50",
+        "mac": "AA:BB:CC:00:00:09",
+        "interface": "Vlan10",
+        "age": 3.0,
+    }
+    update_arp_running(db, [arp], device.id)
+    update_arp_running(db, [dict(arp)], device.id)
+    rows = db.exec(select(Arp).where(Arp.device_id == device.id)).all()
+    assert len(rows) == 1
+    assert rows[0].mac == "aabbcc000009"
+
+
+def test_arp_sync_upserts_incomplete_entries(db: Session, device: Device):
+    arp = {"ip": "192.0.2.51", "mac": "", "interface": "Vlan10", "age": 0.0}
+    update_arp_running(db, [arp], device.id)
+    row = db.exec(select(Arp).where(Arp.device_id == device.id)).one()
+    # Force the second pass down the INSERT ... ON CONFLICT path
+    row.age = 5
+    db.add(row)
+    db.commit()
+    update_arp_running(db, [dict(arp)], device.id)
+    db.expire_all()
+    rows = db.exec(select(Arp).where(Arp.device_id == device.id)).all()
+    assert len(rows) == 1
+    assert rows[0].mac == ""
+    assert rows[0].age == 0
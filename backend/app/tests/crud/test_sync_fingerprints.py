@@ -0,0 +1,163 @@
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.crud import devices as crud_devices
+from app.crud import mac_addresses as crud_mac_addresses
+from app.crud.sync_fingerprints import fingerprint, sync_if_changed
+from app.models import Device, MacAddress, SyncFingerprint
+from app.tests.utils.utils import random_lower_string
+
+
+@pytest.fixture
+def device(db: Session):
+    sw = Device(hostname=f"fp_{random_lower_string()[:8]}", ipaddress="192.0.2.40")
+    db.add(sw)
+    db.commit()
+    db.refresh(sw)
+    yield sw
+    db.exec(delete(SyncFingerprint).where(SyncFingerprint.device_id == sw.id))
+    db.delete(sw)
+    db.commit()
+
+
+def test_fingerprint_ignores_row_order_and_ignored_keys():
+    rows = [{"ip": "10.0.0.1", "age": 1.0}, {"ip": "10.0.0.2", "age": 7.0}]
+    shuffled = [{"ip": "10.0.0.2", "age": 3.0}, {"ip": "10.0.0.1", "age": 9.0}]
+    assert fingerprint(rows, ignore=("age",)) == fingerprint(shuffled, ignore=("age",))
+    assert fingerprint(rows) != fingerprint(shuffled)
+    assert fingerprint(rows[:1]) != fingerprint(rows)
+
+
+def test_unchanged_table_skips_ingestion(db: Session, device: Device):
+    calls: list[int] = []
+    digest = fingerprint([{"mac": "aabbcc000001"}])
+
+    assert sync_if_changed(
+        db, device.id, "mac_address", digest, lambda: calls.append(1)
+    )
+    first = db.exec(
+        select(SyncFingerprint).where(SyncFingerprint.device_id == device.id)
+    ).one()
+    changed_at = first.changed_at
+    verified_at = first.verified_at
+
+    assert not sync_if_changed(
+        db, device.id, "mac_address", digest, lambda: calls.append(1)
+    )
+    db.refresh(first)
+    assert calls == [1]
+    assert first.changed_at == changed_at
+    assert first.verified_at >= verified_at
+
+    assert sync_if_changed(
+        db, device.id, "mac_address", fingerprint([]), lambda: calls.append(1)
+    )
+    assert calls == [1, 1]
+
+
+def test_failed_ingestion_is_retried(db: Session, device: Device):
+    digest = fingerprint({"Gi0/1": {"ipv4": {}}})
+
+    def boom():
+        raise RuntimeError("write failed")
+
+    with pytest.raises(RuntimeError):
+        sync_if_changed(db, device.id, "ip_interface", digest, boom)
+    db.rollback()
+
+    calls: list[int] = []
+    assert sync_if_changed(
+        db, device.id, "ip_interface", digest, lambda: calls.append(1)
+    )
+    assert calls == [1]
+
+
+def test_update_device_metadata_all_streams_each_host(
+    db: Session, device: Device, monkeypatch
+):
+    def fake_collect(handler):
+        handler(device.hostname, {"get_facts": {"model": "vEOS", "vendor": "Arista"}})
+        handler("not-in-db", {"get_facts": {}})
+        return {"down-device": "timeout"}
+
+    monkeypatch.setattr(crud_devices, "get_metadata_all", fake_collect)
+
+    summary = crud_devices.update_device_metadata_all(session=db)
+
+    assert summary == {"synced": 1, "failed": 1}
+    db.refresh(device)
+    assert device.model == "vEOS"
+    assert device.health_status == "UP"
+    tables = set(
+        db.exec(
+            select(SyncFingerprint.table_name).where(
+                SyncFingerprint.device_id == device.id
+            )
+        ).all()
+    )
+    assert tables == {"mac_address", "arp", "ip_interface", "interface"}
+
+
+def test_failed_getter_keeps_stored_table(db: Session, device: Device, monkeypatch):
+    calls: list[str] = []
+    for name in (
+        "update_mac_address_running",
+        "update_arp_running",
+        "update_ip_interface_running",
+        "update_interface_metadata",
+    ):
+        monkeypatch.setattr(
+            crud_devices, name, lambda name=name, **kwargs: calls.append(name)
+        )
+
+    crud_devices._ingest_tables(
+        session=db,
+        device_db=device,
+        host_facts={
+            "get_mac_address_table": [],
+            "get_arp_table": [],
+            "get_interfaces_ip": {},
+            "cli": {},
+            "errors": {"get_arp_table": "timed out", "cli": "timed out"},
+        },
+    )
+    # An empty MAC table is real data; the failed ARP getter and interface
+    # status commands are not, so those tables are not emptied
+    assert calls == ["update_mac_address_running", "update_ip_interface_running"]
+
+
+def test_api_delete_is_restored_by_next_sync(db: Session, device: Device):
+    facts = {
+        "get_mac_address_table": [
+            {
+                "mac": "AA:BB:CC:00:00:01",
+                "interface": "Gi0/1",
+                "vlan": 10,
+                "static": False,
+                "active": True,
+                "moves": 0,
+                "last_move": 0,
+            }
+        ],
+        "errors": {
+            "get_arp_table": "skipped",
+            "get_interfaces_ip": "skipped",
+            "cli": "skipped",
+        },
+    }
+
+    def stored_macs():
+        return db.exec(
+            select(MacAddress).where(MacAddress.device_id == device.id)
+        ).all()
+
+    crud_devices._ingest_tables(session=db, device_db=device, host_facts=facts)
+    (row,) = stored_macs()
+    crud_mac_addresses.delete_mac_address(db, row)
+    assert stored_macs() == []
+
+    # The device still reports the same table, but the row must come back
+    crud_devices._ingest_tables(session=db, device_db=device, host_facts=facts)
+    assert len(stored_macs()) == 1
+    db.exec(delete(MacAddress).where(MacAddress.device_id == device.id))
+    db.commit()
@@ -0,0 +1,134 @@
+"""Benchmark app.core.config_store against the git CLI it replaced.
+
+Commits, reads and diffs the same synthetic config revisions through the
+in-process store and through `git add/status/commit/gc --auto/rev-parse`
+subprocesses (the previous implementation), in throwaway repositories.
+
+    python scripts/bench_config_store.py --revisions 50 --lines 50000
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from app.core import config_store
+from app.core.config import settings
+
+
+def make_config(lines: int, revision: int) -> str:
+    body = [
+        f"interface Ethernet1/{i}\n description port {i}\n" for i in range(lines // 2)
+    ]
+    body[revision % len(body)] = f"interface Ethernet1/{revision}\n shutdown\n"
+    return f"hostname bench-{revision}\n" + "".join(body)
+
+
+class GitCli:
+    """The subprocess-per-operation store, kept here for comparison."""
+
+    def __init__(self, repo: Path) -> None:
+        self.repo = repo
+        repo.mkdir(parents=True)
+        self.env = {
+            **os.environ,
+            "GIT_AUTHOR_NAME": "bench",
+            "GIT_AUTHOR_EMAIL": "bench@localhost",
+            "GIT_COMMITTER_NAME": "bench",
+            "GIT_COMMITTER_EMAIL": "bench@localhost",
+            "GIT_CONFIG_GLOBAL": "/dev/null",
+            "GIT_CONFIG_SYSTEM": "/dev/null",
+        }
+        self.git("init", "-b", "main")
+
+    def git(self, *args: str) -> str:
+        return subprocess.run(
+            ["git", *args],
+            cwd=self.repo,
+            env=self.env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    def commit(self, config_text: str) -> str:
+        (self.repo / config_store.CONFIG_FILENAME).write_text(config_text)
+        self.git("add", config_store.CONFIG_FILENAME)
+        if self.git("status", "--porcelain", "--", config_store.CONFIG_FILENAME):
+            self.git("commit", "-m", "bench")
+            self.git("gc", "--auto", "--quiet")
+        return self.git("rev-parse", "HEAD").strip()
+
+    def read(self, commit_hash: str) -> str:
+        return self.git("show", f"{commit_hash}:{config_store.CONFIG_FILENAME}")
+
+    def diff(self, base: str, target: str) -> str:
+        return self.git("diff", "--no-color", base, target)
+
+
+def timed(label: str, count: int, fn: Callable[[int], object]) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:8.3f}s  {elapsed / count * 1000:8.2f} ms/op")
+    return elapsed
+
+
+def bench(
+    name: str,
+    configs: list[str],
+    commit: Callable[[str], str],
+    read: Callable[[str], str],
+    diff: Callable[[str, str], str],
+) -> dict[str, float]:
+    print(f"{name}: {len(configs)} revisions x {configs[0].count(chr(10))} lines")
+    hashes: list[str] = []
+    return {
+        "commit": timed(
+            "commit (changed)",
+            len(configs),
+            lambda i: hashes.append(commit(configs[i])),
+        ),
+        "unchanged": timed(
+            "commit (unchanged)", len(configs), lambda i: commit(configs[-1])
+        ),
+        "read": timed("read revision", len(configs), lambda i: read(hashes[i])),
+        "diff": timed(
+            "diff consecutive",
+            len(configs) - 1,
+            lambda i: diff(hashes[i], hashes[i + 1]),
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--revisions", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=5000)
+    args = parser.parse_args()
+    configs = [make_config(args.lines, i) for i in range(args.revisions)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.CONFIG_REPO_DIR = str(Path(tmp) / "inproc")
+        cli = GitCli(Path(tmp) / "cli")
+        cli_times = bench("git CLI", configs, cli.commit, cli.read, cli.diff)
+        store_times = bench(
+            "in-process",
+            configs,
+            lambda text: config_store.commit_config(
+                1, text, message="bench", author_name="bench", author_email=""
+            )[0],
+            lambda sha: config_store.get_config_at(1, sha),
+            lambda base, target: config_store.diff_commits(1, base, target),
+        )
+    print("speedup (git CLI / in-process):")
+    for op, cli_time in cli_times.items():
+        print(f"  {op:<28} {cli_time / store_times[op]:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
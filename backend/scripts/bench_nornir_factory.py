@@ -0,0 +1,75 @@
+"""Benchmark building a single-device Nornir object, before and after the factory.
+
+Seeds throwaway devices, then compares InitNornir(...).filter(name=...) on
+every call (the previous implementation: re-read config.yaml and the group
+files, load every host) with the cached base plus select_hosts(name=...)
+that pooled_nornir() uses. Seeded devices are deleted afterwards.
+
+    python scripts/bench_nornir_factory.py --devices 2000 --calls 200
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+from nornir import InitNornir
+from sqlmodel import Session, col, delete
+
+from app.automation import nornir_factory
+from app.core.db import engine
+from app.models import Device
+
+PREFIX = "bench-nf-"
+
+
+def timed(label: str, count: int, fn: Callable[[int], object]) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed:8.3f}s  {elapsed / count * 1000:8.2f} ms/op")
+    return elapsed
+
+
+def seed(session: Session, count: int) -> list[str]:
+    names = [f"{PREFIX}{i}" for i in range(count)]
+    session.add_all(
+        Device(hostname=name, ipaddress=f"10.{i // 65536}.{i // 256 % 256}.{i % 256}")
+        for i, name in enumerate(names)
+    )
+    session.commit()
+    return names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        names = seed(session, args.devices)
+        try:
+            print(f"{args.devices} devices, {args.calls} single-device lookups")
+
+            def init_nornir(i: int) -> None:
+                name = names[i % len(names)]
+                nr = InitNornir(config_file=nornir_factory.CONFIG_FILE)
+                assert list(nr.filter(name=name).inventory.hosts) == [name]
+
+            def factory(i: int) -> None:
+                name = names[i % len(names)]
+                nr = nornir_factory.make_view(nornir_factory.select_hosts(name=name))
+                assert list(nr.inventory.hosts) == [name]
+
+            before = timed("InitNornir + filter", args.calls, init_nornir)
+            nornir_factory.invalidate_inventory()
+            after = timed("cached base + select_hosts", args.calls, factory)
+            print(f"speedup: {before / after:.1f}x")
+        finally:
+            session.exec(delete(Device).where(col(Device.hostname).startswith(PREFIX)))
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -29,8 +29,8 @@ async def identify_discovered_devices(
 ) -> dict:
     """
     SSH into up to 8 IPs at a time: try each credential (by id) in order,
-    autodetect the platform (Netmiko SSHDetect) and pull device facts (NAPALM
-    get_facts). Returns {candidates:[{ip, status, platform, device_type,
+    autodetect the platform from "show version" and parse device facts over
+    the same SSH session. Returns {candidates:[{ip, status, platform, device_type,
     hostname, raw_hostname, vendor, model, os_version, serial_number,
     credential_id, error}]}. status is one of identified/auth_failed/
     unreachable/unknown_platform/error. Already-registered IPs are skipped.
@@ -43,6 +43,66 @@ async def identify_discovered_devices(
     )
 
 
+@mcp.tool()
+async def crawl_topology(
+    credential_ids: list[int],
+    device_ids: list[int] | None = None,
+    port: int = 22,
+    max_depth: int = 2,
+    max_devices: int = 100,
+) -> dict:
+    """
+    Discover devices from CDP/LLDP neighbor tables instead of sweeping a
+    subnet: starting at the given registered devices (default: all), read
+    their neighbors and identify only the management IPs they advertise,
+    breadth-first up to max_depth hops (max 5) and max_devices new hosts
+    (max 1000). Returns {neighbors:[{hostname, ip, protocol, local_port,
+    remote_port, depth, via, existing_device_id}], candidates:[...] (the
+    identify_discovered_devices shape), errors:[{hostname, error}]}.
+    Superuser required.
+    """
+    return await client.post(
+        "/devices/discovery/crawl",
+        json={
+            "credential_ids": credential_ids,
+            "device_ids": device_ids or [],
+            "port": port,
+            "max_depth": max_depth,
+            "max_devices": max_devices,
+        },
+        timeout=DISCOVERY_TIMEOUT,
+    )
+
+
+@mcp.tool()
+async def start_discovery_job(
+    ips: list[str], credential_ids: list[int], port: int = 22
+) -> dict:
+    """
+    Start a background identify job over any number of IPs (no per-call
+    cap): same per-host work as identify_discovered_devices, run server-side
+    with results checkpointed per host, so a backend restart resumes the job.
+    Already-registered IPs are skipped. Returns the job {id, status, total,
+    completed, ...}; poll get_discovery_job until status is completed or
+    error. Superuser required.
+    """
+    return await client.post(
+        "/devices/discovery/jobs",
+        json={"ips": ips, "credential_ids": credential_ids, "port": port},
+    )
+
+
+@mcp.tool()
+async def get_discovery_job(job_id: int) -> dict:
+    """
+    Progress and results of a discovery job: {id, status (pending/running/
+    completed/error), total, completed, error, candidates:[...]} where
+    candidates has the identify_discovered_devices shape for every host
+    finished so far. Superuser required.
+    """
+    return await client.get(f"/devices/discovery/jobs/{job_id}")
+
+
 @mcp.tool()
 async def bulk_add_discovered_devices(devices: list[dict]) -> dict:
     """